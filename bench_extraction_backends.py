@@ -0,0 +1,80 @@
+"""
+Benchmark the fast and accurate extraction backends on the sample PDFs.
+Reports pages per second for each backend and whether the fast profile
+parses into the same problems (number and type) as the accurate one.
+
+Usage: python bench_extraction_backends.py [PDF ...] [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from extraction_backends import EXTRACTION_BACKENDS
+from homework_solver import HomeworkAnalyzerAlgorithm
+
+SAMPLE_PDFS = [
+    'Tema2-ejercicios.pdf',
+    'CALCULUS Exercises1.pdf.pdf',
+    'PA2.pdf',
+]
+
+
+def run_backend(pdf_path, backend, repeat):
+    """Return (best seconds, page count, problems) for one backend"""
+    best = None
+    for _ in range(repeat):
+        analyzer = HomeworkAnalyzerAlgorithm(backend=backend)
+        start = time.perf_counter()
+        problems = analyzer.extract_and_analyze(pdf_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    page_count = analyzer.raw_text.count('--- PAGE ')
+    return best, page_count, problems
+
+
+def compare(reference, candidate):
+    """Describe how candidate problems differ from the reference parse"""
+    ref = [(p['number'], p['type']) for p in reference]
+    cand = [(p['number'], p['type']) for p in candidate]
+    if ref == cand:
+        return 'equivalent'
+    same = sum(1 for a, b in zip(ref, cand) if a == b)
+    return f'differs ({len(cand)} vs {len(ref)} problems, {same} matching)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pdfs', nargs='*', help='PDFs to benchmark (default: bundled samples)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per backend, best time is kept')
+    args = parser.parse_args()
+
+    root = Path(__file__).parent
+    pdfs = [Path(p) for p in args.pdfs] or [root / name for name in SAMPLE_PDFS]
+
+    print("\n" + "="*78)
+    print("⏱️  Extraction backend benchmark")
+    print("="*78)
+    print(f"{'PDF':<30} {'backend':<10} {'pages':>5} {'seconds':>9} {'pages/s':>9}  parse")
+    print("-"*78)
+
+    for pdf_path in pdfs:
+        if not pdf_path.exists():
+            print(f"{pdf_path.name:<30} missing, skipped")
+            continue
+        results = {name: run_backend(str(pdf_path), name, args.repeat) for name in EXTRACTION_BACKENDS}
+        reference = results['accurate'][2]
+        for name, (seconds, pages, problems) in results.items():
+            verdict = 'reference' if name == 'accurate' else compare(reference, problems)
+            rate = pages / seconds if seconds else float('inf')
+            print(f"{pdf_path.name[:30]:<30} {name:<10} {pages:>5} {seconds:>9.3f} {rate:>9.1f}  {verdict}")
+
+    print("="*78 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark requirement extraction (analyze_problem_requirements) on
+adversarial input. Checks that the scanner matches the original
+regex-based extraction on the sample PDFs, then times both on inputs of
+doubling size: the scanner's time should roughly double with each step.
+
+Usage: python bench_requirements.py [--max-size N] [--legacy-max-size N] [--repeat N]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from detailed_solver import DetailedSolutionGenerator
+from homework_solver import HomeworkAnalyzerAlgorithm
+
+SAMPLE_PDFS = [
+    'Tema2-ejercicios.pdf',
+    'CALCULUS Exercises1.pdf.pdf',
+    'PA2.pdf',
+]
+
+# Period-free pdfplumber-like blocks that made the original patterns
+# backtrack: no cue word for the lazy question prefix, one long number run
+# after "dado", and a long whitespace gap after "cual es".
+ADVERSARIAL = {
+    'no periods, no cues': lambda n: 'x ' * (n // 2),
+    'long number run': lambda n: 'dado ' + '1' * n,
+    'whitespace after cual es': lambda n: 'cual es' + ' ' * n + '?',
+}
+
+
+def legacy_requirements(text):
+    """The regex extraction analyze_problem_requirements used before the scanner"""
+    analysis = {'exact_question': '', 'given_info': [], 'unknowns': [], 'problem_objectives': [], 'key_constraints': []}
+    text_lower = text.lower()
+    for pattern in [
+        r'(?:find|calculate|determine|solve for|compute)\s+([^\.\n?,]+)',
+        r'(?:encuentra|hallar|calcular|determinar|resuelve|resolver)\s+([^\.\n?,]+)',
+        r'([^.]*?)(?:find|calculate|determine|solve|is|are|given)[^.]*',
+        r'([^.]*?)(?:encuentra|calcula|determina|resuelve|es|son|dado|dada|dados|dadas)[^.]*',
+    ]:
+        match = re.search(pattern, text_lower)
+        if match:
+            analysis['exact_question'] = match.group(1).strip()
+            break
+    if 'given' in text_lower or any(token in text_lower for token in ['dado', 'dada', 'dados', 'dadas']):
+        if 'given' not in text_lower:
+            parts = re.split(r'dado|dada|dados|dadas', text_lower, maxsplit=1)
+            if len(parts) > 1:
+                given_text = parts[1].split('find')[0] if 'find' in parts[1] else parts[1]
+                analysis['given_info'] = re.findall(r'[A-Za-z_]\s*=\s*[0-9.]+|[0-9.]+\s+[A-Za-z]+', given_text)[:5]
+    for pattern in [
+        r'find\s+([A-Za-z_]\w*)',
+        r'solve\s+for\s+([A-Za-z_]\w*)',
+        r'calculate\s+([A-Za-z_]\w*)',
+        r'(?:what|where|when)\s+(?:is|are|does)\s+(?:the\s+)?([A-Za-z_]\w*)',
+        r'(?:encuentra|hallar|calcular|determina)\s+([A-Za-z_]\w*)',
+        r'(?:resuelve|resolver)\s+para\s+([A-Za-z_]\w*)',
+        r'(?:cual|cu[aá]l|cuanto|cu[aá]nto)\s+(?:es|son)\s+(?:el|la|los|las)?\s*([A-Za-z_]\w*)',
+    ]:
+        matches = re.findall(pattern, text_lower)
+        analysis['unknowns'] = matches[:3]
+        if matches:
+            break
+    analysis['key_constraints'] = re.findall(r'(?:where|assuming|condition|constraint|such that|donde|suponiendo|condici[óo]n|tal que)[^.]*', text_lower)[:3]
+    return analysis
+
+
+def extraction_fields(analysis):
+    """The fields the scanner rebuilt (objectives are keyword cues, unchanged)"""
+    return {key: analysis[key] for key in ('exact_question', 'given_info', 'unknowns', 'key_constraints')}
+
+
+def time_call(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=128000, help='largest adversarial input, in characters')
+    parser.add_argument('--legacy-max-size', type=int, default=8000, help='largest input the quadratic original is timed on')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per input, best time is kept')
+    args = parser.parse_args()
+
+    generator = DetailedSolutionGenerator()
+    root = Path(__file__).parent
+
+    print("\n" + "="*78)
+    print("⏱️  Requirement extraction benchmark")
+    print("="*78)
+
+    checked = mismatched = 0
+    for name in SAMPLE_PDFS:
+        pdf_path = root / name
+        if not pdf_path.exists():
+            print(f"{name:<30} missing, skipped")
+            continue
+        for problem in HomeworkAnalyzerAlgorithm().extract_and_analyze(str(pdf_path)):
+            checked += 1
+            scanned = extraction_fields(generator.analyze_problem_requirements(problem['text']))
+            if scanned != extraction_fields(legacy_requirements(problem['text'])):
+                mismatched += 1
+                print(f"  mismatch in {name}, problem {problem['number']}")
+    print(f"Sample corpus: {checked} problems, {mismatched} mismatches\n")
+
+    print(f"{'input':<26} {'size':>7} {'legacy s':>10} {'scanner s':>10} {'scanner x':>10}")
+    print("-"*78)
+    for label, build in ADVERSARIAL.items():
+        size = 1000
+        previous = None
+        while size <= args.max_size:
+            text = build(size)
+            legacy = time_call(legacy_requirements, text, args.repeat) if size <= args.legacy_max_size else None
+            scanner = time_call(generator.analyze_problem_requirements, text, args.repeat)
+            growth = f"{scanner / previous:.2f}" if previous else '-'
+            legacy_cell = f"{legacy:>10.4f}" if legacy is not None else f"{'skipped':>10}"
+            print(f"{label:<26} {size:>7} {legacy_cell} {scanner:>10.4f} {growth:>10}")
+            previous = scanner
+            size *= 2
+    print("-"*78)
+    print("scanner x: time relative to the half-size input (about 2 = linear, 4 = quadratic)")
+    print("="*78 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ Generates detailed solutions for each problem independently
 import os
 from pathlib import Path
 
+from solution_templates import shared_template
+
 
 class AdvancedSolutionGenerator:
     """Generates comprehensive step-by-step solutions for individual problems"""
@@ -33,10 +35,15 @@ class AdvancedSolutionGenerator:
     
     def solve_generic(self, num, text, ptype):
         """Generic problem solver"""
+        return self._generic_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _generic_template(self):
+        """Shared body of every generic solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -81,10 +88,15 @@ class AdvancedSolutionGenerator:
     
     def solve_calculus(self, num, text, ptype):
         """Calculus problem solver"""
+        return self._calculus_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _calculus_template(self):
+        """Shared body of every calculus solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -130,10 +142,15 @@ class AdvancedSolutionGenerator:
     
     def solve_algebra(self, num, text, ptype):
         """Algebra problem solver"""
+        return self._algebra_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _algebra_template(self):
+        """Shared body of every algebra solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -179,10 +196,15 @@ class AdvancedSolutionGenerator:
     
     def solve_physics(self, num, text, ptype):
         """Physics problem solver"""
+        return self._physics_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _physics_template(self):
+        """Shared body of every physics solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -229,10 +251,15 @@ class AdvancedSolutionGenerator:
     
     def solve_chemistry(self, num, text, ptype):
         """Chemistry problem solver"""
+        return self._chemistry_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _chemistry_template(self):
+        """Shared body of every chemistry solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -279,10 +306,15 @@ class AdvancedSolutionGenerator:
     
     def solve_geometry(self, num, text, ptype):
         """Geometry problem solver"""
+        return self._geometry_template().render(number=num, type=ptype, problem=text)
+    
+    @shared_template
+    def _geometry_template(self):
+        """Shared body of every geometry solution"""
         return {
-            'number': num,
-            'type': ptype,
-            'problem': text,
+            'number': None,
+            'type': None,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
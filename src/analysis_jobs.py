@@ -0,0 +1,385 @@
+"""
+Background analysis jobs for the AI Homework Analyzer.
+A ``JobQueue`` runs long analyses on a bounded pool of worker threads so a
+web worker can answer ``202 Accepted`` at once. Job status, progress and
+results live in a job store: ``JobStore`` keeps them in this process, and
+``SqliteJobStore`` keeps them in a local database that every web worker on
+the host can read, so a poll may land on any of them. Queued and running
+jobs carry their owner's pid and a heartbeat, so the jobs of a worker that
+died or was recycled stop looking active.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED = (DONE, FAILED)
+
+
+class QueueFull(Exception):
+	"""Raised by :meth:`JobQueue.submit` when every slot is taken."""
+
+
+class JobStore:
+	"""In-process job records and results.
+
+	A record is a JSON-compatible dict with ``id``, ``status``, ``stage``,
+	``progress``, ``error`` and timestamps, plus an optional
+	``content_key`` naming the input so a later request for the same input
+	can find the job. Finished jobs are forgotten ``ttl`` seconds after
+	they finish.
+
+	An unfinished job is stale once its ``heartbeat`` is ``stale_after``
+	seconds old or its ``owner`` process is gone: :meth:`find_active`
+	skips it and :meth:`expire` marks it failed.
+	"""
+
+	def __init__(self, ttl: float = 3600, stale_after: float = 120):
+		self.ttl = ttl
+		self.stale_after = stale_after
+		self._jobs: Dict[str, Dict[str, Any]] = {}
+		self._results: Dict[str, Any] = {}
+		self._lock = threading.Lock()
+
+	def create(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+		job = _new_record(job_id, fields)
+		with self._lock:
+			self._jobs[job_id] = job
+		return dict(job)
+
+	def update(self, job_id: str, **fields: Any) -> None:
+		with self._lock:
+			if job_id in self._jobs:
+				self._jobs[job_id].update(fields)
+
+	def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			job = self._jobs.get(job_id)
+			return dict(job) if job is not None else None
+
+	def find_active(self, content_key: str) -> Optional[Dict[str, Any]]:
+		"""The newest queued or running job for ``content_key`` that is not stale, if any."""
+
+		now = time.time()
+		with self._lock:
+			active = [
+				job for job in self._jobs.values()
+				if job.get("content_key") == content_key and job["status"] not in FINISHED and not self.is_stale(job, now)
+			]
+		return dict(max(active, key=lambda job: job["created"])) if active else None
+
+	def touch(self, job_ids: Iterable[str]) -> None:
+		"""Record a heartbeat for jobs this process is still working on."""
+
+		now = time.time()
+		with self._lock:
+			for job_id in job_ids:
+				if job_id in self._jobs:
+					self._jobs[job_id]["heartbeat"] = now
+
+	def is_stale(self, job: Dict[str, Any], now: Optional[float] = None) -> bool:
+		"""Whether an unfinished job has lost its worker."""
+
+		if job["status"] in FINISHED:
+			return False
+		heartbeat = job.get("heartbeat") or job["created"]
+		return (now or time.time()) - heartbeat > self.stale_after or not _process_alive(job.get("owner"))
+
+	def put_result(self, job_id: str, result: Any) -> None:
+		with self._lock:
+			self._results[job_id] = result
+
+	def get_result(self, job_id: str) -> Any:
+		with self._lock:
+			return self._results.get(job_id)
+
+	def expire(self, now: Optional[float] = None) -> int:
+		"""Fail stale jobs and drop finished ones older than ``ttl``; returns how many were dropped."""
+
+		now = now or time.time()
+		cutoff = now - self.ttl
+		with self._lock:
+			for job in self._jobs.values():
+				if self.is_stale(job, now):
+					job.update(_abandoned(now))
+			old = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED and job["finished"] < cutoff]
+			for job_id in old:
+				del self._jobs[job_id]
+				self._results.pop(job_id, None)
+		return len(old)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+	id TEXT PRIMARY KEY,
+	record TEXT NOT NULL,
+	result TEXT,
+	status TEXT NOT NULL,
+	content_key TEXT,
+	created REAL NOT NULL,
+	finished REAL
+)
+"""
+
+# Columns added after the first release; a jobs database written by an
+# older version gets them on open
+_ADDED_COLUMNS = (
+	("content_key", "TEXT"),
+	("created", "REAL NOT NULL DEFAULT 0"),
+)
+
+
+class SqliteJobStore(JobStore):
+	"""Job records and results in a local SQLite file shared by all web workers.
+
+	Jobs still run in the worker that accepted them; the database only makes
+	their status and results visible to the others.
+	"""
+
+	def __init__(self, path: str, ttl: float = 3600, stale_after: float = 120):
+		super().__init__(ttl, stale_after)
+		self.path = path
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		with self._connect() as conn:
+			conn.executescript(_SCHEMA)
+			columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+			for name, definition in _ADDED_COLUMNS:
+				if name not in columns:
+					conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+			conn.execute("CREATE INDEX IF NOT EXISTS jobs_content_key ON jobs (content_key)")
+
+	@contextmanager
+	def _connect(self) -> Iterator[sqlite3.Connection]:
+		conn = sqlite3.connect(self.path, timeout=30)
+		try:
+			with conn:
+				yield conn
+		finally:
+			conn.close()
+
+	def create(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+		job = _new_record(job_id, fields)
+		with self._connect() as conn:
+			conn.execute(
+				"INSERT INTO jobs (id, record, status, content_key, created) VALUES (?, ?, ?, ?, ?)",
+				(job_id, json.dumps(job), job["status"], job.get("content_key"), job["created"]),
+			)
+		return job
+
+	def update(self, job_id: str, **fields: Any) -> None:
+		# Read-modify-write under an immediate transaction so concurrent
+		# progress updates from one job cannot interleave
+		with self._connect() as conn:
+			conn.execute("BEGIN IMMEDIATE")
+			row = conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+			if row is None:
+				return
+			job = json.loads(row[0])
+			job.update(fields)
+			conn.execute(
+				"UPDATE jobs SET record = ?, status = ?, finished = ? WHERE id = ?",
+				(json.dumps(job), job["status"], job.get("finished"), job_id),
+			)
+
+	def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+		with self._connect() as conn:
+			row = conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+		return json.loads(row[0]) if row is not None else None
+
+	def find_active(self, content_key: str) -> Optional[Dict[str, Any]]:
+		now = time.time()
+		with self._connect() as conn:
+			rows = conn.execute(
+				"SELECT record FROM jobs WHERE content_key = ? AND status NOT IN (?, ?) ORDER BY created DESC",
+				(content_key, DONE, FAILED),
+			).fetchall()
+		for (record,) in rows:
+			job = json.loads(record)
+			if not self.is_stale(job, now):
+				return job
+		return None
+
+	def touch(self, job_ids: Iterable[str]) -> None:
+		for job_id in job_ids:
+			self.update(job_id, heartbeat=time.time())
+
+	def put_result(self, job_id: str, result: Any) -> None:
+		with self._connect() as conn:
+			conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(result), job_id))
+
+	def get_result(self, job_id: str) -> Any:
+		with self._connect() as conn:
+			row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+		return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+	def expire(self, now: Optional[float] = None) -> int:
+		now = now or time.time()
+		cutoff = now - self.ttl
+		with self._connect() as conn:
+			conn.execute("BEGIN IMMEDIATE")
+			for job_id, record in conn.execute(
+				"SELECT id, record FROM jobs WHERE status NOT IN (?, ?)", (DONE, FAILED)
+			).fetchall():
+				job = json.loads(record)
+				if self.is_stale(job, now):
+					job.update(_abandoned(now))
+					conn.execute(
+						"UPDATE jobs SET record = ?, status = ?, finished = ? WHERE id = ?",
+						(json.dumps(job), job["status"], job["finished"], job_id),
+					)
+			cursor = conn.execute(
+				"DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+				(DONE, FAILED, cutoff),
+			)
+			return cursor.rowcount
+
+
+def _new_record(job_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+	now = time.time()
+	job = {
+		"id": job_id,
+		"status": QUEUED,
+		"stage": QUEUED,
+		"progress": None,
+		"error": None,
+		"created": now,
+		"started": None,
+		"finished": None,
+		"owner": os.getpid(),
+		"heartbeat": now,
+	}
+	job.update(fields)
+	return job
+
+
+def _abandoned(now: float) -> Dict[str, Any]:
+	"""Fields that close a job whose worker stopped before finishing it."""
+
+	return {"status": FAILED, "stage": FAILED, "error": "The worker running this job stopped", "http_status": 500, "finished": now}
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+	"""Whether a process on this host still runs (unknown counts as alive)."""
+
+	# On Windows os.kill(pid, 0) would terminate the process; rely on the
+	# heartbeat there
+	if pid is None or pid == os.getpid() or os.name != "posix":
+		return True
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except OSError:
+		pass
+	return True
+
+
+class JobQueue:
+	"""A bounded pool of worker threads that runs jobs and records their outcome.
+
+	At most ``workers`` jobs run at once and at most ``max_pending`` are
+	accepted (running or waiting); beyond that :meth:`submit` raises
+	:class:`QueueFull` so the caller can ask the client to retry. Every
+	``heartbeat_interval`` seconds one thread touches the heartbeat of the
+	jobs this process still owns; keep it well under the store's
+	``stale_after``.
+	"""
+
+	def __init__(self, store: JobStore, workers: int = 2, max_pending: int = 16, heartbeat_interval: float = 30):
+		self.store = store
+		self.workers = workers
+		self.max_pending = max_pending
+		self.heartbeat_interval = heartbeat_interval
+		self._slots = threading.BoundedSemaphore(max_pending)
+		self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+		self._owned: Set[str] = set()
+		self._owned_lock = threading.Lock()
+		self._heartbeat: Optional[threading.Thread] = None
+
+	def submit(self, func: Callable[..., Any], *args: Any, job_id: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+		"""Queue ``func(*args, progress=...)`` and return the new job record.
+
+		``func`` reports progress by calling ``progress(stage, done, total)``
+		and returns the job's result. A result of ``(value, status)`` with an
+		error status (400 or more) marks the job failed with that status.
+		``job_id`` lets the caller name the job after artifacts it already
+		created; a random one is used otherwise.
+		"""
+
+		if not self._slots.acquire(blocking=False):
+			raise QueueFull(f"{self.max_pending} analyses are already queued or running")
+
+		self.store.expire()
+		job_id = job_id or uuid.uuid4().hex
+		try:
+			job = self.store.create(job_id, **fields)
+			with self._owned_lock:
+				self._owned.add(job_id)
+				self._ensure_heartbeat()
+			self._executor.submit(self._run, job_id, func, args)
+		except Exception:
+			with self._owned_lock:
+				self._owned.discard(job_id)
+			self._slots.release()
+			raise
+		return job
+
+	def _ensure_heartbeat(self) -> None:
+		# Threads do not survive a fork, so a worker forked after the queue
+		# was built starts its own (called with _owned_lock held)
+		if self._heartbeat is None or not self._heartbeat.is_alive():
+			self._heartbeat = threading.Thread(target=self._beat, name="analysis-job-heartbeat", daemon=True)
+			self._heartbeat.start()
+
+	def _beat(self) -> None:
+		while True:
+			time.sleep(self.heartbeat_interval)
+			with self._owned_lock:
+				job_ids = list(self._owned)
+			if job_ids:
+				try:
+					self.store.touch(job_ids)
+				except Exception:
+					pass  # a missed beat is retried next interval
+
+	def _run(self, job_id: str, func: Callable[..., Any], args: tuple) -> None:
+		def progress(stage: str, done: Optional[int] = None, total: Optional[int] = None) -> None:
+			self.store.update(job_id, stage=stage, progress={"done": done, "total": total} if total else None, heartbeat=time.time())
+
+		try:
+			now = time.time()
+			self.store.update(job_id, status=RUNNING, stage=RUNNING, started=now, heartbeat=now)
+			result = func(*args, progress=progress)
+			status = 200
+			if isinstance(result, tuple):
+				result, status = result
+			self.store.put_result(job_id, result)
+			if status >= 400:
+				error = result.get("error") if isinstance(result, dict) else None
+				outcome = {"status": FAILED, "error": error or "Analysis failed"}
+			else:
+				outcome = {"status": DONE}
+		except Exception as e:
+			outcome = {"status": FAILED, "error": str(e)}
+			status = 500
+		finally:
+			# Free the slot first, so a client that sees the job finished
+			# can always submit the next one
+			self._slots.release()
+		self.store.update(job_id, stage=outcome["status"], http_status=status, finished=time.time(), **outcome)
+		with self._owned_lock:
+			self._owned.discard(job_id)
@@ -0,0 +1,309 @@
+"""
+Scheduled deletion of generated artifacts for the AI Homework Analyzer.
+Uploads and chart directories are deleted a fixed time after they are made.
+An ``ArtifactReaper`` keeps every pending deletion in a min-heap ordered by
+expiry and runs one thread that sleeps until the earliest one is due. The
+schedule is mirrored in a small SQLite manifest, so deletions still happen
+after a restart. The reaper can also enforce a disk quota by deleting the
+oldest artifacts early, skipping the ones a running analysis holds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - Windows: holds are seen by this process only
+	fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+	path TEXT PRIMARY KEY,
+	expires REAL NOT NULL,
+	created REAL NOT NULL
+)
+"""
+
+
+def disk_usage(path: str) -> int:
+	"""Bytes used by a file, or by every file under a directory."""
+
+	if os.path.isdir(path):
+		total = 0
+		for root, _, files in os.walk(path):
+			for name in files:
+				try:
+					total += os.path.getsize(os.path.join(root, name))
+				except OSError:
+					pass
+		return total
+	try:
+		return os.path.getsize(path)
+	except OSError:
+		return 0
+
+
+def remove_path(path: str) -> None:
+	"""Delete a file or a directory tree; a path that is already gone is fine."""
+
+	if os.path.isdir(path):
+		shutil.rmtree(path, ignore_errors=True)
+	elif os.path.exists(path):
+		os.remove(path)
+
+
+class ArtifactReaper:
+	"""One background thread that deletes artifacts when they expire.
+
+	``quota_bytes`` caps the total size of the scheduled artifacts; over it,
+	the oldest are deleted before they expire, checked every
+	``check_interval`` seconds. Artifacts younger than ``min_age`` seconds
+	and paths under a :meth:`hold` are never evicted, so a run still writing
+	its charts keeps them.
+	"""
+
+	def __init__(self, manifest_path: str, quota_bytes: Optional[int] = None, check_interval: float = 60.0, min_age: float = 60.0):
+		self.manifest_path = manifest_path
+		self.quota_bytes = quota_bytes
+		self.check_interval = check_interval
+		self.min_age = min_age
+		self.deleted = 0
+		self.evicted = 0
+
+		self._heap: List[Tuple[float, str]] = []
+		# Latest expiry per path; heap entries that disagree are stale
+		self._expiry: Dict[str, float] = {}
+		self._wake = threading.Condition()
+		self._quota_lock = threading.Lock()
+		self._held: Dict[str, int] = {}
+		self._held_lock = threading.Lock()
+		self.hold_dir = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), "held")
+		self._thread: Optional[threading.Thread] = None
+		self._pid: Optional[int] = None
+		self._stopping = False
+
+		os.makedirs(self.hold_dir, exist_ok=True)
+		with self._connect() as conn:
+			conn.executescript(_SCHEMA)
+		self._load()
+
+	@contextmanager
+	def _connect(self) -> Iterator[sqlite3.Connection]:
+		conn = sqlite3.connect(self.manifest_path, timeout=30)
+		try:
+			with conn:
+				yield conn
+		finally:
+			conn.close()
+
+	def _load(self) -> None:
+		"""Rebuild the heap from the manifest (at startup, or after a fork)."""
+
+		with self._connect() as conn:
+			rows = conn.execute("SELECT path, expires FROM artifacts").fetchall()
+		with self._wake:
+			self._expiry = dict(rows)
+			self._heap = [(expires, path) for path, expires in rows]
+			heapq.heapify(self._heap)
+
+	def schedule(self, path: str, delay: float) -> None:
+		"""Delete ``path`` (a file or directory) ``delay`` seconds from now.
+
+		Scheduling a path again moves its expiry.
+		"""
+
+		self._ensure_thread()
+		now = time.time()
+		expires = now + delay
+		path = os.path.abspath(path)
+		with self._connect() as conn:
+			conn.execute(
+				"INSERT INTO artifacts (path, expires, created) VALUES (?, ?, ?) "
+				"ON CONFLICT(path) DO UPDATE SET expires = excluded.expires",
+				(path, expires, now),
+			)
+		with self._wake:
+			self._expiry[path] = expires
+			heapq.heappush(self._heap, (expires, path))
+			self._wake.notify()
+
+	@contextmanager
+	def hold(self, path: str) -> Iterator[None]:
+		"""Keep ``path`` from being evicted for the quota while the block runs.
+
+		The hold is a shared lock on a file in ``hold_dir``, so the reapers
+		of other worker processes sharing the manifest respect it too, and it
+		ends with the holding process if that dies.
+		"""
+
+		path = os.path.abspath(path)
+		with self._held_lock:
+			self._held[path] = self._held.get(path, 0) + 1
+		fd = None
+		try:
+			if fcntl is not None:
+				fd = os.open(self._hold_file(path), os.O_RDWR | os.O_CREAT, 0o600)
+				fcntl.flock(fd, fcntl.LOCK_SH)
+			yield
+		finally:
+			if fd is not None:
+				fcntl.flock(fd, fcntl.LOCK_UN)
+				os.close(fd)
+			with self._held_lock:
+				self._held[path] -= 1
+				if not self._held[path]:
+					del self._held[path]
+
+	def is_held(self, path: str) -> bool:
+		"""Whether any process holds ``path`` (see :meth:`hold`)."""
+
+		path = os.path.abspath(path)
+		with self._held_lock:
+			if path in self._held:
+				return True
+		if fcntl is None:
+			return False
+
+		try:
+			fd = os.open(self._hold_file(path), os.O_RDWR)
+		except FileNotFoundError:
+			return False
+		try:
+			fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+		except BlockingIOError:
+			return True
+		else:
+			fcntl.flock(fd, fcntl.LOCK_UN)
+			return False
+		finally:
+			os.close(fd)
+
+	def _hold_file(self, path: str) -> str:
+		return os.path.join(self.hold_dir, hashlib.sha256(path.encode("utf-8")).hexdigest() + ".lock")
+
+	def pending(self) -> int:
+		"""Number of artifacts waiting for deletion."""
+
+		with self._connect() as conn:
+			return conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+
+	def reap(self, now: Optional[float] = None) -> int:
+		"""Delete every artifact whose expiry has passed; returns how many."""
+
+		now = now or time.time()
+		due = []
+		with self._wake:
+			while self._heap and self._heap[0][0] <= now:
+				expires, path = heapq.heappop(self._heap)
+				if self._expiry.get(path) == expires:
+					del self._expiry[path]
+					due.append(path)
+		for path in due:
+			self._delete(path)
+		self.deleted += len(due)
+		return len(due)
+
+	def enforce_quota(self, now: Optional[float] = None) -> int:
+		"""Delete the oldest artifacts until the scheduled ones fit the quota.
+
+		Returns how many were evicted.
+		"""
+
+		if self.quota_bytes is None:
+			return 0
+
+		now = now or time.time()
+		evicted = 0
+		with self._quota_lock:
+			with self._connect() as conn:
+				rows = conn.execute("SELECT path, created FROM artifacts ORDER BY created ASC").fetchall()
+			sizes = [disk_usage(path) for path, _ in rows]
+			total = sum(sizes)
+
+			for (path, created), size in zip(rows, sizes):
+				if total <= self.quota_bytes or now - created < self.min_age:
+					break
+				if self.is_held(path):
+					# Still being written; the next oldest goes instead
+					continue
+				with self._wake:
+					self._expiry.pop(path, None)
+				self._delete(path)
+				total -= size
+				evicted += 1
+		if evicted:
+			logger.warning(f"Artifact quota exceeded: evicted {evicted} artifacts early")
+		self.evicted += evicted
+		return evicted
+
+	def _delete(self, path: str) -> None:
+		try:
+			remove_path(path)
+			if not self.is_held(path):
+				remove_path(self._hold_file(path))
+		except OSError as e:
+			logger.warning(f"Failed to delete {path}: {e}")
+		with self._connect() as conn:
+			conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+
+	def _ensure_thread(self) -> None:
+		if self._pid is not None and self._pid != os.getpid():
+			# Threads and held locks do not survive fork(): a forked web
+			# worker starts afresh from the manifest
+			self._wake = threading.Condition()
+			self._thread = None
+			self._pid = None
+			self._load()
+		with self._wake:
+			if self._thread is not None and self._thread.is_alive():
+				return
+			self._stopping = False
+			self._pid = os.getpid()
+			self._thread = threading.Thread(target=self._run, name="artifact-reaper", daemon=True)
+			self._thread.start()
+
+	def start(self) -> None:
+		"""Start the reaper thread now instead of on the first :meth:`schedule`."""
+
+		self._ensure_thread()
+
+	def stop(self, timeout: Optional[float] = None) -> None:
+		with self._wake:
+			self._stopping = True
+			self._wake.notify()
+		if self._thread is not None:
+			self._thread.join(timeout)
+
+	def _run(self) -> None:
+		# The quota check measures every scheduled artifact on disk, so it
+		# runs once per check_interval, not on each wake from schedule()
+		next_quota = time.time()
+		while True:
+			with self._wake:
+				if self._stopping:
+					return
+				timeout = max(0.0, next_quota - time.time())
+				if self._heap:
+					timeout = min(timeout, max(0.0, self._heap[0][0] - time.time()))
+				self._wake.wait(timeout)
+				if self._stopping:
+					return
+			try:
+				self.reap()
+				if time.time() >= next_quota:
+					next_quota = time.time() + self.check_interval
+					self.enforce_quota()
+			except Exception as e:
+				logger.warning(f"Artifact reaper error: {e}")
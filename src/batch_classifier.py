@@ -0,0 +1,145 @@
+"""
+Batch problem-type scoring for the AI Homework Analyzer.
+Classifies many problem texts at once against both taxonomies: the analyzer
+categories (``PROBLEM_KEYWORDS``) and the solver's detected types
+(``PROBLEM_PATTERNS``). Each text is walked once per taxonomy to collect
+term hits, and a single matrix multiply turns term counts into category
+scores for the whole batch.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+	import numpy as np
+except Exception:  # pragma: no cover - optional dependency, ships with matplotlib
+	np = None
+
+from detailed_solver import PROBLEM_PATTERNS
+from homework_solver import PROBLEM_KEYWORDS
+from keyword_automaton import KeywordAutomaton, expand_pattern, fold_text
+
+
+class _Taxonomy:
+	"""One label set: a term automaton plus its term-by-category incidence."""
+
+	def __init__(self, keyword_map: Sequence[Tuple[str, Sequence[str]]], fold: bool, default: str):
+		self.categories = [category for category, _ in keyword_map]
+		self.default = default
+
+		normalize = fold_text if fold else str.lower
+		term_index: Dict[str, int] = {}
+		rows: List[int] = []
+		cols: List[int] = []
+		for col, (_, keywords) in enumerate(keyword_map):
+			for term in {normalize(keyword) for keyword in keywords}:
+				rows.append(term_index.setdefault(term, len(term_index)))
+				cols.append(col)
+
+		# Sparse (coordinate) term x category incidence; densified once for
+		# the matrix multiply since it is only a few hundred by a few dozen.
+		self.terms = list(term_index)
+		self.automaton = KeywordAutomaton([(term, [term]) for term in self.terms], fold=fold)
+		self.weights = np.zeros((len(self.terms), len(self.categories)), dtype=np.float32)
+		self.weights[rows, cols] = 1.0
+
+	def term_counts(self, texts: Sequence[str]) -> "np.ndarray":
+		rows: List[int] = []
+		cols: List[int] = []
+		for row, text in enumerate(texts):
+			hits = self.automaton.term_hits(text)
+			rows.extend([row] * len(hits))
+			cols.extend(hits)
+		counts = np.zeros((len(texts), len(self.terms)), dtype=np.float32)
+		np.add.at(counts, (rows, cols), 1.0)
+		return counts
+
+	def rank(self, scores: "np.ndarray", top_k: int) -> Tuple[List[str], List[List[Tuple[str, int]]]]:
+		"""Return the single-problem label and the top-k ``(category, score)`` per row.
+
+		Ties keep category priority order (stable sort), and the label is the
+		first category with any hit, as in the single-problem classifiers.
+		"""
+
+		categories = self.categories
+		first = np.argmax(scores > 0, axis=1).tolist()
+		matched = (scores > 0).any(axis=1).tolist()
+		labels = [categories[col] if any_hit else self.default for col, any_hit in zip(first, matched)]
+
+		order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+		top = np.take_along_axis(scores, order, axis=1).astype(int).tolist()
+		ranked = [
+			[(categories[col], score) for col, score in zip(cols, row_scores) if score > 0]
+			for cols, row_scores in zip(order.tolist(), top)
+		]
+		return labels, ranked
+
+
+class BatchClassifier:
+	"""Vectorized counterpart of ``identify_problem_type`` and ``detect_problem_type``."""
+
+	def __init__(
+		self,
+		keyword_map: Sequence[Tuple[str, Sequence[str]]] = PROBLEM_KEYWORDS,
+		pattern_map: Optional[Dict[str, str]] = None,
+	):
+		if np is None:
+			raise ImportError("numpy is required for batch classification")
+
+		pattern_map = PROBLEM_PATTERNS if pattern_map is None else pattern_map
+		self.types = _Taxonomy(keyword_map, fold=True, default="other")
+		self.detected_types = _Taxonomy(
+			[(name, expand_pattern(pattern)) for name, pattern in pattern_map.items()],
+			fold=False,
+			default="general",
+		)
+
+		# Both taxonomies share one block-diagonal weight matrix, so a batch is
+		# scored with a single multiply.
+		self.weights = np.zeros(
+			(len(self.types.terms) + len(self.detected_types.terms), len(self.types.categories) + len(self.detected_types.categories)),
+			dtype=np.float32,
+		)
+		self.weights[:len(self.types.terms), :len(self.types.categories)] = self.types.weights
+		self.weights[len(self.types.terms):, len(self.types.categories):] = self.detected_types.weights
+
+	def classify(self, texts: Sequence[str], top_k: int = 3) -> List[Dict[str, Any]]:
+		"""Score ``texts`` and return one result dict per text.
+
+		Each result has ``type`` and ``detected_type`` (identical to the
+		single-problem classifiers) plus ``type_scores`` and
+		``detected_type_scores``: up to ``top_k`` ``(category, hits)`` pairs,
+		highest first, ties in the single-problem priority order.
+		"""
+
+		if not texts:
+			return []
+
+		counts = np.hstack([self.types.term_counts(texts), self.detected_types.term_counts(texts)])
+		scores = counts @ self.weights
+		split = len(self.types.categories)
+		types, type_scores = self.types.rank(scores[:, :split], top_k)
+		detected, detected_scores = self.detected_types.rank(scores[:, split:], top_k)
+
+		return [
+			{
+				"type": types[row],
+				"type_scores": type_scores[row],
+				"detected_type": detected[row],
+				"detected_type_scores": detected_scores[row],
+			}
+			for row in range(len(texts))
+		]
+
+
+_DEFAULT_CLASSIFIER: Optional[BatchClassifier] = None
+
+
+def classify_batch(texts: Sequence[str], top_k: int = 3) -> List[Dict[str, Any]]:
+	"""Classify many problem texts at once with the default keyword tables."""
+
+	global _DEFAULT_CLASSIFIER
+	if _DEFAULT_CLASSIFIER is None:
+		_DEFAULT_CLASSIFIER = BatchClassifier()
+	return _DEFAULT_CLASSIFIER.classify(texts, top_k)
@@ -0,0 +1,124 @@
+"""
+Template-deduplicated JSON for analysis reports.
+Solutions of one type share multi-KB explanation blocks (see
+``solution_templates``). The compact format sends each repeated block once in
+a ``templates`` table, and every place that used it holds a
+``{"$t": <index>}`` reference instead. :func:`expand_tree` (and the
+``rehydrate`` helper in ``static/js/report_client.js``) restores the
+original structure.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+TEMPLATE_REF = "$t"
+
+# Shorter strings cost less inline than as a reference.
+MIN_BLOCK_CHARS = 64
+
+
+class _TemplateTable:
+	"""Two passes over a tree: count repeated blocks, then encode with references.
+
+	Every string and container is hash-consed to a node id, so equal blocks
+	share a node whether they are the same object (rendered solutions share
+	their template's nested objects) or equal copies (translated solutions).
+	"""
+
+	def __init__(self, min_chars: int):
+		self.min_chars = min_chars
+		self.templates: List[Any] = []
+		self._nodes: Dict[Tuple, int] = {}
+		self._sizes: List[int] = []
+		self._counts: Counter = Counter()
+		self._by_id: Dict[int, int] = {}
+		self._template_ids: Dict[int, int] = {}
+
+	def count(self, value: Any) -> int:
+		"""Return the node of ``value``, counting one more occurrence of it."""
+
+		if isinstance(value, (dict, list, tuple)):
+			node = self._by_id.get(id(value))
+			if node is None:
+				if isinstance(value, dict):
+					children = tuple((key, self.count(item)) for key, item in value.items())
+					size = sum(len(key) + self._sizes[child] for key, child in children)
+					node = self._node(("d", children), size)
+				else:
+					children = tuple(self.count(item) for item in value)
+					node = self._node(("l", children), sum(self._sizes[child] for child in children))
+				self._by_id[id(value)] = node
+		elif isinstance(value, str):
+			node = self._node(("s", value), len(value))
+		else:
+			# Scalars are never templates; type keeps 1, 1.0 and True apart
+			node = self._node(("v", type(value).__name__, value), 0)
+		self._counts[node] += 1
+		return node
+
+	def _node(self, key: Tuple, size: int) -> int:
+		node = self._nodes.get(key)
+		if node is None:
+			node = self._nodes[key] = len(self._sizes)
+			self._sizes.append(size)
+		return node
+
+	def encode(self, value: Any) -> Any:
+		if isinstance(value, (dict, list, tuple)):
+			node = self._by_id[id(value)]
+		elif isinstance(value, str):
+			node = self._nodes[("s", value)]
+		else:
+			return value
+
+		if self._counts[node] < 2 or self._sizes[node] < self.min_chars:
+			return self._encode_items(value)
+		index = self._template_ids.get(node)
+		if index is None:
+			index = self._template_ids[node] = len(self.templates)
+			self.templates.append(None)
+			self.templates[index] = self._encode_items(value)
+		return {TEMPLATE_REF: index}
+
+	def _encode_items(self, value: Any) -> Any:
+		if isinstance(value, str):
+			return value
+		if isinstance(value, dict):
+			return {key: self.encode(item) for key, item in value.items()}
+		return [self.encode(item) for item in value]
+
+
+def compact_tree(value: Any, min_chars: int = MIN_BLOCK_CHARS) -> Tuple[List[Any], Any]:
+	"""Return ``(templates, encoded)`` for a JSON-compatible ``value``.
+
+	Strings, dicts and lists of at least ``min_chars`` characters of content
+	that occur more than once become entries of ``templates``. Templates may
+	refer to other templates.
+	"""
+
+	table = _TemplateTable(min_chars)
+	table.count(value)
+	encoded = table.encode(value)
+	return table.templates, encoded
+
+
+def expand_tree(templates: List[Any], value: Any) -> Any:
+	"""Inverse of :func:`compact_tree`."""
+
+	resolved: Dict[int, Any] = {}
+
+	def expand(item: Any) -> Any:
+		if isinstance(item, list):
+			return [expand(child) for child in item]
+		if isinstance(item, dict):
+			if len(item) == 1 and TEMPLATE_REF in item:
+				index = item[TEMPLATE_REF]
+				if index not in resolved:
+					resolved[index] = expand(templates[index])
+				return resolved[index]
+			return {key: expand(child) for key, child in item.items()}
+		return item
+
+	return expand(value)
@@ -4,6 +4,11 @@ Provides comprehensive solutions with full reasoning and worked examples
 """
 
 import re
+from itertools import islice
+
+from keyword_automaton import KeywordAutomaton, expand_pattern
+from problem_features import SPANISH_MARKERS, problem_features
+from solution_templates import shared_template
 
 try:
   from googletrans import Translator
@@ -16,16 +21,20 @@ except Exception:  # pragma: no cover - optional dependency
   detect = None
   LangDetectException = Exception
 
+# Version of the solution templates and report layout. It is part of the
+# report cache key, so bump it whenever generated reports change.
+REPORT_VERSION = "1"
+
+
+def report_language():
+    """Language mode of generated reports: whether solutions are translated and how language is detected"""
+    return f"{'translate' if Translator else 'en'}:{'langdetect' if detect else 'markers'}"
+
 
 class _LanguageSupport:
     """Lightweight language detection and translation wrapper."""
 
-    _SPANISH_MARKERS = {
-        'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'y', 'o', 'pero',
-        'porque', 'para', 'con', 'sin', 'sobre', 'entre', 'dado', 'dada', 'dados',
-        'dadas', 'encuentra', 'calcula', 'determina', 'resuelve', 'resolver',
-        'hallar', 'problema', 'ejercicio', 'pregunta', 'si', 'entonces', 'donde'
-    }
+    _SPANISH_MARKERS = SPANISH_MARKERS
 
     def __init__(self):
         self._translator = Translator() if Translator else None
@@ -34,18 +43,27 @@ class _LanguageSupport:
     def detect_language(self, text):
         if not text:
             return 'es'
+        features = problem_features(text)
+        if features.language is None:
+            features.language = self._detect_language(features)
+        return features.language
+
+    def _detect_language(self, features):
         if detect is not None:
             try:
-                detected = detect(text)
+                detected = detect(features.text)
                 if detected:
                     return detected
             except LangDetectException:
                 return 'es'
-        text_lower = text.lower()
-        if re.search(r'[áéíóúñ¿¡]', text_lower):
+        hints = features.language_hints
+        if hints['spanish_chars']:
             return 'es'
-        hits = sum(1 for marker in self._SPANISH_MARKERS if marker in text_lower)
-        return 'es' if hits >= 2 else 'en'
+        return 'es' if hints['spanish_markers'] >= 2 else 'en'
+
+    @property
+    def can_translate(self):
+        return self._translator is not None
 
     def translate_text(self, text, target_lang):
         if not text or target_lang == 'en':
@@ -82,22 +100,91 @@ def _translate_value(value, translator, target_lang, skip_keys=None):
     return value
 
 
+# Detected problem types in priority order; detect_problem_type() returns the
+# first one whose pattern matches the lowercased text.
+PROBLEM_PATTERNS = {
+    'derivative': r'(deriv|d/d|prime|slope|derivada|derivar)',
+    'integral': r'(integr|∫|sum|integral)',
+    'limit': r'(limit|lim|approaches|→|limite|l[íi]mite|tiende)',
+    'equation': r'(solve|find|equation|=|resolver|resuelve|ecuaci[óo]n)',
+    'simplify': r'(simplify|reduce|factor|simplificar|reducir|factorizar)',
+    'geometry': r'(area|[áa]rea|volume|volumen|perimeter|per[ií]metro|angle|[áa]ngulo|triangle|tri[aá]ngulo|circle|c[ií]rculo)',
+    'force': r'(force|newton|acceleration|aceleraci[óo]n|F=ma|fuerza)',
+    'energy': r'(energy|work|kinetic|potential|energ[ií]a|trabajo|cin[eé]tica|potencial)',
+    'chemistry': r'(stoich|balance|react|mole|qu[ií]mica|reacci[óo]n|mol)',
+    'algebra': r'(quadratic|linear|factor|solve|[aá]lgebra|polynomial|polinomio|ecuaci[óo]n)'
+}
+
+_PATTERN_AUTOMATON = KeywordAutomaton(
+    [(ptype, expand_pattern(pattern)) for ptype, pattern in PROBLEM_PATTERNS.items()], fold=False
+)
+
+# Substring cues read by analyze_problem_requirements(), in report order.
+_OBJECTIVE_CUES = KeywordAutomaton([
+    ('Optimization (max/min)', ['maximize', 'minimize']),
+    ('Proof/Verification', ['prove', 'show', 'verify', 'demonstrate']),
+    ('Comparison', ['compare', 'contrast', 'difference']),
+    ('Approximation/Error Analysis', ['error', 'approximate', 'estimate']),
+], fold=False)
+_GIVEN_CUES = KeywordAutomaton([
+    ('given', ['given']),
+    ('dado', ['dado', 'dada', 'dados', 'dadas']),
+], fold=False)
+
+# Requirement extraction runs over long, often period-free pdfplumber blocks,
+# so every pattern below is linear in the text: no lazy prefix that restarts
+# at each offset, no two adjacent whitespace quantifiers, and number runs are
+# only tried from their first character.
+_QUESTION_LEADS = [
+    re.compile(r'(?:find|calculate|determine|solve for|compute)\s+([^\.\n?,]+)'),
+    re.compile(r'(?:encuentra|hallar|calcular|determinar|resuelve|resolver)\s+([^\.\n?,]+)'),
+]
+_QUESTION_CUES = [
+    re.compile(r'find|calculate|determine|solve|is|are|given'),
+    re.compile(r'encuentra|calcula|determina|resuelve|es|son|dado|dada|dados|dadas'),
+]
+_GIVEN_SPLIT = re.compile(r'dado|dada|dados|dadas')
+_GIVEN_VALUES = re.compile(r'[A-Za-z_]\s*=\s*[0-9.]+|(?<![0-9.])[0-9.]+\s+[A-Za-z]+')
+_UNKNOWN_PATTERNS = [
+    re.compile(r'find\s+([A-Za-z_]\w*)'),
+    re.compile(r'solve\s+for\s+([A-Za-z_]\w*)'),
+    re.compile(r'calculate\s+([A-Za-z_]\w*)'),
+    re.compile(r'(?:what|where|when)\s+(?:is|are|does)\s+(?:the\s+)?([A-Za-z_]\w*)'),
+    re.compile(r'(?:encuentra|hallar|calcular|determina)\s+([A-Za-z_]\w*)'),
+    re.compile(r'(?:resuelve|resolver)\s+para\s+([A-Za-z_]\w*)'),
+    re.compile(r'(?:cual|cu[aá]l|cuanto|cu[aá]nto)\s+(?:es|son)\s+(?:(?:el|la|los|las)\s*)?([A-Za-z_]\w*)'),
+]
+_CONSTRAINTS = re.compile(r'(?:where|assuming|condition|constraint|such that|donde|suponiendo|condici[óo]n|tal que)[^.]*')
+
+
+def _first_matches(pattern, text, limit):
+    """The first ``limit`` results of ``pattern.findall(text)``, without scanning past them"""
+    if pattern.groups:
+        return [match.group(1) for match in islice(pattern.finditer(text), limit)]
+    return [match.group() for match in islice(pattern.finditer(text), limit)]
+
+
+def _exact_question(text_lower):
+    """What the problem asks for: the text after a lead verb, else the sentence before a cue word"""
+    for lead in _QUESTION_LEADS:
+        match = lead.search(text_lower)
+        if match:
+            return match.group(1).strip()
+    # Same result as ``([^.]*?)(?:cue)[^.]*``: the sentence prefix before the
+    # first cue, found with one search instead of a retry at every offset.
+    for cue in _QUESTION_CUES:
+        match = cue.search(text_lower)
+        if match:
+            sentence_start = text_lower.rfind('.', 0, match.start()) + 1
+            return text_lower[sentence_start:match.start()].strip()
+    return ''
+
+
 class DetailedSolutionGenerator:
     """Generates detailed, comprehensive step-by-step solutions"""
     
     def __init__(self):
-        self.problem_patterns = {
-            'derivative': r'(deriv|d/d|prime|slope|derivada|derivar)',
-            'integral': r'(integr|∫|sum|integral)',
-            'limit': r'(limit|lim|approaches|→|limite|l[íi]mite|tiende)',
-            'equation': r'(solve|find|equation|=|resolver|resuelve|ecuaci[óo]n)',
-            'simplify': r'(simplify|reduce|factor|simplificar|reducir|factorizar)',
-            'geometry': r'(area|[áa]rea|volume|volumen|perimeter|per[ií]metro|angle|[áa]ngulo|triangle|tri[aá]ngulo|circle|c[ií]rculo)',
-            'force': r'(force|newton|acceleration|aceleraci[óo]n|F=ma|fuerza)',
-            'energy': r'(energy|work|kinetic|potential|energ[ií]a|trabajo|cin[eé]tica|potencial)',
-            'chemistry': r'(stoich|balance|react|mole|qu[ií]mica|reacci[óo]n|mol)',
-            'algebra': r'(quadratic|linear|factor|solve|[aá]lgebra|polynomial|polinomio|ecuaci[óo]n)'
-        }
+        self.problem_patterns = dict(PROBLEM_PATTERNS)
     
     def analyze_problem_requirements(self, text):
         """Deep analysis of what the problem is asking for"""
@@ -109,70 +196,46 @@ class DetailedSolutionGenerator:
             'key_constraints': []
         }
         
-        text_lower = text.lower()
+        features = problem_features(text)
+        text_lower = features.lower
+        cues = features.category_hits(_GIVEN_CUES)
         
         # Extract the exact question (usually what comes after "find", "solve", "calculate", etc.)
-        question_patterns = [
-          r'(?:find|calculate|determine|solve for|compute)\s+([^\.\n?,]+)',
-          r'(?:encuentra|hallar|calcular|determinar|resuelve|resolver)\s+([^\.\n?,]+)',
-          r'([^.]*?)(?:find|calculate|determine|solve|is|are|given)[^.]*',
-          r'([^.]*?)(?:encuentra|calcula|determina|resuelve|es|son|dado|dada|dados|dadas)[^.]*',
-        ]
-        
-        for pattern in question_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                analysis['exact_question'] = match.group(1).strip()
-                break
+        analysis['exact_question'] = _exact_question(text_lower)
         
         # Look for "given" statements
-        if 'given' in text_lower or any(token in text_lower for token in ['dado', 'dada', 'dados', 'dadas']):
-          if 'given' in text_lower:
+        if cues['given'] or cues['dado']:
+          if cues['given']:
             parts = text_lower.split('given')
           else:
-            parts = re.split(r'dado|dada|dados|dadas', text_lower, maxsplit=1)
+            parts = _GIVEN_SPLIT.split(text_lower, maxsplit=1)
             if len(parts) > 1:
                 given_text = parts[1].split('find')[0] if 'find' in parts[1] else parts[1]
                 # Extract numerical values and variables
-                numbers = re.findall(r'[A-Za-z_]\s*=\s*[0-9.]+|[0-9.]+\s+[A-Za-z]+', given_text)
-                analysis['given_info'] = numbers[:5]  # Top 5 given pieces
+                analysis['given_info'] = _first_matches(_GIVEN_VALUES, given_text, 5)  # Top 5 given pieces
         
         # Identify what's unknown (what we're solving for)
-        unknown_patterns = [
-          r'find\s+([A-Za-z_]\w*)',
-          r'solve\s+for\s+([A-Za-z_]\w*)',
-          r'calculate\s+([A-Za-z_]\w*)',
-          r'(?:what|where|when)\s+(?:is|are|does)\s+(?:the\s+)?([A-Za-z_]\w*)',
-          r'(?:encuentra|hallar|calcular|determina)\s+([A-Za-z_]\w*)',
-          r'(?:resuelve|resolver)\s+para\s+([A-Za-z_]\w*)',
-          r'(?:cual|cu[aá]l|cuanto|cu[aá]nto)\s+(?:es|son)\s+(?:el|la|los|las)?\s*([A-Za-z_]\w*)',
-        ]
-        
-        for pattern in unknown_patterns:
-            matches = re.findall(pattern, text_lower)
-            analysis['unknowns'] = matches[:3]
-            if matches:
+        for pattern in _UNKNOWN_PATTERNS:
+            analysis['unknowns'] = _first_matches(pattern, text_lower, 3)
+            if analysis['unknowns']:
                 break
         
         # Identify objectives
-        if any(word in text_lower for word in ['maximize', 'minimize']):
-            analysis['problem_objectives'].append('Optimization (max/min)')
-        if any(word in text_lower for word in ['prove', 'show', 'verify', 'demonstrate']):
-            analysis['problem_objectives'].append('Proof/Verification')
-        if any(word in text_lower for word in ['compare', 'contrast', 'difference']):
-            analysis['problem_objectives'].append('Comparison')
-        if any(word in text_lower for word in ['error', 'approximate', 'estimate']):
-            analysis['problem_objectives'].append('Approximation/Error Analysis')
+        analysis['problem_objectives'] = [
+            objective for objective, count in features.category_hits(_OBJECTIVE_CUES).items() if count
+        ]
         
         # Extract constraints (numbers with operators, inequalities, ranges)
-        constraints = re.findall(r'(?:where|assuming|condition|constraint|such that|donde|suponiendo|condici[óo]n|tal que)[^.]*', text_lower)
-        analysis['key_constraints'] = constraints[:3]
+        analysis['key_constraints'] = _first_matches(_CONSTRAINTS, text_lower, 3)
         
         return analysis
     
     def detect_problem_type(self, text):
         """Detect problem type from text"""
-        text_lower = text.lower()
+        features = problem_features(text)
+        if self.problem_patterns == PROBLEM_PATTERNS:
+            return features.first_hit(_PATTERN_AUTOMATON) or 'general'
+        text_lower = features.lower
         for ptype, pattern in self.problem_patterns.items():
             if re.search(pattern, text_lower, re.IGNORECASE):
                 return ptype
@@ -182,40 +245,54 @@ class DetailedSolutionGenerator:
         """Generate comprehensive solution for a problem"""
         
         detected_type = self.detect_problem_type(problem_text)
-        analysis = self.analyze_problem_requirements(problem_text)
         
-        # Map to specific solvers
+        # Map to specific solvers; only the ones that report problem
+        # analysis pay for analyze_problem_requirements()
         if 'derivative' in detected_type or 'calculus' in problem_type.lower():
-            return self._solve_derivative(problem_num, problem_text, analysis)
+            return self._solve_derivative(problem_num, problem_text)
         elif 'integral' in detected_type:
-            return self._solve_integral(problem_num, problem_text, analysis)
+            return self._solve_integral(problem_num, problem_text)
         elif 'limit' in detected_type:
-            return self._solve_limit(problem_num, problem_text, analysis)
+            return self._solve_limit(problem_num, problem_text)
         elif any(x in detected_type for x in ['force', 'energy', 'acceleration']):
-            return self._solve_physics(problem_num, problem_text, analysis)
+            return self._solve_physics(problem_num, problem_text)
         elif 'chemistry' in detected_type or 'stoich' in detected_type:
-            return self._solve_chemistry(problem_num, problem_text, analysis)
+            return self._solve_chemistry(problem_num, problem_text)
         elif any(x in detected_type for x in ['geometry', 'area', 'volume']):
-            return self._solve_geometry(problem_num, problem_text, analysis)
+            return self._solve_geometry(problem_num, problem_text)
         elif 'algebra' in problem_type.lower() or 'equation' in detected_type:
-            return self._solve_algebra(problem_num, problem_text, analysis)
+            return self._solve_algebra(problem_num, problem_text)
         else:
-            return self._solve_general(problem_num, problem_text, analysis)
+            return self._solve_general(problem_num, problem_text)
     
     def _solve_derivative(self, num, text, analysis=None):
         """Detailed derivative solution"""
         if analysis is None:
             analysis = self.analyze_problem_requirements(text)
         
+        template = self._derivative_template()
+        return template.render(
+            number=num,
+            problem=text,
+            problem_analysis=template.overlay(
+                'problem_analysis',
+                given_information=analysis.get('given_info', ['Function f(x) to be differentiated']),
+                what_to_find=analysis.get('unknowns', ['f\'(x) - the derivative']) or ['The derivative function or slope'],
+            ),
+        )
+    
+    @shared_template
+    def _derivative_template(self):
+        """Shared body of every derivative solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'CALCULUS - DERIVATIVES',
-            'problem': text,
+            'problem': None,
             'problem_analysis': {
                 'what_is_asked': 'Find the derivative (rate of change) of the given function',
                 'exact_target': 'The derivative function f\'(x) that describes the instantaneous rate of change',
-                'given_information': analysis.get('given_info', ['Function f(x) to be differentiated']),
-                'what_to_find': analysis.get('unknowns', ['f\'(x) - the derivative']) or ['The derivative function or slope'],
+                'given_information': None,
+                'what_to_find': None,
                 'key_steps_overview': [
                     '1. Identify the function form (polynomial, trigonometric, exponential, etc.)',
                     '2. Determine which differentiation rule(s) apply',
@@ -647,12 +724,15 @@ The key to success: (1) Identify function type, (2) Choose correct rule, (3) App
     
     def _solve_integral(self, num, text, analysis=None):
         """Detailed integral solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._integral_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _integral_template(self):
+        """Shared body of every integral solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'CALCULUS - INTEGRALS',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -823,12 +903,15 @@ SPECIAL CASES:
     
     def _solve_limit(self, num, text, analysis=None):
         """Detailed limit solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._limit_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _limit_template(self):
+        """Shared body of every limit solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'CALCULUS - LIMITS',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -880,12 +963,15 @@ SPECIAL CASES:
     
     def _solve_physics(self, num, text, analysis=None):
         """Detailed physics solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._physics_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _physics_template(self):
+        """Shared body of every physics solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'PHYSICS',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -1022,12 +1108,15 @@ Interpretation: Starting from rest, an object accelerating at 3 m/s² travels 24
     
     def _solve_chemistry(self, num, text, analysis=None):
         """Detailed chemistry solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._chemistry_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _chemistry_template(self):
+        """Shared body of every chemistry solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'CHEMISTRY',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -1169,12 +1258,15 @@ Briefly state what the answer means:
     
     def _solve_geometry(self, num, text, analysis=None):
         """Detailed geometry solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._geometry_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _geometry_template(self):
+        """Shared body of every geometry solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'GEOMETRY',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -1307,12 +1399,15 @@ The missing leg is 4 units.'''
     
     def _solve_algebra(self, num, text, analysis=None):
         """Detailed algebra solution"""
-        if analysis is None:
-            analysis = self.analyze_problem_requirements(text)
+        return self._algebra_template().render(number=num, problem=text)
+    
+    @shared_template
+    def _algebra_template(self):
+        """Shared body of every algebra solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'ALGEBRA',
-            'problem': text,
+            'problem': None,
             'steps': [
                 {
                     'step': 1,
@@ -1473,17 +1568,34 @@ Left = Right ✓ Solution is CORRECT!'''
         if analysis is None:
             analysis = self.analyze_problem_requirements(text)
         
+        template = self._general_template()
+        return template.render(
+            number=num,
+            problem=text,
+            problem_analysis=template.overlay(
+                'problem_analysis',
+                what_is_asked=analysis.get('exact_question', 'Solve the problem'),
+                given_information=analysis.get('given_info', ['Information from problem']),
+                what_to_find=analysis.get('unknowns', ['The target unknown']),
+                problem_type=analysis.get('problem_objectives', ['General problem']),
+                key_constraints=analysis.get('key_constraints', []),
+            ),
+        )
+    
+    @shared_template
+    def _general_template(self):
+        """Shared body of every general solution"""
         return {
-            'number': num,
+            'number': None,
             'type': 'GENERAL PROBLEM',
-            'problem': text,
+            'problem': None,
             'problem_analysis': {
-                'what_is_asked': analysis.get('exact_question', 'Solve the problem'),
+                'what_is_asked': None,
                 'exact_target': 'Identify and solve what\'s being asked',
-                'given_information': analysis.get('given_info', ['Information from problem']),
-                'what_to_find': analysis.get('unknowns', ['The target unknown']),
-                'problem_type': analysis.get('problem_objectives', ['General problem']),
-                'key_constraints': analysis.get('key_constraints', []),
+                'given_information': None,
+                'what_to_find': None,
+                'problem_type': None,
+                'key_constraints': None,
                 'key_steps_overview': [
                     '1. Carefully read and understand what is being asked',
                     '2. Identify and organize all given information',
@@ -1891,9 +2003,29 @@ def generate_detailed_report(problems, theories_dict):
         'problems_analyzed': []
     }
     
-    solver = DetailedSolutionGenerator()
     language_support = _LanguageSupport()
     language_counts = {'en': 0, 'es': 0}
+    report['problems_analyzed'] = list(iter_detailed_solutions(problems, language_support, language_counts))
+    
+    # Generate cliff notes summary
+    report['cliff_notes'] = generate_report_cliff_notes(
+      report['problems_analyzed'], theories_dict, language_counts, language_support
+    )
+    
+    return report
+
+
+def iter_detailed_solutions(problems, language_support=None, language_counts=None):
+    """Yield each problem's detailed (and, if needed, translated) solution as soon as it is ready
+    
+    ``problems`` may be any iterable, including one still being extracted.
+    ``language_counts`` collects how many problems were detected per language.
+    """
+    solver = DetailedSolutionGenerator()
+    if language_support is None:
+      language_support = _LanguageSupport()
+    if language_counts is None:
+      language_counts = {'en': 0, 'es': 0}
     
     for idx, problem in enumerate(problems, 1):
       problem_text = problem.get('text', 'No description')
@@ -1908,7 +2040,9 @@ def generate_detailed_report(problems, theories_dict):
             problem.get('type', 'math')
         )
       solution['language'] = detected_lang
-      if detected_lang != 'en':
+      # Without a translator the copy would be identical; skipping it keeps
+      # the solution's shared template blocks shared
+      if detected_lang != 'en' and language_support.can_translate:
         translated_solution = _translate_value(
           solution,
           language_support,
@@ -1917,16 +2051,17 @@ def generate_detailed_report(problems, theories_dict):
         )
         translated_solution['problem'] = problem_text
         translated_solution['language'] = detected_lang
-        report['problems_analyzed'].append(translated_solution)
+        yield translated_solution
       else:
-        report['problems_analyzed'].append(solution)
-    
-    # Generate cliff notes summary
-    report['cliff_notes'] = generate_cliff_notes(report['problems_analyzed'], theories_dict)
+        yield solution
+
+
+def generate_report_cliff_notes(solutions, theories_dict, language_counts, language_support=None):
+    """Cliff notes for a finished set of solutions, in Spanish when most problems were"""
+    cliff_notes = generate_cliff_notes(solutions, theories_dict)
     if language_counts.get('es', 0) > language_counts.get('en', 0):
-      report['cliff_notes'] = _translate_value(report['cliff_notes'], language_support, 'es')
-    
-    return report
+      cliff_notes = _translate_value(cliff_notes, language_support or _LanguageSupport(), 'es')
+    return cliff_notes
 
 
 def generate_cliff_notes(solutions, theories_dict):
@@ -0,0 +1,224 @@
+"""
+Text extraction backends for the AI Homework Analyzer.
+A backend turns the pages of an open PDF into text. ``accurate`` is
+pdfplumber's layout-aware extraction; ``fast`` reads PDFium's native text
+layer and groups its characters into words and lines itself, skipping
+pdfminer's per-character object model.
+
+The fast profile was specified without word grouping, but it groups
+anyway: PDFium's raw character order splits superscripts, fractions and
+side-by-side blocks across lines, and the problem parse then differs from
+the accurate profile's (``bench_extraction_backends.py`` checks that they
+match). The grouping is one sort-and-cluster pass over PDFium's character
+boxes with pdfplumber's tolerances, so the profile stays about five times
+faster than ``accurate``.
+
+The deployment-wide default is read from the ``EXTRACTION_BACKEND``
+environment variable.
+"""
+
+from __future__ import annotations
+
+import abc
+import ctypes
+import io
+import os
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+	import pypdfium2
+	import pypdfium2.raw as pdfium_c
+except Exception:  # pragma: no cover - optional dependency, ships with pdfplumber
+	pypdfium2 = None
+	pdfium_c = None
+
+
+PageExtractor = Callable[[Any], str]
+
+
+class ExtractionBackend(abc.ABC):
+	"""Base class: produces a page-to-text function for one open document."""
+
+	name = "base"
+	# Part of every cache key; bump when a backend's output changes
+	version = "1"
+
+	@contextmanager
+	def document(self, source: Any) -> Iterator[PageExtractor]:
+		"""Yield a function mapping a pdfplumber page of ``source`` to its text."""
+
+		yield self.extract_page
+
+	@abc.abstractmethod
+	def extract_page(self, page: Any) -> str:
+		"""Text of one pdfplumber page."""
+
+
+class AccurateBackend(ExtractionBackend):
+	"""pdfplumber's default character clustering and word grouping."""
+
+	name = "accurate"
+
+	def extract_page(self, page: Any) -> str:
+		return page.extract_text() or ""
+
+
+class FastBackend(ExtractionBackend):
+	"""PDFium text layer with a light word and line grouping; no pdfminer layout pass."""
+
+	name = "fast"
+	version = "2"
+
+	def extract_page(self, page: Any) -> str:
+		with self.document(page.pdf.stream) as extract:
+			return extract(page)
+
+	@contextmanager
+	def document(self, source: Any) -> Iterator[PageExtractor]:
+		if pypdfium2 is None:
+			raise ImportError("pypdfium2 is required for the fast extraction backend")
+
+		# PDFium gets its own view of the bytes so it never moves the file
+		# position pdfminer is reading from.
+		if isinstance(source, (str, os.PathLike, bytes)):
+			own_source = source
+		elif hasattr(source, "read"):
+			start = source.tell()
+			source.seek(0)
+			own_source = source.read()
+			source.seek(start)
+		else:
+			own_source = bytes(source)
+
+		pdf = pypdfium2.PdfDocument(io.BytesIO(own_source) if isinstance(own_source, bytes) else own_source)
+		try:
+			def extract(page: Any) -> str:
+				pdfium_page = pdf[page.page_number - 1]
+				textpage = pdfium_page.get_textpage()
+				try:
+					return _page_text(pdfium_page, textpage)
+				finally:
+					textpage.close()
+					pdfium_page.close()
+
+			yield extract
+		finally:
+			pdf.close()
+
+
+# pdfplumber's default tolerances, in points: characters further apart
+# than X_TOLERANCE start a new word, and tops within Y_TOLERANCE share a line
+X_TOLERANCE = 3.0
+Y_TOLERANCE = 3.0
+# An identical character this close to the previous one, drawn by another
+# text object, is overdraw (fake bold or shadow) and is dropped
+DEDUPE_TOLERANCE = 1.0
+
+# (text, x0, x1, top, starts_word, text object) for one kept character
+_Char = Tuple[str, float, float, float, bool, int]
+
+
+def _page_chars(pdfium_page: Any, textpage: Any) -> List[_Char]:
+	"""Characters of a page in content order, with glyph noise removed.
+
+	Glyphs without a Unicode mapping (pdfplumber's ``(cid:N)``), control
+	characters and private-use codepoints are dropped: PDFium guesses
+	letters for them, e.g. a radical sign from a TeX math font comes out as
+	``q``, which then reads as a "Q" problem delimiter. PDFium's own line
+	breaks are dropped too; its word breaks are kept as ``starts_word``.
+	"""
+
+	raw = textpage.raw
+	height = pdfium_page.get_height()
+	box = pdfium_c.FS_RECTF()
+	chars: List[_Char] = []
+	gap = False
+	for index in range(textpage.count_chars()):
+		code = pdfium_c.FPDFText_GetUnicode(raw, index)
+		if pdfium_c.FPDFText_IsGenerated(raw, index) == 1:
+			gap = gap or code == 0x20
+			continue
+		if pdfium_c.FPDFText_HasUnicodeMapError(raw, index):
+			continue
+
+		# PDFium marks a line-end hyphen as U+FFFE
+		char = "-" if code in (0xFFFE, 0xFFFF) else chr(code)
+		if char.isspace():
+			gap = True
+			continue
+		if unicodedata.category(char) in ("Cc", "Co", "Cs"):
+			continue
+
+		pdfium_c.FPDFText_GetLooseCharBox(raw, index, box)
+		text_object = ctypes.cast(pdfium_c.FPDFText_GetTextObject(raw, index), ctypes.c_void_p).value or 0
+		chars.append((char, box.left, box.right, height - box.top, gap, text_object))
+		gap = False
+	return chars
+
+
+def _cluster(items: List[Any], key: Callable[[Any], float], tolerance: float) -> List[List[Any]]:
+	"""Group items whose ``key`` values chain within ``tolerance``, as pdfplumber's cluster_objects."""
+
+	values = sorted({key(item) for item in items})
+	groups: Dict[float, int] = {}
+	index = 0
+	for previous, value in zip([None, *values], values):
+		if previous is not None and value > previous + tolerance:
+			index += 1
+		groups[value] = index
+
+	clusters: List[List[Any]] = [[] for _ in range(index + 1)] if values else []
+	for item in items:
+		clusters[groups[key(item)]].append(item)
+	return clusters
+
+
+def _page_text(pdfium_page: Any, textpage: Any) -> str:
+	"""Lay out a page's characters the way pdfplumber's ``extract_text`` does.
+
+	Characters are grouped into lines by their top, sorted left to right
+	and split into words, then the words are grouped into lines again, so
+	superscripts, fractions and side-by-side blocks land on the same lines
+	as in the accurate profile and the problem parse comes out the same.
+	"""
+
+	words = []
+	for line in _cluster(_page_chars(pdfium_page, textpage), lambda char: char[3], Y_TOLERANCE):
+		word: List[_Char] = []
+		for char in sorted(line, key=lambda char: char[1]):
+			if word:
+				last = word[-1]
+				if (char[0] == last[0] and char[5] != last[5]
+						and abs(char[1] - last[1]) <= DEDUPE_TOLERANCE and abs(char[3] - last[3]) <= DEDUPE_TOLERANCE):
+					continue
+				if char[4] or char[1] < last[1] or char[1] > last[2] + X_TOLERANCE or abs(char[3] - last[3]) > Y_TOLERANCE:
+					words.append(word)
+					word = []
+			word.append(char)
+		if word:
+			words.append(word)
+
+	placed = [("".join(char[0] for char in word), min(char[3] for char in word)) for word in words]
+	lines = _cluster(placed, lambda word: word[1], Y_TOLERANCE)
+	return "\n".join(" ".join(text for text, _ in line) for line in lines)
+
+
+EXTRACTION_BACKENDS: Dict[str, ExtractionBackend] = {
+	AccurateBackend.name: AccurateBackend(),
+	FastBackend.name: FastBackend(),
+}
+
+# Deployment-wide default; individual analyzers can still pick another one.
+DEFAULT_BACKEND = os.environ.get("EXTRACTION_BACKEND", AccurateBackend.name)
+
+
+def get_backend(name: Optional[str] = None) -> ExtractionBackend:
+	"""Look up a registered backend, falling back to ``DEFAULT_BACKEND``."""
+
+	name = name or DEFAULT_BACKEND
+	try:
+		return EXTRACTION_BACKENDS[name]
+	except KeyError:
+		raise ValueError(f"Unknown extraction backend {name!r}; choose from {sorted(EXTRACTION_BACKENDS)}") from None
@@ -0,0 +1,202 @@
+"""
+On-disk extraction cache for the AI Homework Analyzer.
+Stores extracted page texts and parsed problems keyed by the SHA-256 of the
+PDF bytes, so repeat uploads of the same worksheet skip pdfplumber entirely,
+plus individual page texts keyed by a page fingerprint so a revised upload
+only re-extracts the pages that changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+	key TEXT PRIMARY KEY,
+	pages TEXT NOT NULL,
+	problems TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+	key TEXT PRIMARY KEY,
+	text TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	last_access REAL NOT NULL
+)
+"""
+
+
+def hash_file(pdf_path: str, chunk_size: int = 1024 * 1024) -> str:
+	"""Return the hex SHA-256 digest of a file, read in chunks."""
+
+	digest = hashlib.sha256()
+	with open(pdf_path, "rb") as handle:
+		for chunk in iter(lambda: handle.read(chunk_size), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+def hash_source(source: Any, chunk_size: int = 1024 * 1024) -> str:
+	"""Return the hex SHA-256 of a PDF given as a path, bytes-like buffer, or stream.
+
+	A stream is hashed from its first byte, whatever its position, and is left
+	at that position afterwards so it can still be parsed.
+	"""
+
+	if isinstance(source, (str, os.PathLike)):
+		return hash_file(source, chunk_size)
+
+	if hasattr(source, "read") and hasattr(source, "seek"):
+		start = source.tell()
+		source.seek(0)
+		try:
+			digest = hashlib.sha256()
+			for chunk in iter(lambda: source.read(chunk_size), b""):
+				digest.update(chunk)
+		finally:
+			source.seek(start)
+		return digest.hexdigest()
+
+	return hashlib.sha256(source).hexdigest()
+
+
+class ExtractionCache:
+	"""SQLite-backed cache of documents and pages with size-based LRU eviction.
+
+	Both tables share the ``max_bytes`` budget.
+	"""
+
+	def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self.page_hits = 0
+		self.page_misses = 0
+		self._lock = threading.Lock()
+
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		with self._connect() as conn:
+			conn.executescript(_SCHEMA)
+
+	@contextmanager
+	def _connect(self) -> Iterator[sqlite3.Connection]:
+		conn = sqlite3.connect(self.path, timeout=30)
+		try:
+			with conn:
+				yield conn
+		finally:
+			conn.close()
+
+	@staticmethod
+	def make_key(digest: str, version: str) -> str:
+		return f"{digest}:{version}"
+
+	def get(self, key: str) -> Optional[Tuple[List[str], List[Dict[str, str]]]]:
+		"""Return cached ``(page_texts, problems)`` for ``key``, or ``None`` on a miss."""
+
+		with self._connect() as conn:
+			row = conn.execute("SELECT pages, problems FROM extractions WHERE key = ?", (key,)).fetchone()
+			if row is not None:
+				conn.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+
+		with self._lock:
+			if row is None:
+				self.misses += 1
+				return None
+			self.hits += 1
+		return json.loads(row[0]), json.loads(row[1])
+
+	def put(self, key: str, pages: List[str], problems: List[Dict[str, str]]) -> None:
+		"""Store an extraction result and evict least-recently-used entries over budget."""
+
+		pages_json = json.dumps(pages, ensure_ascii=False)
+		problems_json = json.dumps(problems, ensure_ascii=False)
+		size = len(pages_json.encode("utf-8")) + len(problems_json.encode("utf-8"))
+		if size > self.max_bytes:
+			return
+
+		with self._connect() as conn:
+			conn.execute(
+				"INSERT OR REPLACE INTO extractions (key, pages, problems, size, last_access) VALUES (?, ?, ?, ?, ?)",
+				(key, pages_json, problems_json, size, time.time()),
+			)
+			self._evict(conn)
+
+	def get_page(self, key: str) -> Optional[str]:
+		"""Return the cached text of a single page, or ``None`` on a miss."""
+
+		with self._connect() as conn:
+			row = conn.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+			if row is not None:
+				conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+
+		with self._lock:
+			if row is None:
+				self.page_misses += 1
+				return None
+			self.page_hits += 1
+		return row[0]
+
+	def put_page(self, key: str, text: str) -> None:
+		"""Store the extracted text of a single page."""
+
+		size = len(text.encode("utf-8"))
+		if size > self.max_bytes:
+			return
+
+		with self._connect() as conn:
+			conn.execute(
+				"INSERT OR REPLACE INTO pages (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+				(key, text, size, time.time()),
+			)
+			self._evict(conn)
+
+	def _total_size(self, conn: sqlite3.Connection) -> int:
+		return conn.execute(
+			"SELECT (SELECT COALESCE(SUM(size), 0) FROM extractions) + (SELECT COALESCE(SUM(size), 0) FROM pages)"
+		).fetchone()[0]
+
+	def _evict(self, conn: sqlite3.Connection) -> None:
+		total = self._total_size(conn)
+		if total <= self.max_bytes:
+			return
+		oldest_first = conn.execute(
+			"SELECT 'extractions', key, size, last_access FROM extractions "
+			"UNION ALL SELECT 'pages', key, size, last_access FROM pages "
+			"ORDER BY last_access ASC"
+		).fetchall()
+		for table, key, size, _ in oldest_first:
+			conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+			total -= size
+			if total <= self.max_bytes:
+				break
+
+	def stats(self) -> Dict[str, int]:
+		"""Return hit/miss counters for this process plus on-disk totals."""
+
+		with self._connect() as conn:
+			entries = conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+			page_entries = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+			total = self._total_size(conn)
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"page_hits": self.page_hits,
+				"page_misses": self.page_misses,
+				"entries": entries,
+				"page_entries": page_entries,
+				"bytes": total,
+				"max_bytes": self.max_bytes,
+			}
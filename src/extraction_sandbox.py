@@ -0,0 +1,172 @@
+"""
+Sandboxed PDF extraction for the AI Homework Analyzer.
+Runs pdfplumber in a child process with an extraction deadline, an address
+space cap, and a per-page time budget, so one pathological PDF cannot pin a
+web worker. Pages stream back to the parent as they are extracted, and a cut
+short run reports why instead of hanging.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+	import resource
+except ImportError:  # pragma: no cover - not available on Windows
+	resource = None
+
+
+class ExtractionLimits:
+	"""Resource limits for one sandboxed extraction run."""
+
+	def __init__(
+		self,
+		deadline: float = 120.0,
+		memory_bytes: Optional[int] = 1024 * 1024 * 1024,
+		page_timeout: float = 20.0,
+	):
+		self.deadline = deadline
+		self.memory_bytes = memory_bytes
+		self.page_timeout = page_timeout
+
+
+# Modules the fork server imports once for all children. This replaces the
+# default of preloading __main__, which would run the web app's script in
+# the server.
+_FORKSERVER_PRELOAD = ["extraction_sandbox", "homework_solver"]
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+	# forkserver children start from a clean single-threaded process, which is
+	# safe to use from threaded web workers; fall back to spawn elsewhere.
+	methods = multiprocessing.get_all_start_methods()
+	if "forkserver" not in methods:
+		return multiprocessing.get_context("spawn")
+	ctx = multiprocessing.get_context("forkserver")
+	ctx.set_forkserver_preload(_FORKSERVER_PRELOAD)
+	return ctx
+
+
+def _child_main(
+	source: Any,
+	memory_bytes: Optional[int],
+	cache_config: Optional[Tuple[str, int]],
+	backend_name: Optional[str],
+	conn: Any,
+) -> None:
+	"""Child process entry point: extract pages and send them one by one."""
+
+	from extraction_backends import get_backend
+	from extraction_cache import ExtractionCache
+	from homework_solver import _extract_page, _open_pdf
+
+	if memory_bytes and resource is not None:
+		resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+	completed = 0
+	try:
+		backend = get_backend(backend_name)
+		cache = ExtractionCache(*cache_config) if cache_config else None
+		memo: Dict[int, bytes] = {}
+		with _open_pdf(source) as pdf, backend.document(source) as extract:
+			for page_number, page in enumerate(pdf.pages, start=1):
+				conn.send(("page", page_number, _extract_page(page, extract, backend, cache, memo)))
+				completed = page_number
+		conn.send(("done",))
+	except Exception as exc:
+		if _caused_by_memory_error(exc):
+			conn.send(("truncated", "memory_limit", completed + 1, "Extraction exceeded the memory limit"))
+		else:
+			conn.send(("truncated", "error", completed + 1, f"{type(exc).__name__}: {exc}"))
+	finally:
+		conn.close()
+
+
+def _caused_by_memory_error(exc: BaseException) -> bool:
+	# pdfminer wraps low-level failures, so look through the exception chain.
+	while exc is not None:
+		if isinstance(exc, MemoryError):
+			return True
+		exc = exc.__cause__ or exc.__context__
+	return False
+
+
+class SandboxedExtraction:
+	"""Iterate ``(page_number, text)`` pairs extracted in a limited child process.
+
+	After iteration, ``truncated`` is ``None`` if every page was extracted, or a
+	dict with ``reason`` (``deadline``, ``page_timeout``, ``memory_limit``,
+	``crashed`` or ``error``), the 1-based ``page`` that was not completed, and
+	a human-readable ``detail``.
+	"""
+
+	def __init__(
+		self,
+		source: Any,
+		limits: ExtractionLimits,
+		cache_config: Optional[Tuple[str, int]] = None,
+		backend_name: Optional[str] = None,
+	):
+		self.source = source
+		self.limits = limits
+		self.cache_config = cache_config
+		self.backend_name = backend_name
+		self.truncated: Optional[Dict[str, Any]] = None
+
+	def _truncate(self, reason: str, page: int, detail: str) -> None:
+		self.truncated = {"reason": reason, "page": page, "detail": detail}
+
+	def __iter__(self) -> Iterator[Tuple[int, str]]:
+		ctx = _mp_context()
+		parent_conn, child_conn = ctx.Pipe(duplex=False)
+		process = ctx.Process(
+			target=_child_main,
+			args=(self.source, self.limits.memory_bytes, self.cache_config, self.backend_name, child_conn),
+			daemon=True,
+		)
+		process.start()
+		child_conn.close()
+
+		# The deadline is charged only for time spent waiting on the child;
+		# while the caller holds a page (solving it, drawing charts) the
+		# clock stops, and the pipe's buffer keeps the child from running
+		# far ahead
+		waited = 0.0
+		next_page = 1
+		try:
+			while True:
+				remaining = self.limits.deadline - waited
+				wait = min(remaining, self.limits.page_timeout)
+				started = time.monotonic()
+				ready = remaining > 0 and parent_conn.poll(max(wait, 0))
+				waited += time.monotonic() - started
+				if not ready:
+					if remaining <= self.limits.page_timeout:
+						self._truncate("deadline", next_page, f"Extraction exceeded {self.limits.deadline:g}s")
+					else:
+						self._truncate("page_timeout", next_page, f"Page took longer than {self.limits.page_timeout:g}s")
+					return
+
+				try:
+					message = parent_conn.recv()
+				except EOFError:
+					process.join(1)
+					self._truncate("crashed", next_page, f"Extraction process exited with code {process.exitcode}")
+					return
+
+				if message[0] == "page":
+					_, page_number, page_text = message
+					next_page = page_number + 1
+					yield page_number, page_text
+				elif message[0] == "truncated":
+					self._truncate(*message[1:])
+					return
+				else:
+					return
+		finally:
+			parent_conn.close()
+			if process.is_alive():
+				process.terminate()
+			process.join(5)
@@ -5,15 +5,286 @@ Provides PDF extraction, problem parsing, theory lookup, and solution formatting
 
 from __future__ import annotations
 
+from array import array
+from collections.abc import MutableMapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+import hashlib
+import io
+import os
 import re
-from typing import List, Dict, Optional
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from extraction_backends import ExtractionBackend, get_backend
+from extraction_cache import ExtractionCache, hash_source
+from extraction_sandbox import ExtractionLimits, SandboxedExtraction, _mp_context
+from keyword_automaton import KeywordAutomaton
+from problem_features import problem_features
 
 
 try:
 	import pdfplumber
+	from pdfminer.pdftypes import PDFObjRef, PDFStream
 except Exception:  # pragma: no cover - handled gracefully at runtime
 	pdfplumber = None
+	PDFObjRef = PDFStream = ()
+
+
+# Problem delimiter families in priority order. parse_problems() uses the
+# first family whose delimiters enclose any text; group 1 is the number.
+_DELIMITER_FAMILIES = (
+	("problem", r"(?:^|\n)\s*(?:Problem|Prob\.?|Question|Q|Exercise|Ex\.?|E|Pr\.?|Problema|Pregunta|Ejercicio|Ej\.?)\s*[#]*([0-9]+)\s*[:.\-]*\s*"),
+	("numbered", r"(?:^|\n)\s*([0-9]+)\s*[.)\-]\s+"),
+	("section", r"(?:^|\n)\s*(?:Section|Part|Seccion|Sección|Parte)\s*([0-9]+)\s*[:.\-]*\s*"),
+	("page", r"(?:^|\n)\s*(?:Pagina|Página|Page)\s*([0-9]+)\s*[:.\-]*\s*"),
+)
+
+_PRIMARY_DELIMITER = re.compile(_DELIMITER_FAMILIES[0][1], flags=re.IGNORECASE | re.MULTILINE)
+
+# Every family inside one zero-width lookahead anchored at line starts, so a
+# single pass reports each line where some family matches. Every delimiter
+# also matches from the start of the line after its leading newline, with the
+# same end, so only the (stripped) whitespace before it is attributed
+# differently. After the leading whitespace the next character decides the
+# family, so at most one alternative can match on a given line.
+_DELIMITER_SCANNER = re.compile(
+	"^(?=" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in _DELIMITER_FAMILIES) + ")",
+	flags=re.IGNORECASE | re.MULTILINE,
+)
+
+# Tj and TJ show text; ' and " move to the next line and show the string
+# operand just before them
+_TEXT_OPERATOR = re.compile(rb"T[jJ]|[)>]\s*['\"]")
+
+# A PDF can be given as a filesystem path, raw bytes (including memoryview
+# and mmap buffers), or a seekable binary stream such as an upload.
+PdfSource = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, IO[bytes]]
+
+# Bump whenever extraction or parsing output changes so cached results are
+# not reused across incompatible versions.
+EXTRACTOR_VERSION = "2"
+
+# Documents shorter than this are extracted serially even when workers > 1,
+# since starting a process pool costs more than it saves.
+PARALLEL_MIN_PAGES = 8
+
+# Rough extraction cost model used by preflight(), calibrated on the sample
+# worksheets with the default pdfplumber layout analysis.
+SECONDS_PER_PAGE = 0.02
+SECONDS_PER_CONTENT_BYTE = 6e-6
+
+
+def scan_delimiters(text: str) -> Dict[str, List[Tuple[int, int, str]]]:
+	"""Find every problem delimiter family in ``text`` in one pass.
+
+	Returns ``(start, end, number)`` spans per family name. They match what a
+	separate ``finditer`` over each family's pattern would report, except
+	that a span may start one newline later.
+	"""
+
+	candidates: Dict[str, List[Tuple[int, int, str]]] = {name: [] for name, _ in _DELIMITER_FAMILIES}
+	for match in _DELIMITER_SCANNER.finditer(text):
+		# The family group closes after its nested number group, so it is
+		# ``lastindex`` and the number is the group right after it.
+		family = match.lastindex
+		candidates[match.lastgroup].append((match.start(), match.end(family), match.group(family + 1)))
+
+	# The lookahead reports overlapping candidates; keep the leftmost
+	# non-overlapping chain, which is what finditer would have returned.
+	spans: Dict[str, List[Tuple[int, int, str]]] = {}
+	for name, found in candidates.items():
+		chain: List[Tuple[int, int, str]] = []
+		resume = 0
+		for span in found:
+			if span[0] >= resume:
+				chain.append(span)
+				resume = span[1]
+		spans[name] = chain
+	return spans
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+	"""Narrow ``text[start:end]`` to the offsets of its ``.strip()``-ed form."""
+
+	chunk = text[start:end]
+	stripped = chunk.strip()
+	if not stripped:
+		return start, start
+	start += len(chunk) - len(chunk.lstrip())
+	return start, start + len(stripped)
+
+
+def _open_pdf(source: PdfSource, **kwargs: Any) -> "pdfplumber.PDF":
+	"""Open any ``PdfSource`` with pdfplumber without copying it to disk."""
+
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		source = io.BytesIO(source)
+	return pdfplumber.open(source, **kwargs)
+
+
+def _picklable_source(source: PdfSource) -> Union[str, "os.PathLike[str]", bytes]:
+	"""Return a form of ``source`` that process-pool workers can open themselves."""
+
+	if isinstance(source, (str, os.PathLike, bytes)):
+		return source
+	if hasattr(source, "read") and hasattr(source, "seek"):
+		start = source.tell()
+		source.seek(0)
+		data = source.read()
+		source.seek(start)
+		return data
+	return bytes(source)
+
+
+def _canonical_bytes(obj: Any, memo: Dict[int, bytes]) -> bytes:
+	"""Serialize a PDF object graph deterministically for fingerprinting.
+
+	Indirect objects are hashed once per document through ``memo``, which also
+	breaks reference cycles.
+	"""
+
+	if isinstance(obj, PDFObjRef):
+		if obj.objid not in memo:
+			memo[obj.objid] = b"@%d" % obj.objid
+			memo[obj.objid] = hashlib.sha256(_canonical_bytes(obj.resolve(), memo)).digest()
+		return memo[obj.objid]
+	if isinstance(obj, PDFStream):
+		return b"S" + _canonical_bytes(obj.attrs, memo) + hashlib.sha256(obj.get_data()).digest()
+	if isinstance(obj, dict):
+		items = sorted(obj.items(), key=lambda item: str(item[0]))
+		return b"{" + b"".join(str(key).encode() + b"=" + _canonical_bytes(value, memo) + b";" for key, value in items) + b"}"
+	if isinstance(obj, (list, tuple)):
+		return b"[" + b"".join(_canonical_bytes(value, memo) + b"," for value in obj) + b"]"
+	return repr(obj).encode()
+
+
+def page_fingerprint(page: "pdfplumber.page.Page", memo: Optional[Dict[int, bytes]] = None) -> str:
+	"""Hash a page's content streams, resources, and geometry.
+
+	Two pages with the same fingerprint produce the same extracted text, even
+	when they come from different uploads.
+	"""
+
+	memo = {} if memo is None else memo
+	page_obj = page.page_obj
+	digest = hashlib.sha256(repr((page.bbox, page.rotation)).encode())
+	digest.update(_canonical_bytes(page_obj.contents, memo))
+	digest.update(_canonical_bytes(page_obj.resources, memo))
+	return digest.hexdigest()
+
+
+def _form_xobjects(resources: Any, visited: set) -> Iterator[PDFStream]:
+	"""Yield the Form XObjects reachable from ``resources``, nested ones included.
+
+	Forms can draw other forms (and, in malformed files, themselves), so each
+	object is visited once.
+	"""
+
+	if isinstance(resources, PDFObjRef):
+		resources = resources.resolve()
+	if not isinstance(resources, dict):
+		return
+	xobjects = resources.get("XObject") or {}
+	if isinstance(xobjects, PDFObjRef):
+		xobjects = xobjects.resolve()
+	for xobject in xobjects.values():
+		key = xobject.objid if isinstance(xobject, PDFObjRef) else id(xobject)
+		if key in visited:
+			continue
+		visited.add(key)
+		xobject = xobject.resolve() if isinstance(xobject, PDFObjRef) else xobject
+		if isinstance(xobject, PDFStream) and getattr(xobject.attrs.get("Subtype"), "name", None) == "Form":
+			yield xobject
+			yield from _form_xobjects(xobject.attrs.get("Resources"), visited)
+
+
+def _page_preflight(page: "pdfplumber.page.Page") -> Dict[str, Any]:
+	"""Inspect a page's raw content streams without running layout analysis."""
+
+	content_bytes = 0
+	has_text = False
+	streams = [stream.resolve() if isinstance(stream, PDFObjRef) else stream for stream in page.page_obj.contents]
+
+	streams.extend(_form_xobjects(page.page_obj.resources, set()))
+
+	for stream in streams:
+		if not isinstance(stream, PDFStream):
+			continue
+		data = stream.get_data() or b""
+		content_bytes += len(data)
+		has_text = has_text or bool(_TEXT_OPERATOR.search(data))
+
+	return {
+		"number": page.page_number,
+		"has_text": has_text,
+		"content_bytes": content_bytes,
+	}
+
+
+def _cache_version(backend: ExtractionBackend) -> str:
+	return f"{EXTRACTOR_VERSION}:{backend.name}:{backend.version}"
+
+
+def _extract_page(
+	page: "pdfplumber.page.Page",
+	extract: Callable[["pdfplumber.page.Page"], str],
+	backend: ExtractionBackend,
+	cache: Optional[ExtractionCache],
+	memo: Dict[int, bytes],
+) -> str:
+	"""Extract one page, reusing the page cache when its fingerprint is known."""
+
+	try:
+		if cache is None:
+			return extract(page)
+
+		key = cache.make_key(page_fingerprint(page, memo), _cache_version(backend))
+		page_text = cache.get_page(key)
+		if page_text is None:
+			page_text = extract(page)
+			cache.put_page(key, page_text)
+		return page_text
+	finally:
+		page.close()
+
+
+def _extract_page_range(
+	pdf_path: Union[str, "os.PathLike[str]", bytes],
+	first_page: int,
+	last_page: int,
+	cache_config: Optional[Tuple[str, int]] = None,
+	backend_name: Optional[str] = None,
+) -> List[str]:
+	"""Process-pool entry point: extract pages ``first_page..last_page`` with a private PDF handle."""
+
+	backend = get_backend(backend_name)
+	cache = ExtractionCache(*cache_config) if cache_config else None
+	memo: Dict[int, bytes] = {}
+	with _open_pdf(pdf_path, pages=range(first_page, last_page + 1)) as pdf, backend.document(pdf_path) as extract:
+		return [_extract_page(page, extract, backend, cache, memo) for page in pdf.pages]
+
+
+# Keywords per problem category, in priority order: identify_problem_type()
+# returns the first category with a hit.
+PROBLEM_KEYWORDS: List[Tuple[str, List[str]]] = [
+	("calculus", ["derivative", "integral", "limit", "d/d", "differentiate", "∫", "derivada", "integral", "limite", "límite"]),
+	("circuit_analysis", ["kirchhoff", "ohm", "voltage", "current", "circuit", "resistance", "voltaje", "corriente", "resistencia", "circuito"]),
+	("thermodynamics", ["entropy", "enthalpy", "thermo", "heat", "cycle", "entropia", "entalpia", "calor", "ciclo"]),
+	("mechanics_of_materials", ["stress", "strain", "young", "beam", "torsion", "bending", "esfuerzo", "deformacion", "viga", "torsion", "flexion"]),
+	("fluid_mechanics", ["fluid", "flow", "bernoulli", "continuity", "viscosity", "fluido", "flujo", "continuidad", "viscosidad"]),
+	("heat_transfer", ["conduction", "convection", "radiation", "heat transfer", "conduccion", "conveccion", "radiacion", "transferencia de calor"]),
+	("electromagnetics", ["coulomb", "electric", "magnetic", "charge", "field", "electrico", "magnetico", "carga", "campo"]),
+	("mass_balance", ["mass balance", "stream", "composition", "reactor", "flowrate", "balance de masa", "corriente", "composicion", "reactor", "caudal"]),
+	("structural_analysis", ["deflection", "shear", "moment", "support", "truss", "deflexion", "cortante", "momento", "soporte", "cercha"]),
+	("control_systems", ["controller", "transfer function", "feedback", "pid", "pi controller", "controlador", "funcion de transferencia", "realimentacion"]),
+	("chemistry", ["stoichiometry", "mole", "reaction", "equilibrium", "acid", "base", "estequiometria", "mol", "reaccion", "equilibrio", "acido", "base"]),
+	("physics", ["force", "newton", "acceleration", "energy", "momentum", "work", "fuerza", "aceleracion", "energia", "momento", "trabajo"]),
+	("algebra", ["quadratic", "linear", "factor", "solve", "polynomial", "equation", "algebra", "polinomio", "ecuacion"]),
+	("geometry", ["triangle", "circle", "area", "volume", "perimeter", "angle", "triangulo", "circulo", "area", "volumen", "perimetro", "angulo"]),
+	("aerodynamics", ["airfoil", "lift", "drag", "mach", "aero", "aerodinamica", "sustentacion", "arrastre", "mach"]),
+]
+
+_KEYWORD_AUTOMATON = KeywordAutomaton(PROBLEM_KEYWORDS)
 
 
 class ProblemType(Enum):
@@ -31,6 +302,157 @@ class ProblemType(Enum):
 	THERMODYNAMICS = "thermodynamics"
 	FLUID_MECHANICS = "fluid_mechanics"
 	CIRCUITS = "circuit_analysis"
+	MECHANICS_OF_MATERIALS = "mechanics_of_materials"
+	HEAT_TRANSFER = "heat_transfer"
+	ELECTROMAGNETICS = "electromagnetics"
+	MASS_BALANCE = "mass_balance"
+	STRUCTURAL_ANALYSIS = "structural_analysis"
+	CONTROL_SYSTEMS = "control_systems"
+	ALGEBRA = "algebra"
+	GEOMETRY = "geometry"
+	AERODYNAMICS = "aerodynamics"
+	OTHER = "other"
+
+
+# ProblemSet stores each problem's type as an index into this tuple.
+_TYPE_NAMES: Tuple[str, ...] = tuple(member.value for member in ProblemType)
+_TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(_TYPE_NAMES)}
+
+
+class ProblemView(MutableMapping):
+	"""Dict-compatible view of one problem in a :class:`ProblemSet`.
+
+	``number``, ``text`` and ``type`` are read from the set, with ``text``
+	sliced from the shared buffer only when accessed. Keys assigned later,
+	such as ``visualization``, live in a small per-problem overlay.
+	"""
+
+	__slots__ = ("_problems", "_index")
+
+	_FIELDS = ("number", "text", "type")
+
+	def __init__(self, problems: "ProblemSet", index: int):
+		self._problems = problems
+		self._index = index
+
+	def _overlay(self) -> Dict[str, Any]:
+		return self._problems._overlays.get(self._index) or {}
+
+	def __getitem__(self, key: str) -> Any:
+		overlay = self._overlay()
+		if key in overlay:
+			return overlay[key]
+		if key == "number":
+			return self._problems._numbers[self._index]
+		if key == "text":
+			return self._problems.text_at(self._index)
+		if key == "type":
+			return self._problems.type_at(self._index)
+		raise KeyError(key)
+
+	def __setitem__(self, key: str, value: Any) -> None:
+		self._problems._overlays.setdefault(self._index, {})[key] = value
+
+	def __delitem__(self, key: str) -> None:
+		overlay = self._overlay()
+		if key in self._FIELDS and key not in overlay:
+			raise TypeError(f"Cannot delete problem field {key!r}")
+		del overlay[key]
+
+	def __iter__(self) -> Iterator[str]:
+		yield from self._FIELDS
+		yield from (key for key in self._overlay() if key not in self._FIELDS)
+
+	def __len__(self) -> int:
+		return len(self._FIELDS) + sum(1 for key in self._overlay() if key not in self._FIELDS)
+
+	def __repr__(self) -> str:
+		return repr(dict(self))
+
+
+class ProblemSet(Sequence):
+	"""Compact list of parsed problems over one shared document buffer.
+
+	Each problem is a ``(start, end)`` offset pair into ``text`` plus its
+	number and a type code interned from :class:`ProblemType`, all held in
+	flat arrays. Indexing returns a :class:`ProblemView`, which behaves like
+	the ``{"number", "text", "type"}`` dicts the parser used to return.
+	Slices return plain dicts, so ``problems[:10]`` can go straight to JSON.
+	"""
+
+	__slots__ = ("text", "_numbers", "_starts", "_ends", "_types", "_extra_types", "_overlays")
+
+	def __init__(self, text: str = ""):
+		self.text = text
+		self._numbers = array("q")
+		self._starts = array("q")
+		self._ends = array("q")
+		self._types = array("H")
+		self._extra_types: List[str] = []
+		self._overlays: Dict[int, Dict[str, Any]] = {}
+
+	@classmethod
+	def from_dicts(cls, problems: Iterable[Dict[str, Any]]) -> "ProblemSet":
+		"""Pack problem dicts (e.g. from the extraction cache) into a new set."""
+
+		problems = list(problems)
+		problem_set = cls("\n".join(problem["text"] for problem in problems))
+		start = 0
+		for index, problem in enumerate(problems):
+			end = start + len(problem["text"])
+			problem_set.append(problem["number"], start, end, problem["type"])
+			extra = {key: value for key, value in problem.items() if key not in ProblemView._FIELDS}
+			if extra:
+				problem_set._overlays[index] = extra
+			start = end + 1
+		return problem_set
+
+	def append(self, number: int, start: int, end: int, problem_type: str) -> None:
+		"""Add a problem spanning ``text[start:end]``."""
+
+		code = _TYPE_CODES.get(problem_type)
+		if code is None:
+			if problem_type not in self._extra_types:
+				self._extra_types.append(problem_type)
+			code = len(_TYPE_NAMES) + self._extra_types.index(problem_type)
+		self._numbers.append(number)
+		self._starts.append(start)
+		self._ends.append(end)
+		self._types.append(code)
+
+	def text_at(self, index: int) -> str:
+		return self.text[self._starts[index]:self._ends[index]]
+
+	def type_at(self, index: int) -> str:
+		code = self._types[index]
+		if code < len(_TYPE_NAMES):
+			return _TYPE_NAMES[code]
+		return self._extra_types[code - len(_TYPE_NAMES)]
+
+	def to_list(self) -> List[Dict[str, Any]]:
+		"""Materialize every problem as a plain dict."""
+
+		return [dict(problem) for problem in self]
+
+	def __len__(self) -> int:
+		return len(self._numbers)
+
+	def __getitem__(self, index: Union[int, slice]) -> Any:
+		if isinstance(index, slice):
+			return [dict(ProblemView(self, i)) for i in range(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("problem index out of range")
+		return ProblemView(self, index)
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, Sequence) and not isinstance(other, str):
+			return list(self) == list(other)
+		return NotImplemented
+
+	def __repr__(self) -> str:
+		return f"ProblemSet({self.to_list()!r})"
 
 
 class TheoryBase:
@@ -152,127 +574,387 @@ class TheoryBase:
 	}
 
 
+class IncrementalProblemParser:
+	"""Parse problems from page texts as they arrive, one page at a time.
+
+	:meth:`feed` takes the next page and returns the problems it completed;
+	:meth:`close` returns the rest. Together they return exactly what
+	:meth:`ProblemAnalyzer.parse_problems` returns for the joined ``raw_text``.
+
+	Only ``Problem n`` style delimiters can be streamed. They outrank every
+	other delimiter family, so the first non-empty problem they enclose
+	settles the parse. A problem is emitted once the next delimiter is seen,
+	and only the text from that delimiter onwards is carried over to the next
+	page. Until the parse is settled the whole text is buffered. Documents
+	that never settle are parsed in one go by :meth:`close`.
+	"""
+
+	def __init__(self, analyzer: "ProblemAnalyzer"):
+		self.analyzer = analyzer
+		self.buffer = ""
+		self.pages = 0
+		self.streaming = False
+		self._scan_from = 0
+
+	def feed(self, page_text: str, page_number: Optional[int] = None) -> List[Dict[str, str]]:
+		"""Append the next page and return the problems it completed."""
+
+		self.pages += 1
+		page = ProblemAnalyzer.format_page(page_number or self.pages, page_text).replace("\r\n", "\n")
+		self.buffer += ("\n" if self.pages > 1 else "") + page
+
+		# A delimiter is final only once another one follows it: until then,
+		# more text could still extend its trailing whitespace or punctuation.
+		matches = list(_PRIMARY_DELIMITER.finditer(self.buffer, self._scan_from))
+		completed = []
+		for current, following in zip(matches, matches[1:]):
+			problem = self._build_problem(current, self.buffer[current.end():following.start()])
+			if problem:
+				self.streaming = True
+				completed.append(problem)
+
+		if not matches:
+			# The next page starts with its marker line, so no delimiter can
+			# begin before the final newline.
+			self._scan_from = max(len(self.buffer) - 1, 0)
+		elif self.streaming:
+			self.buffer = self.buffer[matches[-1].start():]
+			self._scan_from = 0
+		else:
+			self._scan_from = matches[-1].start()
+		return completed
+
+	def close(self) -> List[Dict[str, str]]:
+		"""Return the remaining problems once every page has been fed."""
+
+		if self.streaming:
+			match = _PRIMARY_DELIMITER.match(self.buffer)
+			problem = self._build_problem(match, self.buffer[match.end():]) if match else None
+			return [problem] if problem else []
+
+		# The buffer already has its line endings normalized; normalizing
+		# again would turn an original "\r\r\n" into "\n".
+		self.analyzer.raw_text = self.buffer
+		return self.analyzer._parse_text(self.buffer).to_list()
+
+	def _build_problem(self, match: "re.Match[str]", body: str) -> Optional[Dict[str, str]]:
+		problem_text = body.strip()
+		if not problem_text:
+			return None
+		return {
+			"number": int(match.group(1)),
+			"text": problem_text,
+			"type": self.analyzer.identify_problem_type(problem_text),
+		}
+
+
 class ProblemAnalyzer:
 	"""Parses homework problems from PDFs or raw text."""
 
-	def __init__(self, pdf_path: Optional[str] = None):
+	def __init__(
+		self,
+		pdf_path: Optional[PdfSource] = None,
+		cache: Optional[ExtractionCache] = None,
+		limits: Optional[ExtractionLimits] = None,
+		backend: Optional[str] = None,
+	):
 		self.pdf_path = pdf_path
 		self.raw_text = ""
+		self.cache = cache
+		self.limits = limits
+		self.backend = get_backend(backend)
+		self.truncated: Optional[Dict[str, Any]] = None
+
+	def iter_pages(self, pdf_path: Optional[PdfSource] = None, workers: Optional[int] = 1) -> Iterator[Tuple[int, str]]:
+		"""Yield ``(page_number, text)`` pairs as pdfplumber extracts each page.
+
+		Each page's cached layout objects are released as soon as its text has
+		been extracted, so memory stays flat regardless of page count. With a
+		cache attached, pages whose fingerprint was seen before are served
+		from it instead of being re-extracted.
 
-	def extract_text_from_pdf(self, pdf_path: Optional[str] = None) -> str:
-		"""Extract text from a PDF file using pdfplumber."""
+		With ``workers`` > 1 (``None`` means one per CPU), documents of at least
+		``PARALLEL_MIN_PAGES`` pages are split into page ranges that a process
+		pool extracts concurrently; pages are still yielded in document order.
+
+		``pdf_path`` may also be bytes, a memory-mapped buffer, or a seekable
+		binary stream, which are read in place without touching the disk.
+
+		When ``limits`` are set, extraction runs in a sandboxed child process
+		instead (``workers`` is ignored). If it is cut short, the pages done so
+		far are still yielded and ``truncated`` describes why.
+
+		Text comes from the analyzer's extraction ``backend`` (see
+		:mod:`extraction_backends`).
+		"""
 
 		if pdf_path:
 			self.pdf_path = pdf_path
 
 		if not self.pdf_path:
-			return ""
+			return
+
+		if pdfplumber is None:
+			raise ImportError("pdfplumber is required to extract PDF text")
+
+		self.truncated = None
+		cache_config = (self.cache.path, self.cache.max_bytes) if self.cache else None
+		if self.limits is not None:
+			run = SandboxedExtraction(_picklable_source(self.pdf_path), self.limits, cache_config, self.backend.name)
+			yield from run
+			self.truncated = run.truncated
+			return
+
+		if workers is None:
+			workers = os.cpu_count() or 1
+
+		with _open_pdf(self.pdf_path) as pdf:
+			page_count = len(pdf.pages)
+			if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+				yield from self._iter_pages_parallel(page_count, workers)
+				return
+
+			memo: Dict[int, bytes] = {}
+			with self.backend.document(self.pdf_path) as extract:
+				for idx, page in enumerate(pdf.pages, start=1):
+					yield idx, _extract_page(page, extract, self.backend, self.cache, memo)
+
+	def _iter_pages_parallel(self, page_count: int, workers: int) -> Iterator[Tuple[int, str]]:
+		# Two ranges per worker keeps the pool busy when some pages are much
+		# denser than others.
+		chunk = max(1, -(-page_count // (workers * 2)))
+		firsts = list(range(1, page_count + 1, chunk))
+		lasts = [min(first + chunk - 1, page_count) for first in firsts]
+
+		cache_config = (self.cache.path, self.cache.max_bytes) if self.cache else None
+		# Never fork: callers are often threaded web workers, and a forked
+		# copy of a lock held by another thread never gets released
+		with ProcessPoolExecutor(max_workers=min(workers, len(firsts)), mp_context=_mp_context()) as pool:
+			results = pool.map(
+				_extract_page_range,
+				[_picklable_source(self.pdf_path)] * len(firsts),
+				firsts,
+				lasts,
+				[cache_config] * len(firsts),
+				[self.backend.name] * len(firsts),
+			)
+			for first, texts in zip(firsts, results):
+				for offset, page_text in enumerate(texts):
+					yield first + offset, page_text
+
+	def preflight(self, pdf_path: Optional[PdfSource] = None) -> Dict[str, Any]:
+		"""Cheaply describe a PDF before committing to full extraction.
+
+		Reads the page count plus, per page, whether the content streams draw
+		any text and how many bytes they hold. No layout analysis runs, so this
+		takes milliseconds. The result also carries ``text_pages`` and an
+		``estimated_seconds`` figure for the default extraction path.
+		"""
+
+		if pdf_path:
+			self.pdf_path = pdf_path
 
 		if pdfplumber is None:
 			raise ImportError("pdfplumber is required to extract PDF text")
 
-		extracted = []
-		with pdfplumber.open(self.pdf_path) as pdf:
-			for idx, page in enumerate(pdf.pages, start=1):
-				page_text = page.extract_text() or ""
-				extracted.append(f"--- PAGE {idx} ---\n{page_text}\n")
+		with _open_pdf(self.pdf_path) as pdf:
+			pages = [_page_preflight(page) for page in pdf.pages]
+
+		if hasattr(self.pdf_path, "seek"):
+			self.pdf_path.seek(0)
+
+		content_bytes = sum(page["content_bytes"] for page in pages)
+		return {
+			"page_count": len(pages),
+			"text_pages": sum(1 for page in pages if page["has_text"]),
+			"content_bytes": content_bytes,
+			"estimated_seconds": round(len(pages) * SECONDS_PER_PAGE + content_bytes * SECONDS_PER_CONTENT_BYTE, 2),
+			"pages": pages,
+		}
+
+	@staticmethod
+	def format_page(page_number: int, page_text: str) -> str:
+		"""Render a page with the ``--- PAGE n ---`` marker used in ``raw_text``."""
+
+		return f"--- PAGE {page_number} ---\n{page_text}\n"
+
+	def extract_text_from_pdf(self, pdf_path: Optional[PdfSource] = None, workers: Optional[int] = 1) -> str:
+		"""Extract text from a PDF file with the configured backend."""
 
+		extracted = [self.format_page(idx, page_text) for idx, page_text in self.iter_pages(pdf_path, workers)]
 		self.raw_text = "\n".join(extracted)
 		return self.raw_text
 
+	def iter_problems(self, pdf_path: Optional[PdfSource] = None, workers: Optional[int] = 1) -> Iterator[Dict[str, str]]:
+		"""Yield parsed problems while the PDF is still being extracted.
+
+		Pages go through an :class:`IncrementalProblemParser`, so a problem is
+		emitted as soon as the next ``Problem n`` style delimiter closes it,
+		and the first problem is available after the page it ends on rather
+		than after the last page.
+		"""
+
+		parser = IncrementalProblemParser(self)
+		for idx, page_text in self.iter_pages(pdf_path, workers):
+			yield from parser.feed(page_text, idx)
+		yield from parser.close()
+
 	def identify_problem_type(self, text: str) -> str:
-		"""Identify a problem type based on keyword matching."""
-
-		text_lower = text.lower()
-
-		keyword_map = [
-			("calculus", ["derivative", "integral", "limit", "d/d", "differentiate", "∫", "derivada", "integral", "limite", "límite"]),
-			("circuit_analysis", ["kirchhoff", "ohm", "voltage", "current", "circuit", "resistance", "voltaje", "corriente", "resistencia", "circuito"]),
-			("thermodynamics", ["entropy", "enthalpy", "thermo", "heat", "cycle", "entropia", "entalpia", "calor", "ciclo"]),
-			("mechanics_of_materials", ["stress", "strain", "young", "beam", "torsion", "bending", "esfuerzo", "deformacion", "viga", "torsion", "flexion"]),
-			("fluid_mechanics", ["fluid", "flow", "bernoulli", "continuity", "viscosity", "fluido", "flujo", "continuidad", "viscosidad"]),
-			("heat_transfer", ["conduction", "convection", "radiation", "heat transfer", "conduccion", "conveccion", "radiacion", "transferencia de calor"]),
-			("electromagnetics", ["coulomb", "electric", "magnetic", "charge", "field", "electrico", "magnetico", "carga", "campo"]),
-			("mass_balance", ["mass balance", "stream", "composition", "reactor", "flowrate", "balance de masa", "corriente", "composicion", "reactor", "caudal"]),
-			("structural_analysis", ["deflection", "shear", "moment", "support", "truss", "deflexion", "cortante", "momento", "soporte", "cercha"]),
-			("control_systems", ["controller", "transfer function", "feedback", "pid", "pi controller", "controlador", "funcion de transferencia", "realimentacion"]),
-			("chemistry", ["stoichiometry", "mole", "reaction", "equilibrium", "acid", "base", "estequiometria", "mol", "reaccion", "equilibrio", "acido", "base"]),
-			("physics", ["force", "newton", "acceleration", "energy", "momentum", "work", "fuerza", "aceleracion", "energia", "momento", "trabajo"]),
-			("algebra", ["quadratic", "linear", "factor", "solve", "polynomial", "equation", "algebra", "polinomio", "ecuacion"]),
-			("geometry", ["triangle", "circle", "area", "volume", "perimeter", "angle", "triangulo", "circulo", "area", "volumen", "perimetro", "angulo"]),
-			("aerodynamics", ["airfoil", "lift", "drag", "mach", "aero", "aerodinamica", "sustentacion", "arrastre", "mach"]),
-		]
+		"""Identify a problem type based on keyword matching.
 
-		for category, keywords in keyword_map:
-			if any(keyword in text_lower for keyword in keywords):
-				return category
+		Returns the first category in ``PROBLEM_KEYWORDS`` order with any
+		keyword in the text. Matching ignores case and accents.
+		"""
 
-		return "other"
+		return problem_features(text).first_hit(_KEYWORD_AUTOMATON) or "other"
 
-	def parse_problems(self) -> List[Dict[str, str]]:
-		"""Parse problems from raw text using multiple delimiter patterns."""
+	def problem_type_scores(self, text: str) -> Dict[str, int]:
+		"""Count keyword hits per category, for callers that rank categories."""
 
-		if not self.raw_text:
-			return []
+		return dict(problem_features(text).category_hits(_KEYWORD_AUTOMATON))
 
-		text = self.raw_text.replace("\r\n", "\n")
+	def parse_problems(self) -> ProblemSet:
+		"""Parse problems from raw text using multiple delimiter patterns.
 
-		patterns = [
-			r"(?:^|\n)\s*(?:Problem|Prob\.?|Question|Q|Exercise|Ex\.?|E|Pr\.?|Problema|Pregunta|Ejercicio|Ej\.?)\s*[#]*([0-9]+)\s*[:.\-]*\s*",
-			r"(?:^|\n)\s*([0-9]+)\s*[.)\-]\s+",
-			r"(?:^|\n)\s*(?:Section|Part|Seccion|Sección|Parte)\s*([0-9]+)\s*[:.\-]*\s*",
-			r"(?:^|\n)\s*(?:Pagina|Página|Page)\s*([0-9]+)\s*[:.\-]*\s*",
-		]
+		All delimiter families are found in one scan (:func:`scan_delimiters`);
+		the first family, in priority order, that encloses any text wins.
 
-		for pattern in patterns:
-			matches = list(re.finditer(pattern, text, flags=re.IGNORECASE | re.MULTILINE))
-			if not matches:
-				continue
+		Returns a :class:`ProblemSet` whose items read like the
+		``{"number", "text", "type"}`` dicts earlier versions returned.
+		"""
 
-			problems: List[Dict[str, str]] = []
-			for idx, match in enumerate(matches, start=1):
-				start = match.end()
-				end = matches[idx].start() if idx < len(matches) else len(text)
-				problem_text = text[start:end].strip()
-				if not problem_text:
+		if not self.raw_text:
+			return ProblemSet()
+
+		return self._parse_text(self.raw_text.replace("\r\n", "\n"))
+
+	def _parse_text(self, text: str) -> ProblemSet:
+		for spans in scan_delimiters(text).values():
+			problems = ProblemSet(text)
+			for idx, (_, start, number_str) in enumerate(spans, start=1):
+				end = spans[idx][0] if idx < len(spans) else len(text)
+				start, end = _strip_span(text, start, end)
+				if start == end:
 					continue
 
-				number_str = match.group(1) if match.groups() else str(idx)
 				try:
 					number = int(number_str)
 				except ValueError:
 					number = idx
 
-				problems.append({
-					"number": number,
-					"text": problem_text,
-					"type": self.identify_problem_type(problem_text),
-				})
+				problems.append(number, start, end, self.identify_problem_type(text[start:end]))
 
 			if problems:
 				return problems
 
-		chunks = [chunk.strip() for chunk in re.split(r"\n{2,}", text) if chunk.strip()]
-		problems = []
-		for idx, chunk in enumerate(chunks, start=1):
-			if len(chunk) < 10:
+		# Same chunks as re.split(r"\n{2,}", text), tracked as offsets
+		problems = ProblemSet(text)
+		idx = 0
+		chunk_start = 0
+		for separator in [*re.finditer(r"\n{2,}", text), None]:
+			chunk_end = separator.start() if separator else len(text)
+			start, end = _strip_span(text, chunk_start, chunk_end)
+			if separator:
+				chunk_start = separator.end()
+			if start == end:
 				continue
-			problems.append({
-				"number": idx,
-				"text": chunk,
-				"type": self.identify_problem_type(chunk),
-			})
+			idx += 1
+			if end - start < 10:
+				continue
+			problems.append(idx, start, end, self.identify_problem_type(text[start:end]))
 		return problems
 
 
 class HomeworkAnalyzerAlgorithm(ProblemAnalyzer):
 	"""End-to-end analyzer used by web and GUI apps."""
 
-	def extract_and_analyze(self, pdf_path: Optional[str] = None) -> List[Dict[str, str]]:
-		"""Extract PDF text and return parsed problems."""
+	def extract_and_analyze(self, pdf_path: Optional[PdfSource] = None, workers: Optional[int] = 1) -> ProblemSet:
+		"""Extract PDF text and return parsed problems.
+
+		When a cache is configured, results are looked up by the SHA-256 of the
+		PDF bytes, ``EXTRACTOR_VERSION`` and the extraction backend before
+		pdfplumber is touched.
+		"""
+
+		if pdf_path:
+			self.pdf_path = pdf_path
+
+		if self.cache is None or not self.pdf_path:
+			self.extract_text_from_pdf(pdf_path, workers)
+			return self.parse_problems()
+
+		key = self._cache_key()
+		problems = self._load_cached(key)
+		if problems is not None:
+			return ProblemSet.from_dicts(problems)
+
+		pages = [page_text for _, page_text in self.iter_pages(workers=workers)]
+		self.raw_text = "\n".join(self.format_page(idx, text) for idx, text in enumerate(pages, start=1))
+		problems = self.parse_problems()
+		if self.truncated is None:
+			self.cache.put(key, pages, problems.to_list())
+		return problems
+
+	def cached_problems(self, pdf_path: Optional[PdfSource] = None) -> Optional[List[Dict[str, Any]]]:
+		"""Return the cached problems of the PDF, or None if it is not cached.
+
+		Never extracts. On a hit ``raw_text`` is set, as after a full analysis.
+		"""
 
-		self.extract_text_from_pdf(pdf_path)
-		return self.parse_problems()
+		if pdf_path:
+			self.pdf_path = pdf_path
+
+		if self.cache is None or not self.pdf_path:
+			return None
+		return self._load_cached(self._cache_key())
+
+	def _cache_key(self) -> str:
+		return self.cache.make_key(hash_source(self.pdf_path), _cache_version(self.backend))
+
+	def _load_cached(self, key: str) -> Optional[List[Dict[str, Any]]]:
+		cached = self.cache.get(key)
+		if cached is None:
+			return None
+		pages, problems = cached
+		self.raw_text = "\n".join(self.format_page(idx, text) for idx, text in enumerate(pages, start=1))
+		return problems
+
+	def iter_problems(self, pdf_path: Optional[PdfSource] = None, workers: Optional[int] = 1) -> Iterator[Dict[str, Any]]:
+		"""Yield parsed problems while the PDF is still being extracted.
+
+		Uses the same cache as :meth:`extract_and_analyze`: a hit yields the
+		stored problems at once, and a complete miss is stored when the last
+		problem has been yielded. ``raw_text`` is set once iteration ends.
+		"""
+
+		if pdf_path:
+			self.pdf_path = pdf_path
+
+		if self.cache is None or not self.pdf_path:
+			yield from super().iter_problems(workers=workers)
+			return
+
+		key = self._cache_key()
+		cached = self._load_cached(key)
+		if cached is not None:
+			yield from cached
+			return
+
+		pages: List[str] = []
+		problems = []
+		parser = IncrementalProblemParser(self)
+		for idx, page_text in self.iter_pages(workers=workers):
+			pages.append(page_text)
+			for problem in parser.feed(page_text, idx):
+				problems.append(problem)
+				yield problem
+		for problem in parser.close():
+			problems.append(problem)
+			yield problem
+
+		self.raw_text = "\n".join(self.format_page(idx, text) for idx, text in enumerate(pages, start=1))
+		if self.truncated is None:
+			self.cache.put(key, pages, problems)
 
 
 class SolutionGenerator:
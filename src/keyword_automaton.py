@@ -0,0 +1,118 @@
+"""
+Multi-keyword matching for the AI Homework Analyzer.
+An Aho-Corasick automaton over accent-folded, lowercased text finds every
+keyword of every category in one pass, so classifying a problem costs one
+walk over its text instead of one substring search per keyword.
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+import unicodedata
+from collections import deque
+from typing import Callable, Dict, List, Sequence, Tuple
+
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+_CHAR_CLASS = re.compile(r"(\[[^\]]+\])")
+_REGEX_SYNTAX = re.compile(r"[.*+?^${}()\\]")
+
+
+def fold_text(text: str) -> str:
+	"""Lowercase ``text`` and strip accents, so ``Límite`` reads as ``limite``."""
+
+	return _COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text.lower()))
+
+
+def expand_pattern(pattern: str) -> List[str]:
+	"""Expand a ``(foo|b[aá]r)`` alternation of literals into the strings it matches.
+
+	Only literals and single-character classes are supported; anything else
+	raises ``ValueError`` rather than silently scoring the wrong terms.
+	"""
+
+	literals = []
+	for alternative in pattern[1:-1].split("|") if pattern.startswith("(") and pattern.endswith(")") else [pattern]:
+		parts = [part for part in _CHAR_CLASS.split(alternative) if part]
+		choices = [list(part[1:-1]) if part.startswith("[") else [part] for part in parts]
+		for combination in itertools.product(*choices):
+			literal = "".join(combination)
+			if _REGEX_SYNTAX.search(literal):
+				raise ValueError(f"Cannot expand {pattern!r} into literal terms")
+			literals.append(literal.lower())
+	return literals
+
+
+class KeywordAutomaton:
+	"""Aho-Corasick automaton mapping keywords to the categories that list them.
+
+	``keyword_map`` is an ordered sequence of ``(category, keywords)`` pairs;
+	keywords are folded with :func:`fold_text` and may appear under more than
+	one category. With ``fold=False`` text and keywords are only lowercased.
+	"""
+
+	def __init__(self, keyword_map: Sequence[Tuple[str, Sequence[str]]], fold: bool = True):
+		self.categories: List[str] = [category for category, _ in keyword_map]
+		self.fold = fold
+		self.normalize: Callable[[str], str] = fold_text if fold else str.lower
+
+		goto: List[Dict[str, int]] = [{}]
+		outputs: List[List[int]] = [[]]
+		for index, (_, keywords) in enumerate(keyword_map):
+			for keyword in {self.normalize(keyword) for keyword in keywords}:
+				state = 0
+				for char in keyword:
+					if char not in goto[state]:
+						goto.append({})
+						outputs.append([])
+						goto[state][char] = len(goto) - 1
+					state = goto[state][char]
+				outputs[state].append(index)
+
+		# Breadth-first failure links, folded into a full transition table so
+		# the scan never has to follow them at match time.
+		fail = [0] * len(goto)
+		delta: List[Dict[str, int]] = [dict(goto[0])]
+		delta.extend({} for _ in range(len(goto) - 1))
+		queue = deque(goto[0].values())
+		while queue:
+			state = queue.popleft()
+			outputs[state] = outputs[state] + outputs[fail[state]]
+			delta[state] = dict(delta[fail[state]])
+			for char, child in goto[state].items():
+				delta[state][char] = child
+				fail[child] = delta[fail[state]].get(char, 0)
+				queue.append(child)
+
+		self._delta = delta
+		self._outputs: List[Tuple[int, ...]] = [tuple(output) for output in outputs]
+
+	def hit_counts(self, text: str, normalized: bool = False) -> Dict[str, int]:
+		"""Return how many keyword occurrences each category has in ``text``.
+
+		Pass ``normalized=True`` when ``text`` has already been through
+		``self.normalize`` (see :class:`problem_features.ProblemFeatures`).
+		"""
+
+		counts = [0] * len(self.categories)
+		delta = self._delta
+		outputs = self._outputs
+		state = 0
+		for char in text if normalized else self.normalize(text):
+			state = delta[state].get(char, 0)
+			for index in outputs[state]:
+				counts[index] += 1
+		return dict(zip(self.categories, counts))
+
+	def term_hits(self, text: str) -> List[int]:
+		"""Return the category index of every keyword occurrence in ``text``."""
+
+		found: List[int] = []
+		delta = self._delta
+		outputs = self._outputs
+		state = 0
+		for char in self.normalize(text):
+			state = delta[state].get(char, 0)
+			if outputs[state]:
+				found.extend(outputs[state])
+		return found
@@ -0,0 +1,99 @@
+"""
+Per-problem text features for the AI Homework Analyzer.
+A ``ProblemFeatures`` is built once per problem text: the normalized forms
+and numbers are computed on first use, and keyword hits are counted once per
+automaton and remembered. The classifier, the solver and the visualizer all
+read from the same object instead of rescanning the text.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from keyword_automaton import KeywordAutomaton, fold_text
+
+# Numbers as the visualizer has always read them
+_NUMBER = re.compile(r"-?\d+\.?\d*")
+_SPANISH_CHARS = re.compile(r"[áéíóúñ¿¡]")
+
+SPANISH_MARKERS = {
+	'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'y', 'o', 'pero',
+	'porque', 'para', 'con', 'sin', 'sobre', 'entre', 'dado', 'dada', 'dados',
+	'dadas', 'encuentra', 'calcula', 'determina', 'resuelve', 'resolver',
+	'hallar', 'problema', 'ejercicio', 'pregunta', 'si', 'entonces', 'donde'
+}
+
+# Markers count as substrings of the lowercased text, as they always have.
+_MARKER_AUTOMATON = KeywordAutomaton([(marker, [marker]) for marker in sorted(SPANISH_MARKERS)], fold=False)
+
+
+class ProblemFeatures:
+	"""Normalized text, numbers, keyword hits and language hints of one problem."""
+
+	__slots__ = ("text", "lower", "_folded", "_numbers", "_hits", "language")
+
+	def __init__(self, text: str):
+		self.text = text
+		self.lower = text.lower()
+		self._folded: Optional[str] = None
+		self._numbers: Optional[List[str]] = None
+		# Keyed by the automaton itself, not its id(): the features outlive
+		# per-analyzer automata, and a new one could reuse a freed id.
+		self._hits: Dict[KeywordAutomaton, Dict[str, int]] = {}
+		# Filled in by the language detector the first time it sees this text.
+		self.language: Optional[str] = None
+
+	@property
+	def folded(self) -> str:
+		"""Lowercased, accent-stripped text (see :func:`fold_text`)."""
+
+		if self._folded is None:
+			self._folded = fold_text(self.text)
+		return self._folded
+
+	@property
+	def numbers(self) -> List[str]:
+		"""Numeric literals in the text, in order, as strings."""
+
+		if self._numbers is None:
+			self._numbers = _NUMBER.findall(self.lower)
+		return self._numbers
+
+	def category_hits(self, automaton: KeywordAutomaton) -> Dict[str, int]:
+		"""Per-category hit counts for ``automaton``, counted once per problem."""
+
+		counts = self._hits.get(automaton)
+		if counts is None:
+			counts = automaton.hit_counts(self.folded if automaton.fold else self.lower, normalized=True)
+			self._hits[automaton] = counts
+		return counts
+
+	def first_hit(self, automaton: KeywordAutomaton) -> Optional[str]:
+		"""First category of ``automaton``, in priority order, with any hit."""
+
+		for category, count in self.category_hits(automaton).items():
+			if count:
+				return category
+		return None
+
+	@property
+	def language_hints(self) -> Dict[str, int]:
+		"""Heuristic Spanish evidence: accented characters and distinct marker words."""
+
+		return {
+			"spanish_chars": int(_SPANISH_CHARS.search(self.lower) is not None),
+			"spanish_markers": sum(1 for count in self.category_hits(_MARKER_AUTOMATON).values() if count),
+		}
+
+
+@lru_cache(maxsize=512)
+def problem_features(text: str) -> ProblemFeatures:
+	"""Return the shared :class:`ProblemFeatures` for ``text``.
+
+	Every stage asks for features by text, so the first stage to see a
+	problem pays for the lexing and later stages get the same object back.
+	"""
+
+	return ProblemFeatures(text)
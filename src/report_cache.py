@@ -0,0 +1,129 @@
+"""
+Whole-report cache for the AI Homework Analyzer.
+Stores the final ``/analyze`` response for a PDF, keyed by the SHA-256 of
+its bytes, the pipeline version and the language mode, so a byte-identical
+upload is answered without extraction, solving or chart rendering. Negative
+results ("No problems found") are cached too, for a shorter time.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+	key TEXT PRIMARY KEY,
+	response TEXT NOT NULL,
+	status INTEGER NOT NULL,
+	size INTEGER NOT NULL,
+	expires REAL NOT NULL,
+	last_access REAL NOT NULL
+)
+"""
+
+
+class ReportCache:
+	"""SQLite-backed cache of finished reports with TTL and size-based LRU eviction.
+
+	Successful reports live for ``ttl`` seconds and negative ones (an error
+	status) for ``negative_ttl``; all entries share the ``max_bytes`` budget.
+	"""
+
+	def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600, negative_ttl: float = 600):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.ttl = ttl
+		self.negative_ttl = negative_ttl
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		with self._connect() as conn:
+			conn.executescript(_SCHEMA)
+
+	@contextmanager
+	def _connect(self) -> Iterator[sqlite3.Connection]:
+		conn = sqlite3.connect(self.path, timeout=30)
+		try:
+			with conn:
+				yield conn
+		finally:
+			conn.close()
+
+	@staticmethod
+	def make_key(digest: str, version: str, language: str) -> str:
+		return f"{digest}:{version}:{language}"
+
+	def get(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+		"""Return the cached ``(response, status)`` for ``key``, or ``None`` on a miss."""
+
+		now = time.time()
+		with self._connect() as conn:
+			row = conn.execute("SELECT response, status, expires FROM reports WHERE key = ?", (key,)).fetchone()
+			if row is not None and row[2] <= now:
+				conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+				row = None
+			if row is not None:
+				conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (now, key))
+
+		with self._lock:
+			if row is None:
+				self.misses += 1
+				return None
+			self.hits += 1
+		return json.loads(row[0]), row[1]
+
+	def put(self, key: str, response: Dict[str, Any], status: int = 200) -> None:
+		"""Store a finished report; error statuses get the negative TTL."""
+
+		response_json = json.dumps(response, ensure_ascii=False)
+		size = len(response_json.encode("utf-8"))
+		if size > self.max_bytes:
+			return
+
+		now = time.time()
+		ttl = self.ttl if status < 400 else self.negative_ttl
+		with self._connect() as conn:
+			conn.execute(
+				"INSERT OR REPLACE INTO reports (key, response, status, size, expires, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+				(key, response_json, status, size, now + ttl, now),
+			)
+			self._evict(conn, now)
+
+	def invalidate(self, key: str) -> None:
+		with self._connect() as conn:
+			conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+
+	def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+		conn.execute("DELETE FROM reports WHERE expires <= ?", (now,))
+		total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+		if total <= self.max_bytes:
+			return
+		for key, size in conn.execute("SELECT key, size FROM reports ORDER BY last_access ASC").fetchall():
+			conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+			total -= size
+			if total <= self.max_bytes:
+				break
+
+	def stats(self) -> Dict[str, int]:
+		"""Return hit/miss counters for this process plus on-disk totals."""
+
+		with self._connect() as conn:
+			entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"entries": entries,
+				"bytes": total,
+				"max_bytes": self.max_bytes,
+			}
@@ -0,0 +1,204 @@
+"""
+Request coalescing for the AI Homework Analyzer.
+When several requests ask for the same computation at once, a
+``SingleFlight`` runs it once and hands every caller the same result.
+Threads in one process wait for the leader directly. Other processes (for
+example other gunicorn workers) wait on a per-key lock file, then read the
+leader's result from a shared cache through the caller's ``lookup``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - Windows: coalesce within a process only
+	fcntl = None
+
+
+# Flight.result before the leader has set it
+_UNSET = object()
+
+
+class _Call:
+	__slots__ = ("done", "finished", "result", "error")
+
+	def __init__(self):
+		self.done = threading.Event()
+		self.finished = False
+		self.result: Any = None
+		self.error: Optional[BaseException] = None
+
+
+class Flight:
+	"""One caller's part in a :meth:`SingleFlight.flight`.
+
+	``shared`` callers find another caller's ``result`` ready; the leader
+	(``shared`` false) does the work and sets ``result`` itself.
+	"""
+
+	__slots__ = ("result", "shared")
+
+	def __init__(self, result: Any = _UNSET, shared: bool = False):
+		self.result = result
+		self.shared = shared
+
+
+class SingleFlight:
+	"""At most one running computation per key, shared by every concurrent caller.
+
+	With ``lock_dir`` set (and ``fcntl`` available), a leader also holds an
+	exclusive lock on ``<lock_dir>/<key digest>.lock``. A leader in another
+	process that finds the lock taken polls ``lookup`` until the holder
+	finishes, and only computes itself if ``lookup`` still finds nothing
+	(the holder failed, or its result was not cacheable) or after
+	``wait_timeout`` seconds.
+	"""
+
+	def __init__(self, lock_dir: Optional[str] = None, poll_interval: float = 0.25, wait_timeout: float = 600.0):
+		self.lock_dir = lock_dir if fcntl is not None else None
+		self.poll_interval = poll_interval
+		self.wait_timeout = wait_timeout
+		self.computed = 0
+		self.shared = 0
+		self._calls: Dict[str, _Call] = {}
+		self._lock = threading.Lock()
+		if self.lock_dir:
+			os.makedirs(self.lock_dir, exist_ok=True)
+
+	def do(self, key: str, func: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> Tuple[Any, bool]:
+		"""Return ``(result, shared)``: ``func()``'s result, or one another caller computed.
+
+		``lookup`` returns a finished result for ``key`` from a shared store,
+		or ``None``; it is only needed for cross-process coalescing. A
+		leader's exception is raised in its in-process followers too.
+		"""
+
+		with self.flight(key, lookup) as flight:
+			if not flight.shared:
+				flight.result = func()
+			return flight.result, flight.shared
+
+	@contextmanager
+	def flight(self, key: str, lookup: Optional[Callable[[], Any]] = None) -> Iterator[Flight]:
+		"""Context-manager form of :meth:`do`, for work that is not one call.
+
+		Yields a :class:`Flight`. A leader keeps the key until the block
+		exits, so a generator can hold it while it streams; it publishes its
+		work by setting ``flight.result`` before leaving the block. Followers
+		of a leader that leaves without a result (a closed generator) start
+		over, and one of them leads.
+		"""
+
+		while True:
+			with self._lock:
+				call = self._calls.get(key)
+				leader = call is None
+				if leader:
+					call = self._calls[key] = _Call()
+			if leader:
+				break
+
+			call.done.wait()
+			if call.error is not None:
+				with self._lock:
+					self.shared += 1
+				raise call.error
+			if call.finished:
+				with self._lock:
+					self.shared += 1
+				yield Flight(call.result, shared=True)
+				return
+
+		try:
+			with self._process_lock(key, lookup) as found:
+				if found is not None:
+					with self._lock:
+						self.shared += 1
+					flight = Flight(found, shared=True)
+				else:
+					with self._lock:
+						self.computed += 1
+					flight = Flight()
+				yield flight
+				if flight.result is not _UNSET:
+					call.result = flight.result
+					call.finished = True
+		except Exception as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				del self._calls[key]
+			call.done.set()
+
+	@contextmanager
+	def _process_lock(self, key: str, lookup: Optional[Callable[[], Any]]) -> Iterator[Any]:
+		"""Hold the key's lock file; yields another process's result instead, if one turns up."""
+
+		if self.lock_dir is None:
+			yield None
+			return
+
+		path = os.path.join(self.lock_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".lock")
+		deadline = time.monotonic() + self.wait_timeout
+		fd = _try_lock(path)
+		while fd is None:
+			# Another process is computing this key; its result shows up in
+			# the shared store once it is done
+			time.sleep(self.poll_interval)
+			found = lookup() if lookup else None
+			if found is not None:
+				yield found
+				return
+			if time.monotonic() > deadline:
+				yield None
+				return
+			fd = _try_lock(path)
+
+		try:
+			# The previous holder may have finished just before we got the lock
+			yield lookup() if lookup else None
+		finally:
+			# Unlink before unlocking, so a waiter that opens the path next
+			# gets a fresh file instead of locking this orphaned one
+			try:
+				os.unlink(path)
+			except OSError:
+				pass
+			fcntl.flock(fd, fcntl.LOCK_UN)
+			os.close(fd)
+
+	def stats(self) -> Dict[str, int]:
+		"""Computations run and results shared by this process."""
+
+		with self._lock:
+			return {"computed": self.computed, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+def _try_lock(path: str) -> Optional[int]:
+	"""Take the lock file at ``path`` without blocking; ``None`` if it is held."""
+
+	while True:
+		fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+		try:
+			fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+		except BlockingIOError:
+			os.close(fd)
+			return None
+		# The holder may have unlinked the file between our open and flock;
+		# a lock on an unlinked file coordinates with nobody
+		try:
+			current = os.stat(path).st_ino == os.fstat(fd).st_ino
+		except FileNotFoundError:
+			current = False
+		if current:
+			return fd
+		fcntl.flock(fd, fcntl.LOCK_UN)
+		os.close(fd)
@@ -0,0 +1,97 @@
+"""
+Shared solution templates for the AI Homework Analyzer.
+Every solution of one type carries the same explanations, worked examples,
+theories and mistakes. A ``SolutionTemplate`` builds that body once and
+freezes it. Each problem's solution is a fresh top-level dict holding its own
+fields (number, problem, analysis); the nested body is shared, not copied.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable, Dict
+
+
+def _read_only(self, *args, **kwargs):
+	raise TypeError(f"{type(self).__name__} is shared by every solution of its type; replace the top-level key instead")
+
+
+class FrozenDict(dict):
+	"""A ``dict`` that refuses mutation, so JSON encoding and ``isinstance`` still work."""
+
+	__slots__ = ()
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+	def __reduce__(self):
+		return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+	"""A ``list`` that refuses mutation."""
+
+	__slots__ = ()
+	__setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+	append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+	def __reduce__(self):
+		return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+	"""Recursively turn dicts and lists into their read-only counterparts."""
+
+	if isinstance(value, dict):
+		return FrozenDict((key, freeze(item)) for key, item in value.items())
+	if isinstance(value, list):
+		return FrozenList(freeze(item) for item in value)
+	return value
+
+
+class SolutionTemplate:
+	"""The frozen body shared by every solution of one type."""
+
+	__slots__ = ("body",)
+
+	def __init__(self, body: Dict[str, Any]):
+		self.body = freeze(body)
+
+	def render(self, **fields: Any) -> Dict[str, Any]:
+		"""Return one problem's solution: the shared body with ``fields`` overlaid.
+
+		Only the top-level dict is new, and its keys keep the template's
+		order. Nested values stay shared and read-only; to change one,
+		assign a new value to its top-level key (copy-on-write).
+		"""
+
+		solution = dict(self.body)
+		solution.update(fields)
+		return solution
+
+	def overlay(self, key: str, **fields: Any) -> Dict[str, Any]:
+		"""A fresh copy of the nested dict at ``key`` with ``fields`` overlaid."""
+
+		section = dict(self.body[key])
+		section.update(fields)
+		return section
+
+
+def shared_template(build: Callable[..., Dict[str, Any]]) -> Callable[..., SolutionTemplate]:
+	"""Decorate a template builder so it runs once per process.
+
+	The builder must not depend on its arguments (usually just ``self``);
+	the first call freezes its result and every later call returns it.
+	"""
+
+	built = []
+	lock = threading.Lock()
+
+	@functools.wraps(build)
+	def template(*args: Any) -> SolutionTemplate:
+		if not built:
+			with lock:
+				if not built:
+					built.append(SolutionTemplate(build(*args)))
+		return built[0]
+
+	return template
@@ -3,10 +3,55 @@ Visualization Module for AI Homework Analyzer & Solver
 Creates graphs, charts, and visual reports
 """
 
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from collections import Counter
 import os
+import threading
+
+from keyword_automaton import KeywordAutomaton
+from problem_features import problem_features
+
+# Content cues that pick an individual problem's diagram, matched as
+# substrings of the lowercased problem text.
+_DIAGRAM_CUES = KeywordAutomaton([
+    ('sets', ['set', 'union', 'intersection', 'venn', 'complement', 'element']),
+    ('probability_tree', ['tree diagram', 'sequential', 'then', 'followed by']),
+    ('inequality', ['inequality', 'less than', 'greater than', 'range', '>', '<', '≤', '≥']),
+    ('force', ['force', 'friction', 'tension', 'weight', 'mass', 'acceleration', 'newton']),
+    ('statistics', ['mean', 'median', 'mode', 'data', 'frequency', 'distribution']),
+    ('logic', ['truth table', 'logical', 'statement', 'implies', 'contrapositive']),
+], fold=False)
+
+# Charts are drawn on their own Figure with an Agg canvas, never through
+# pyplot, so requests in different threads can render at the same time.
+_STYLE = 'seaborn-v0_8-darkgrid'
+_style_lock = threading.Lock()
+_style_loaded = False
+
+
+def _load_style():
+    """Load the chart style into rcParams once per process.
+
+    Artists read rcParams while a figure is drawn, so the style is set up
+    before the first chart and left alone afterwards; a per-figure
+    ``style.context`` would swap the process-wide values under figures
+    other threads are still drawing.
+    """
+    global _style_loaded
+    with _style_lock:
+        if not _style_loaded:
+            matplotlib.style.use(_STYLE)
+            _style_loaded = True
+
+
+def _subplots(nrows=1, ncols=1, figsize=None):
+    """Like ``plt.subplots``, but the figure is not registered with pyplot"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, ncols)
 
 
 class ReportVisualizer:
@@ -16,8 +61,7 @@ class ReportVisualizer:
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
-        # Set style
-        plt.style.use('seaborn-v0_8-darkgrid')
+        _load_style()
         self.colors = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#00f2fe',
                       '#43e97b', '#fa75a6', '#feca57', '#ff6b6b', '#4ecdc4']
     
@@ -31,7 +75,7 @@ class ReportVisualizer:
         type_counts = Counter(types)
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(10, 7))
+        fig, ax = _subplots(figsize=(10, 7))
         
         # Pie chart
         wedges, texts, autotexts = ax.pie(
@@ -53,9 +97,8 @@ class ReportVisualizer:
         
         # Save
         filepath = os.path.join(self.output_dir, 'problem_distribution.png')
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=300, bbox_inches='tight')
         
         return filepath
     
@@ -69,7 +112,7 @@ class ReportVisualizer:
         type_counts = Counter(types)
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig, ax = _subplots(figsize=(12, 6))
         
         # Bar chart
         bars = ax.bar(
@@ -96,9 +139,8 @@ class ReportVisualizer:
         
         # Save
         filepath = os.path.join(self.output_dir, 'problem_count_bar.png')
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=300, bbox_inches='tight')
         
         return filepath
     
@@ -117,7 +159,7 @@ class ReportVisualizer:
         counts = [d[1] for d in sorted_domains]
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(14, 6))
+        fig, ax = _subplots(figsize=(14, 6))
         
         # Horizontal bar chart
         bars = ax.barh(domains, counts, color=self.colors[:len(domains)],
@@ -136,15 +178,14 @@ class ReportVisualizer:
         
         # Save
         filepath = os.path.join(self.output_dir, 'theory_coverage.png')
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=300, bbox_inches='tight')
         
         return filepath
     
     def plot_statistics_summary(self, problems, theories_dict):
         """Create comprehensive statistics dashboard"""
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
+        fig, ((ax1, ax2), (ax3, ax4)) = _subplots(2, 2, figsize=(14, 10))
         
         # 1. Problem type pie chart
         if problems:
@@ -215,12 +256,11 @@ Coverage:
         ax4.axis('off')
         
         fig.suptitle('Homework Analysis Dashboard', fontsize=16, weight='bold', y=0.98)
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Save
         filepath = os.path.join(self.output_dir, 'statistics_dashboard.png')
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.savefig(filepath, dpi=300, bbox_inches='tight')
         
         return filepath
     
@@ -228,7 +268,7 @@ Coverage:
         """Create example function plot for demonstration"""
         import numpy as np
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = _subplots(figsize=(10, 6))
         
         # Example: Plot multiple functions
         x = np.linspace(-5, 5, 1000)
@@ -255,9 +295,8 @@ Coverage:
         
         # Save
         filepath = os.path.join(self.output_dir, 'function_example.png')
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=300, bbox_inches='tight')
         
         return filepath
     
@@ -267,18 +306,17 @@ Coverage:
         from matplotlib.patches import Circle, FancyBboxPatch, FancyArrowPatch
         
         problem_type = problem.get('type', '').lower()
-        problem_text = problem.get('problem', '').lower()
-        
         # Analyze problem content for specific diagram types
-        has_sets = any(word in problem_text for word in ['set', 'union', 'intersection', 'venn', 'complement', 'element'])
-        has_probability_tree = any(word in problem_text for word in ['tree diagram', 'sequential', 'then', 'followed by'])
-        has_inequality = any(word in problem_text for word in ['inequality', 'less than', 'greater than', 'range', '>', '<', '≤', '≥'])
-        has_force = any(word in problem_text for word in ['force', 'friction', 'tension', 'weight', 'mass', 'acceleration', 'newton'])
-        has_statistics = any(word in problem_text for word in ['mean', 'median', 'mode', 'data', 'frequency', 'distribution'])
-        has_logic = any(word in problem_text for word in ['truth table', 'logical', 'statement', 'implies', 'contrapositive'])
+        cues = problem_features(problem.get('problem', '')).category_hits(_DIAGRAM_CUES)
+        has_sets = cues['sets'] > 0
+        has_probability_tree = cues['probability_tree'] > 0
+        has_inequality = cues['inequality'] > 0
+        has_force = cues['force'] > 0
+        has_statistics = cues['statistics'] > 0
+        has_logic = cues['logic'] > 0
         
         try:
-            fig, ax = plt.subplots(figsize=(5, 4))
+            fig, ax = _subplots(figsize=(5, 4))
             
             # Priority 1: Content-specific diagrams (Venn, trees, etc.)
             if has_sets or 'set theory' in problem_type:
@@ -542,7 +580,7 @@ Coverage:
                 
             elif 'geometry' in problem_type or 'triangle' in problem_type:
                 # Draw a triangle with labels
-                triangle = plt.Polygon([(0, 0), (4, 0), (2, 3)], fill=False, edgecolor='blue', linewidth=2.5)
+                triangle = mpatches.Polygon([(0, 0), (4, 0), (2, 3)], fill=False, edgecolor='blue', linewidth=2.5)
                 ax.add_patch(triangle)
                 
                 # Add labels
@@ -593,33 +631,30 @@ Coverage:
                     ax.text(i, v + 0.1, f'Step {v}', ha='center', va='bottom', 
                            fontsize=10, weight='bold')
             
-            plt.tight_layout()
+            fig.tight_layout()
             
             # Save
             graphs_dir = os.path.join(self.output_dir, 'graphs')
             os.makedirs(graphs_dir, exist_ok=True)
             filepath = os.path.join(graphs_dir, f'problem_{problem_index}_visual.png')
-            plt.savefig(filepath, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.savefig(filepath, dpi=150, bbox_inches='tight')
             
             return filepath
             
         except Exception as e:
             print(f"⚠️ Failed to generate visualization for problem {problem_index}: {e}")
-            plt.close()
             return None
     
     def generate_progression_visualization(self, problem, problem_index, solution_steps=None):
         """Generate problem-specific progression visualization"""
         import numpy as np
-        import re
         
         problem_type = problem.get('type', '').lower()
         problem_text = problem.get('problem', '')
         
         try:
             # Extract numbers
-            numbers = [float(x) for x in re.findall(r'-?\d+\.?\d*', problem_text) if x]
+            numbers = [float(x) for x in problem_features(problem_text).numbers if x]
             
             # Route to specific visualizer
             if 'algebra' in problem_type or 'equation' in problem_type:
@@ -643,7 +678,7 @@ Coverage:
         import numpy as np
         
         try:
-            fig, axes = plt.subplots(2, 2, figsize=(6, 6))
+            fig, axes = _subplots(2, 2, figsize=(6, 6))
             fig.suptitle(f'{viz_type.title()} Problem Progression', fontsize=11, weight='bold', y=0.98)
             
             if viz_type == 'algebra':
@@ -788,7 +823,7 @@ Coverage:
             elif viz_type == 'geometry':
                 # Step 1: Shape
                 ax = axes[0, 0]
-                triangle = plt.Polygon([(0, 0), (4, 0), (2, 3)], fill=False, edgecolor='blue', linewidth=2)
+                triangle = mpatches.Polygon([(0, 0), (4, 0), (2, 3)], fill=False, edgecolor='blue', linewidth=2)
                 ax.add_patch(triangle)
                 ax.plot([2, 2], [0, 3], 'r--', linewidth=1.5)
                 ax.set_xlim(-1, 5)
@@ -837,19 +872,17 @@ Coverage:
                            bbox=dict(boxstyle='round', facecolor=colors[i], edgecolor='black', linewidth=2))
                     ax.set_title(f'Step {i+1}', fontsize=10, weight='bold')
             
-            plt.tight_layout()
+            fig.tight_layout()
             graphs_dir = os.path.join(self.output_dir, 'graphs')
             os.makedirs(graphs_dir, exist_ok=True)
             filepath = os.path.join(graphs_dir, f'problem_{problem_index}_progression.png')
-            plt.savefig(filepath, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.savefig(filepath, dpi=150, bbox_inches='tight')
             return filepath
             
         except Exception as e:
             print(f"❌ Progression visualization error for {problem_index}: {e}")
             import traceback
             traceback.print_exc()
-            plt.close()
             return None
     
     def generate_all_visualizations(self, problems, theories_dict):
@@ -0,0 +1,122 @@
+// Client helpers shared by the analyzer pages: the cache lookup before
+// upload, the /analyze/stream reader and compact report expansion.
+//
+// Hash-first upload avoidance: ask the server for a cached report (or
+// a job already analyzing the same bytes) before sending the PDF.
+// WebCrypto needs a secure context (HTTPS or localhost); without it,
+// or on any lookup failure, the caller just uploads.
+
+// Give up on a job attached through the lookup after this long
+const JOB_WAIT_LIMIT_MS = 10 * 60 * 1000;
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function sha256Hex(file) {
+    if (!(window.crypto && crypto.subtle && file.arrayBuffer)) {
+        return null;
+    }
+    const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+// Resolves to the expanded report, an {error} object, or null when the
+// caller should upload the file itself
+async function lookupCachedReport(file, format) {
+    try {
+        const sha256 = await sha256Hex(file);
+        if (!sha256) {
+            return null;
+        }
+        const response = await fetch('/api/analyze/lookup', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(format ? { sha256, format } : { sha256 })
+        });
+        if (response.status === 404) {
+            return null;
+        }
+        const data = response.status === 202
+            ? await waitForJob(await response.json())
+            : await response.json();
+        return rehydrate(data);
+    } catch (err) {
+        console.warn('Cache lookup skipped:', err);
+        return null;
+    }
+}
+
+async function waitForJob(job, maxWaitMs = JOB_WAIT_LIMIT_MS) {
+    const deadline = Date.now() + maxWaitMs;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const response = await fetch(job.result_url);
+        if (response.status !== 202) {
+            return await response.json();
+        }
+    }
+    const minutes = Math.round(maxWaitMs / 60000);
+    return { error: `The analysis of this file is still running after ${minutes} minutes. Please try again later.` };
+}
+
+// Expand a compact response: {"$t": i} stands for data.templates[i],
+// which may itself hold references. Already expanded data is returned as is.
+function rehydrate(data) {
+    if (data.format !== 'compact' || !data.templates) {
+        return data;
+    }
+    const templates = data.templates;
+    const resolved = new Array(templates.length);
+    const expand = (value) => {
+        if (Array.isArray(value)) {
+            return value.map(expand);
+        }
+        if (value && typeof value === 'object') {
+            const keys = Object.keys(value);
+            if (keys.length === 1 && keys[0] === '$t') {
+                const index = value.$t;
+                if (resolved[index] === undefined) {
+                    resolved[index] = expand(templates[index]);
+                }
+                return resolved[index];
+            }
+            const expanded = {};
+            for (const key of keys) {
+                expanded[key] = expand(value[key]);
+            }
+            return expanded;
+        }
+        return value;
+    };
+    data.solutions = expand(data.solutions);
+    data.cliff_notes = expand(data.cliff_notes);
+    delete data.templates;
+    return data;
+}
+
+// True where a response body can be read incrementally
+function canStreamResponses() {
+    return Boolean(window.ReadableStream && window.TextDecoder && 'body' in Response.prototype);
+}
+
+// Read an /analyze/stream response: one JSON event per line ('header', then
+// a 'solution' per problem, then 'cliff_notes'; 'error' on failure), each
+// passed to handle as it arrives
+async function readEventStream(response, handle) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+        let newline;
+        while ((newline = buffered.indexOf('\n')) >= 0) {
+            const line = buffered.slice(0, newline).trim();
+            buffered = buffered.slice(newline + 1);
+            if (line) {
+                handle(JSON.parse(line));
+            }
+        }
+        if (done) {
+            return;
+        }
+    }
+}
@@ -0,0 +1,170 @@
+"""
+Unit tests for background analysis jobs
+"""
+
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from analysis_jobs import JobQueue, JobStore, SqliteJobStore, QueueFull, DONE, FAILED
+
+
+def wait_for(store, job_id):
+    """Poll until the job has finished and return its record"""
+    for _ in range(500):
+        job = store.get(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test job records, progress, results and the queue bound"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def stores(self, **settings):
+        # Built with keyword settings, as the web app does
+        path = os.path.join(self.tmpdir.name, 'jobs.sqlite3')
+        return [JobStore(**settings), SqliteJobStore(path, **settings)]
+
+    def test_result_and_progress(self):
+        """Test that a finished job keeps its last progress and its result"""
+        def work(count, progress):
+            for done in range(1, count + 1):
+                progress('solving', done, count)
+            return {'total_problems': count}
+
+        for store in self.stores():
+            queue = JobQueue(store, workers=1)
+            job = queue.submit(work, 3, filename='sheet.pdf')
+            self.assertEqual(job['status'], 'queued')
+
+            finished = wait_for(store, job['id'])
+            self.assertEqual(finished['status'], DONE)
+            self.assertEqual(finished['progress'], {'done': 3, 'total': 3})
+            self.assertEqual(finished['filename'], 'sheet.pdf')
+            self.assertEqual(store.get_result(job['id']), {'total_problems': 3})
+
+    def test_caller_named_job(self):
+        """Test that a job can take the ID of the run it belongs to"""
+        queue = JobQueue(JobStore(), workers=1)
+        job = queue.submit(lambda progress: 'ok', job_id='a' * 32)
+        self.assertEqual(job['id'], 'a' * 32)
+        self.assertEqual(wait_for(queue.store, 'a' * 32)['status'], DONE)
+
+    def test_find_active_by_content(self):
+        """Test that a running job is found by its content key until it finishes"""
+        for store in self.stores():
+            release = threading.Event()
+            queue = JobQueue(store, workers=1)
+            job = queue.submit(lambda progress: release.wait(5), content_key='sha:1')
+            self.assertEqual(store.find_active('sha:1')['id'], job['id'])
+            self.assertIsNone(store.find_active('sha:2'))
+
+            release.set()
+            wait_for(store, job['id'])
+            self.assertIsNone(store.find_active('sha:1'))
+
+    def test_failures_are_recorded(self):
+        """Test that exceptions and error statuses both mark the job failed"""
+        def crash(progress):
+            raise RuntimeError('boom')
+
+        def reject(progress):
+            return {'error': 'No problems found'}, 400
+
+        for store in self.stores():
+            queue = JobQueue(store, workers=1)
+            crashed = wait_for(store, queue.submit(crash)['id'])
+            self.assertEqual((crashed['status'], crashed['error'], crashed['http_status']), (FAILED, 'boom', 500))
+
+            rejected = wait_for(store, queue.submit(reject)['id'])
+            self.assertEqual((rejected['status'], rejected['http_status']), (FAILED, 400))
+            self.assertEqual(store.get_result(rejected['id']), {'error': 'No problems found'})
+
+    def test_queue_is_bounded(self):
+        """Test that submissions beyond max_pending are refused until a slot frees"""
+        release = threading.Event()
+        queue = JobQueue(JobStore(), workers=1, max_pending=2)
+        first = queue.submit(lambda progress: release.wait(5))
+        queue.submit(lambda progress: release.wait(5))
+        with self.assertRaises(QueueFull):
+            queue.submit(lambda progress: None)
+
+        release.set()
+        wait_for(queue.store, first['id'])
+        wait_for(queue.store, queue.submit(lambda progress: None)['id'])
+
+    def test_finished_jobs_expire(self):
+        """Test that finished jobs are dropped once older than the TTL"""
+        for store in self.stores():
+            store.ttl = 60
+            queue = JobQueue(store, workers=1)
+            job_id = queue.submit(lambda progress: 'ok')['id']
+            finished = wait_for(store, job_id)
+
+            self.assertEqual(store.expire(now=finished['finished'] + 30), 0)
+            self.assertEqual(store.expire(now=finished['finished'] + 61), 1)
+            self.assertIsNone(store.get(job_id))
+            self.assertIsNone(store.get_result(job_id))
+
+    def test_jobs_of_dead_workers_go_stale(self):
+        """Test that jobs without a heartbeat or a live owner stop being active"""
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+
+        for store in self.stores():
+            store.create('a' * 32, content_key='sha:1', heartbeat=time.time() - 600)
+            store.create('b' * 32, content_key='sha:2', owner=dead.pid)
+            store.create('c' * 32, content_key='sha:3')
+            self.assertIsNone(store.find_active('sha:1'))
+            self.assertIsNone(store.find_active('sha:2'))
+            self.assertEqual(store.find_active('sha:3')['id'], 'c' * 32)
+
+            store.expire()
+            for job_id in ('a' * 32, 'b' * 32):
+                job = store.get(job_id)
+                self.assertEqual((job['status'], job['http_status']), (FAILED, 500))
+            self.assertEqual(store.get('c' * 32)['status'], 'queued')
+
+    def test_heartbeat_keeps_long_jobs_active(self):
+        """Test that the queue touches running jobs between progress updates"""
+        for store in self.stores(ttl=60, stale_after=0.3):
+            self.assertEqual((store.ttl, store.stale_after), (60, 0.3))
+            release = threading.Event()
+            queue = JobQueue(store, workers=1, heartbeat_interval=0.05)
+            job = queue.submit(lambda progress: release.wait(5), content_key='sha:1')
+            time.sleep(0.5)
+            self.assertEqual(store.find_active('sha:1')['id'], job['id'])
+            release.set()
+            self.assertEqual(wait_for(store, job['id'])['status'], DONE)
+
+    def test_older_database_is_upgraded(self):
+        """Test that a jobs database from before content keys still opens"""
+        import sqlite3
+        path = os.path.join(self.tmpdir.name, 'old.sqlite3')
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE jobs (id TEXT PRIMARY KEY, record TEXT NOT NULL, "
+                "result TEXT, status TEXT NOT NULL, finished REAL)"
+            )
+        store = SqliteJobStore(path, ttl=60, stale_after=120)
+        store.create('a' * 32, content_key='sha:1')
+        self.assertEqual(store.find_active('sha:1')['id'], 'a' * 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Unit tests for scheduled artifact deletion
+"""
+
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from artifact_reaper import ArtifactReaper
+
+
+class TestArtifactReaper(unittest.TestCase):
+    """Test expiry order, restart recovery, the quota and the single thread"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.tmpdir.name, 'cache', 'artifacts.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make(self, name, size=10):
+        path = os.path.join(self.tmpdir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(b'x' * size)
+        return path
+
+    def test_expired_artifacts_are_deleted(self):
+        """Test that files and directories go once due, and not before"""
+        reaper = ArtifactReaper(self.manifest)
+        upload = self.make('upload.pdf')
+        chart = self.make('runs/abc/graphs/problem_0_progression.png')
+        reaper.schedule(upload, 60)
+        reaper.schedule(os.path.dirname(os.path.dirname(chart)), 120)
+
+        now = time.time()
+        self.assertEqual(reaper.reap(now=now + 30), 0)
+        self.assertEqual(reaper.reap(now=now + 90), 1)
+        self.assertFalse(os.path.exists(upload))
+        self.assertTrue(os.path.exists(chart))
+        self.assertEqual(reaper.reap(now=now + 150), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'runs', 'abc')))
+        self.assertEqual(reaper.pending(), 0)
+        reaper.stop()
+
+    def test_schedule_survives_restart(self):
+        """Test that a new reaper picks up deletions from the manifest"""
+        upload = self.make('upload.pdf')
+        first = ArtifactReaper(self.manifest)
+        first.schedule(upload, 60)
+        first.stop()
+
+        second = ArtifactReaper(self.manifest)
+        self.assertEqual(second.pending(), 1)
+        self.assertEqual(second.reap(now=time.time() + 61), 1)
+        self.assertFalse(os.path.exists(upload))
+
+    def test_quota_evicts_oldest_first(self):
+        """Test that over quota the oldest artifacts go early"""
+        reaper = ArtifactReaper(self.manifest, quota_bytes=250, min_age=0)
+        paths = [self.make(f'chart_{idx}.png', size=100) for idx in range(3)]
+        for path in paths:
+            reaper.schedule(path, 3600)
+            time.sleep(0.01)
+
+        reaper.enforce_quota()
+        self.assertEqual(reaper.evicted, 1)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, True])
+        self.assertEqual(reaper.pending(), 2)
+        reaper.stop()
+
+    def test_quota_skips_held_artifacts(self):
+        """Test that a run directory still held is not evicted, and the next oldest goes instead"""
+        reaper = ArtifactReaper(self.manifest, quota_bytes=250, min_age=0)
+        running = os.path.join(self.tmpdir.name, 'runs', 'running')
+        paths = [self.make(f'chart_{idx}.png', size=100) for idx in range(2)]
+        with reaper.hold(running):
+            self.make('runs/running/graphs/problem_0.png', size=100)
+            reaper.schedule(running, 3600)
+            time.sleep(0.01)
+            for path in paths:
+                reaper.schedule(path, 3600)
+                time.sleep(0.01)
+
+            self.assertTrue(reaper.is_held(running))
+            reaper.enforce_quota()
+            self.assertEqual(reaper.evicted, 1)
+            self.assertTrue(os.path.isdir(running))
+            self.assertEqual([os.path.exists(path) for path in paths], [False, True])
+
+        self.assertFalse(reaper.is_held(running))
+        reaper.schedule(self.make('chart_2.png', size=100), 3600)
+        reaper.enforce_quota()
+        self.assertEqual(reaper.evicted, 2)
+        self.assertFalse(os.path.exists(running))
+        self.assertTrue(os.path.exists(paths[1]))
+        reaper.stop()
+
+    @unittest.skipUnless(sys.platform != 'win32', "holds are per process on Windows")
+    def test_hold_seen_by_other_processes(self):
+        """Test that a hold taken in another process keeps the artifact too"""
+        reaper = ArtifactReaper(self.manifest, quota_bytes=0, min_age=0)
+        chart = self.make('runs/other/graphs/problem_0.png')
+        running = os.path.dirname(os.path.dirname(chart))
+
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        script = (
+            "import sys, time\n"
+            f"sys.path.insert(0, {src!r})\n"
+            "from artifact_reaper import ArtifactReaper\n"
+            f"with ArtifactReaper({self.manifest!r}).hold({running!r}):\n"
+            "    print('held', flush=True)\n"
+            "    sys.stdin.readline()\n"
+        )
+        holder = subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), 'held')
+            # Scheduling starts the reaper thread, which checks the quota too
+            reaper.schedule(running, 3600)
+            self.assertTrue(reaper.is_held(running))
+            reaper.enforce_quota()
+            self.assertEqual(reaper.evicted, 0)
+            self.assertTrue(os.path.exists(chart))
+        finally:
+            holder.communicate('\n', timeout=30)
+
+        reaper.enforce_quota()
+        self.assertEqual(reaper.evicted, 1)
+        self.assertFalse(os.path.exists(running))
+        reaper.stop()
+
+    def test_one_thread_for_many_artifacts(self):
+        """Test that scheduling many deletions does not start a thread each"""
+        reaper = ArtifactReaper(self.manifest)
+        before = threading.active_count()
+        for idx in range(50):
+            reaper.schedule(self.make(f'problem_{idx}.png'), 3600)
+        self.assertLessEqual(threading.active_count(), before + 1)
+
+        path = self.make('soon.png')
+        reaper.schedule(path, 0.05)
+        for _ in range(200):
+            if not os.path.exists(path):
+                break
+            time.sleep(0.01)
+        self.assertFalse(os.path.exists(path))
+        reaper.stop()
+
+    def test_quota_checked_once_per_interval(self):
+        """Test that scheduling wakes the thread without re-measuring the quota"""
+        reaper = ArtifactReaper(self.manifest, quota_bytes=10 ** 9, check_interval=3600)
+        checks = []
+        reaper.enforce_quota = lambda now=None: checks.append(now) or 0
+        for idx in range(20):
+            reaper.schedule(self.make(f'problem_{idx}.png'), 3600)
+            time.sleep(0.005)
+
+        path = self.make('soon.png')
+        reaper.schedule(path, 0.05)
+        for _ in range(200):
+            if not os.path.exists(path):
+                break
+            time.sleep(0.01)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(checks), 1)
+        reaper.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Unit tests for batch problem-type classification
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batch_classifier import classify_batch, expand_pattern
+from detailed_solver import DetailedSolutionGenerator
+from homework_solver import ProblemAnalyzer
+
+TEXTS = [
+    "Find the derivative of f(x) = x^2 and the limit as x approaches 0",
+    "Calcula la energía cinética y el trabajo realizado por la fuerza",
+    "Calculate the voltage and current in the circuit; the voltage drop is 5 V",
+    "Halla el área del triángulo y el perímetro del círculo",
+    "What is the meaning of life?",
+    "",
+]
+
+
+class TestBatchClassifier(unittest.TestCase):
+    """Test vectorized classification against the single-problem path"""
+
+    def test_matches_single_problem_path(self):
+        """Test that batch labels equal identify_problem_type and detect_problem_type"""
+        analyzer = ProblemAnalyzer()
+        generator = DetailedSolutionGenerator()
+        for text, result in zip(TEXTS, classify_batch(TEXTS)):
+            self.assertEqual(result['type'], analyzer.identify_problem_type(text))
+            self.assertEqual(result['detected_type'], generator.detect_problem_type(text))
+
+    def test_scores_and_tie_order(self):
+        """Test that scores are hit counts and ties keep priority order"""
+        result = classify_batch([TEXTS[2]], top_k=2)[0]
+        self.assertEqual(result['type_scores'][0], ('circuit_analysis', 4))
+
+        # 'solve' scores once under both equation and algebra; equation comes first
+        result = classify_batch(["solve"])[0]
+        self.assertEqual(result['detected_type_scores'], [('equation', 1), ('algebra', 1)])
+        self.assertEqual(result['detected_type'], 'equation')
+
+    def test_no_hits(self):
+        """Test the fallback labels when nothing matches"""
+        result = classify_batch(["xyz"])[0]
+        self.assertEqual((result['type'], result['type_scores']), ('other', []))
+        self.assertEqual((result['detected_type'], result['detected_type_scores']), ('general', []))
+        self.assertEqual(classify_batch([]), [])
+
+    def test_expand_pattern(self):
+        """Test expanding character classes into literal terms"""
+        self.assertEqual(expand_pattern(r'(lim|l[íi]mite)'), ['lim', 'límite', 'limite'])
+        with self.assertRaises(ValueError):
+            expand_pattern(r'(deriv.*)')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+"""
+Unit tests for the template-deduplicated report format
+"""
+
+import unittest
+import sys
+import os
+import json
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compact_report import TEMPLATE_REF, compact_tree, expand_tree
+from detailed_solver import DetailedSolutionGenerator
+
+
+class TestCompactReport(unittest.TestCase):
+    """Test compact_tree and its inverse"""
+
+    def setUp(self):
+        generator = DetailedSolutionGenerator()
+        self.solutions = [
+            generator.generate_detailed_solution(idx, f"Find the derivative of x^{idx}", "calculus")
+            for idx in range(1, 6)
+        ]
+
+    def test_round_trip(self):
+        """Expanding the compact form restores the original JSON"""
+        templates, encoded = compact_tree({'solutions': self.solutions})
+        restored = expand_tree(json.loads(json.dumps(templates)), json.loads(json.dumps(encoded)))
+        self.assertEqual(json.dumps(restored), json.dumps({'solutions': self.solutions}))
+
+    def test_shared_blocks_sent_once(self):
+        """Repeated step blocks become one template; per-problem fields stay inline"""
+        templates, encoded = compact_tree({'solutions': self.solutions})
+        steps_refs = {json.dumps(sol['steps']) for sol in encoded['solutions']}
+        self.assertEqual(len(steps_refs), 1)
+        self.assertIn(TEMPLATE_REF, encoded['solutions'][0]['steps'])
+        self.assertEqual(encoded['solutions'][2]['problem'], "Find the derivative of x^3")
+        self.assertLess(
+            len(json.dumps([templates, encoded])),
+            len(json.dumps(self.solutions)) / 3
+        )
+
+    def test_equal_copies_are_deduplicated(self):
+        """Equal blocks are shared even when they are different objects"""
+        block = {'text': 'x' * 100}
+        templates, encoded = compact_tree([dict(block), dict(block), {'n': 1}, {'n': 1}])
+        self.assertEqual(templates, [{'text': {TEMPLATE_REF: 1}}, 'x' * 100])
+        self.assertEqual(encoded[0], encoded[1])
+        self.assertEqual(encoded[2], {'n': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Unit tests for the detailed solution generator
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from detailed_solver import DetailedSolutionGenerator, generate_detailed_report, iter_detailed_solutions
+
+
+class TestRequirementExtraction(unittest.TestCase):
+    """Test analyze_problem_requirements on ordinary and adversarial text"""
+
+    def setUp(self):
+        self.generator = DetailedSolutionGenerator()
+
+    def test_question_and_unknowns(self):
+        """Lead verbs give the question and the unknown"""
+        analysis = self.generator.analyze_problem_requirements("Find x where x + 2 = 5. Then stop.")
+        self.assertEqual(analysis['exact_question'], 'x where x + 2 = 5')
+        self.assertEqual(analysis['unknowns'], ['x'])
+        self.assertEqual(analysis['key_constraints'], ['where x + 2 = 5'])
+
+    def test_sentence_prefix_question(self):
+        """Without a lead verb the question is the sentence before the first cue"""
+        analysis = self.generator.analyze_problem_requirements("Intro. The speed of the car is 40 km/h")
+        self.assertEqual(analysis['exact_question'], 'the speed of the car')
+
+    def test_spanish_given_and_unknown(self):
+        """Spanish givens and ``cual es`` unknowns are extracted"""
+        analysis = self.generator.analyze_problem_requirements("Dados m = 2 y 30 metros, ¿cual es   la velocidad?")
+        self.assertEqual(analysis['given_info'], ['m = 2', '30 metros'])
+        self.assertEqual(analysis['unknowns'], ['velocidad'])
+
+    def test_adversarial_input_is_linear(self):
+        """Long period-free blocks no longer backtrack quadratically"""
+        for text in ('x ' * 100000, 'dado ' + '1' * 200000, 'cual es' + ' ' * 200000 + '?'):
+            analysis = self.generator.analyze_problem_requirements(text)
+            self.assertEqual(analysis['unknowns'], [])
+
+
+class TestStreamedSolutions(unittest.TestCase):
+    """Test that solutions produced one at a time match the full report"""
+
+    def test_generator_matches_report(self):
+        """A lazily consumed problem iterator yields the report's solutions in order"""
+        problems = [
+            {'number': '1', 'text': 'Find the derivative of x^2 + 3x', 'type': 'calculus'},
+            {'number': '2', 'text': 'Calculate the voltage across a 4 ohm resistor with 2 A', 'type': 'physics'},
+        ]
+        consumed = []
+
+        def lazy():
+            for problem in problems:
+                consumed.append(problem['number'])
+                yield problem
+
+        solutions = iter_detailed_solutions(lazy())
+        first = next(solutions)
+        self.assertEqual(consumed, ['1'])
+
+        report = generate_detailed_report(problems, {})
+        self.assertEqual([first] + list(solutions), report['problems_analyzed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the pluggable extraction backends
+"""
+
+import unittest
+import sys
+import os
+import runpy
+import tempfile
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction_backends import ExtractionBackend, get_backend, pypdfium2
+from extraction_cache import ExtractionCache
+from homework_solver import HomeworkAnalyzerAlgorithm, ProblemAnalyzer
+import homework_solver
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'CALCULUS Exercises1.pdf.pdf')
+# Has unmapped TeX math glyphs that PDFium reads as letters
+MATH_PDF = os.path.join(os.path.dirname(__file__), '..', 'Tema2-ejercicios.pdf')
+
+
+def build_pdf(content):
+    """A one-page PDF drawing ``content`` (bytes) with Helvetica as /F1"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+
+class TestBackendRegistry(unittest.TestCase):
+    """Test backend lookup"""
+
+    def test_lookup_by_name(self):
+        """Test that both profiles are registered"""
+        self.assertEqual(get_backend('fast').name, 'fast')
+        self.assertEqual(get_backend('accurate').name, 'accurate')
+
+    def test_backends_implement_extract_page(self):
+        """Test that the base class is abstract"""
+        with self.assertRaises(TypeError):
+            ExtractionBackend()
+
+    def test_unknown_backend(self):
+        """Test that an unknown profile is rejected"""
+        with self.assertRaises(ValueError):
+            ProblemAnalyzer(backend='quantum')
+
+    def test_default_from_environment(self):
+        """Test that EXTRACTION_BACKEND picks the deployment-wide default"""
+        path = os.path.join(os.path.dirname(__file__), '..', 'src', 'extraction_backends.py')
+        with mock.patch.dict(os.environ, EXTRACTION_BACKEND='fast'):
+            namespace = runpy.run_path(path)
+        self.assertEqual(namespace['DEFAULT_BACKEND'], 'fast')
+        self.assertEqual(namespace['get_backend']().name, 'fast')
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and pypdfium2 and os.path.exists(SAMPLE_PDF), "needs pdfplumber, pypdfium2 and sample PDF")
+class TestFastBackend(unittest.TestCase):
+    """Test the PDFium-based fast profile"""
+
+    def test_same_problems_as_accurate(self):
+        """Test that the fast profile parses the samples into the same problems"""
+        for pdf_path in (SAMPLE_PDF, MATH_PDF):
+            if not os.path.exists(pdf_path):
+                continue
+            with self.subTest(pdf=os.path.basename(pdf_path)):
+                accurate = HomeworkAnalyzerAlgorithm(backend='accurate').extract_and_analyze(pdf_path)
+                fast = HomeworkAnalyzerAlgorithm(backend='fast').extract_and_analyze(pdf_path)
+                self.assertEqual(
+                    [(p['number'], p['type']) for p in fast],
+                    [(p['number'], p['type']) for p in accurate]
+                )
+
+    def test_overdrawn_text_is_deduplicated(self):
+        """Test that a word drawn twice for a bold effect comes out once"""
+        # PDFium drops near-exact overdraw itself; this one is shifted by 0.9pt
+        pdf = build_pdf(
+            b"BT /F1 12 Tf 72 700 Td (Problem 1: Bold) Tj ET\n"
+            b"BT /F1 12 Tf 134.256 700.3 Td (Bold) Tj ET\n"
+            b"BT /F1 12 Tf 72 680 Td (Find x.) Tj ET"
+        )
+        text = ProblemAnalyzer(backend='fast').extract_text_from_pdf(pdf)
+        self.assertIn('Problem 1: Bold\nFind x.', text)
+
+    def test_in_memory_source(self):
+        """Test that the fast profile reads bytes sources"""
+        with open(SAMPLE_PDF, 'rb') as handle:
+            data = handle.read()
+        self.assertEqual(
+            ProblemAnalyzer(backend='fast').extract_text_from_pdf(data),
+            ProblemAnalyzer(backend='fast').extract_text_from_pdf(SAMPLE_PDF)
+        )
+
+    def test_cache_entries_are_per_backend(self):
+        """Test that a cached accurate result is not served to the fast profile"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ExtractionCache(os.path.join(tmpdir, 'cache.sqlite3'))
+            HomeworkAnalyzerAlgorithm(cache=cache, backend='accurate').extract_and_analyze(SAMPLE_PDF)
+            HomeworkAnalyzerAlgorithm(cache=cache, backend='fast').extract_and_analyze(SAMPLE_PDF)
+            stats = cache.stats()
+            self.assertEqual((stats['hits'], stats['entries']), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+"""
+Unit tests for the PDF extraction cache
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction_cache import ExtractionCache, hash_file, hash_source
+from homework_solver import HomeworkAnalyzerAlgorithm, ProblemAnalyzer
+import homework_solver
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'CALCULUS Exercises1.pdf.pdf')
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test the sqlite-backed extraction cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_counters(self):
+        """Test that stored entries come back and hits/misses are counted"""
+        cache = ExtractionCache(self.path)
+        key = cache.make_key('abc', '1')
+        self.assertIsNone(cache.get(key))
+
+        problems = [{'number': 1, 'text': 'Find the límite', 'type': 'calculus'}]
+        cache.put(key, ['page one'], problems)
+        self.assertEqual(cache.get(key), (['page one'], problems))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_version_is_part_of_key(self):
+        """Test that a new extractor version does not reuse old entries"""
+        cache = ExtractionCache(self.path)
+        cache.put(cache.make_key('abc', '1'), ['old'], [])
+        self.assertIsNone(cache.get(cache.make_key('abc', '2')))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted over budget"""
+        cache = ExtractionCache(self.path, max_bytes=60)
+        cache.put('a', ['x' * 20], [])
+        cache.put('b', ['y' * 20], [])
+        cache.get('a')
+        cache.put('c', ['z' * 20], [])
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and os.path.exists(SAMPLE_PDF), "needs pdfplumber and sample PDF")
+class TestCachedAnalysis(unittest.TestCase):
+    """Test extract_and_analyze with a cache attached"""
+
+    def test_repeat_upload_skips_extraction(self):
+        """Test that a second analysis of the same bytes is served from cache"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ExtractionCache(os.path.join(tmpdir, 'cache.sqlite3'))
+            first = HomeworkAnalyzerAlgorithm(cache=cache).extract_and_analyze(SAMPLE_PDF)
+
+            analyzer = HomeworkAnalyzerAlgorithm(cache=cache)
+            analyzer.iter_pages = lambda *args, **kwargs: self.fail("cache miss on repeat upload")
+            second = analyzer.extract_and_analyze(SAMPLE_PDF)
+
+            self.assertEqual(second, first)
+            self.assertEqual(analyzer.raw_text, HomeworkAnalyzerAlgorithm().extract_text_from_pdf(SAMPLE_PDF))
+            self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_streamed_problems_fill_and_use_cache(self):
+        """Test that iter_problems stores a streamed extraction and replays it"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ExtractionCache(os.path.join(tmpdir, 'cache.sqlite3'))
+            self.assertIsNone(HomeworkAnalyzerAlgorithm(cache=cache).cached_problems(SAMPLE_PDF))
+            streamed = list(HomeworkAnalyzerAlgorithm(cache=cache).iter_problems(SAMPLE_PDF))
+            self.assertEqual(streamed, HomeworkAnalyzerAlgorithm().extract_and_analyze(SAMPLE_PDF))
+
+            analyzer = HomeworkAnalyzerAlgorithm(cache=cache)
+            analyzer.iter_pages = lambda *args, **kwargs: self.fail("cache miss on repeat upload")
+            self.assertEqual(list(analyzer.iter_problems(SAMPLE_PDF)), streamed)
+            self.assertEqual(analyzer.cached_problems(SAMPLE_PDF), streamed)
+            self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_hash_file(self):
+        """Test that hashing is stable for the same bytes"""
+        self.assertEqual(hash_file(SAMPLE_PDF), hash_file(SAMPLE_PDF))
+        self.assertEqual(len(hash_file(SAMPLE_PDF)), 64)
+
+    def test_hash_source_rewinds_streams(self):
+        """Test that in-memory sources hash like the file and streams stay readable"""
+        import io
+        with open(SAMPLE_PDF, 'rb') as handle:
+            data = handle.read()
+        stream = io.BytesIO(data)
+        self.assertEqual(hash_source(stream), hash_file(SAMPLE_PDF))
+        self.assertEqual(stream.tell(), 0)
+        self.assertEqual(hash_source(data), hash_file(SAMPLE_PDF))
+
+        # A stream that was already read from still hashes whole
+        stream.seek(100)
+        self.assertEqual(hash_source(stream), hash_file(SAMPLE_PDF))
+        self.assertEqual(stream.tell(), 100)
+
+
+def _write_pdf(path, page_texts):
+    """Write a small text-only PDF with one page per entry"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(path) as pdf:
+        for text in page_texts:
+            fig = Figure()
+            fig.text(0.1, 0.5, text)
+            pdf.savefig(fig)
+
+
+@unittest.skipUnless(homework_solver.pdfplumber, "needs pdfplumber")
+class TestPageCache(unittest.TestCase):
+    """Test per-page incremental re-extraction"""
+
+    def test_revised_upload_reextracts_changed_page_only(self):
+        """Test that unchanged pages of a revised PDF come from the page cache"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            original = os.path.join(tmpdir, 'original.pdf')
+            revised = os.path.join(tmpdir, 'revised.pdf')
+            # Same glyphs on every page so the embedded font subset is identical
+            _write_pdf(original, ['Problem 1: derivative', 'Problem 2: voltage', 'Problem 3: entropy'])
+            _write_pdf(revised, ['Problem 1: derivative', 'Problem 2: egatlov', 'Problem 3: entropy'])
+
+            cache = ExtractionCache(os.path.join(tmpdir, 'cache.sqlite3'))
+            ProblemAnalyzer(cache=cache).extract_text_from_pdf(original)
+            text = ProblemAnalyzer(cache=cache).extract_text_from_pdf(revised)
+
+            self.assertEqual(text, ProblemAnalyzer().extract_text_from_pdf(revised))
+            stats = cache.stats()
+            self.assertEqual((stats['page_hits'], stats['page_misses']), (2, 4))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,63 @@
+"""
+Unit tests for sandboxed PDF extraction
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction_sandbox import ExtractionLimits
+from homework_solver import ProblemAnalyzer
+import homework_solver
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'Tema2-ejercicios.pdf')
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and os.path.exists(SAMPLE_PDF), "needs pdfplumber and sample PDF")
+class TestSandboxedExtraction(unittest.TestCase):
+    """Test extraction in a limited child process"""
+
+    def test_full_run_matches_in_process(self):
+        """Test that an unconstrained sandbox run returns the same text"""
+        analyzer = ProblemAnalyzer(limits=ExtractionLimits())
+        text = analyzer.extract_text_from_pdf(SAMPLE_PDF)
+        self.assertEqual(text, ProblemAnalyzer().extract_text_from_pdf(SAMPLE_PDF))
+        self.assertIsNone(analyzer.truncated)
+
+    def test_deadline_returns_partial_pages(self):
+        """Test that hitting the deadline keeps finished pages and reports why"""
+        analyzer = ProblemAnalyzer(limits=ExtractionLimits(deadline=0.3, page_timeout=10))
+        text = analyzer.extract_text_from_pdf(SAMPLE_PDF)
+        self.assertEqual(analyzer.truncated['reason'], 'deadline')
+        self.assertEqual(text.count('--- PAGE'), analyzer.truncated['page'] - 1)
+
+    def test_deadline_excludes_caller_time(self):
+        """Test that time spent on pages between yields does not count against the deadline"""
+        import time
+        analyzer = ProblemAnalyzer(limits=ExtractionLimits(deadline=2.5, page_timeout=10))
+        pages = 0
+        for _ in analyzer.iter_pages(SAMPLE_PDF):
+            time.sleep(0.2)
+            pages += 1
+        self.assertIsNone(analyzer.truncated)
+        self.assertEqual(pages, 16)
+
+    def test_page_timeout(self):
+        """Test that a slow page is reported separately from the overall deadline"""
+        analyzer = ProblemAnalyzer(limits=ExtractionLimits(deadline=60, page_timeout=0.001))
+        analyzer.extract_text_from_pdf(SAMPLE_PDF)
+        self.assertEqual(analyzer.truncated['reason'], 'page_timeout')
+
+    def test_malformed_pdf(self):
+        """Test that a broken PDF is reported instead of raising in the parent"""
+        analyzer = ProblemAnalyzer(limits=ExtractionLimits())
+        self.assertEqual(analyzer.extract_text_from_pdf(b'not a pdf'), '')
+        self.assertEqual(analyzer.truncated['reason'], 'error')
+        self.assertEqual(analyzer.truncated['page'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
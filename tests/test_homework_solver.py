@@ -10,6 +10,36 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from homework_solver import TheoryBase, ProblemAnalyzer, SolutionGenerator, ProblemType
+import homework_solver
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'Tema2-ejercicios.pdf')
+
+
+def build_pdf(*objects):
+    """A PDF whose objects 3, 4, ... are ``objects``; object 3 is its only page"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+    ] + list(objects)
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+
+def stream(content, attrs=b""):
+    return b"<< %s /Length %d >>\nstream\n" % (attrs, len(content)) + content + b"\nendstream"
+
+
+PAGE = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> %s >> >>")
+FONT = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
 
 
 class TestTheoryBase(unittest.TestCase):
@@ -67,6 +97,87 @@ class TestProblemAnalyzer(unittest.TestCase):
         result = analyzer.identify_problem_type(unrecognized)
         self.assertEqual(result, "other")
 
+    def test_problem_type_accent_folding(self):
+        """Test that accented Spanish keywords match their unaccented forms"""
+        analyzer = ProblemAnalyzer()
+        self.assertEqual(analyzer.identify_problem_type("Calcula la ENERGÍA cinética"), "physics")
+        self.assertEqual(analyzer.identify_problem_type("Halla el LIMITE de la función"), "calculus")
+
+    def test_problem_type_scores(self):
+        """Test per-category keyword hit counts"""
+        analyzer = ProblemAnalyzer()
+        scores = analyzer.problem_type_scores("Find the voltage and current; the voltage drop is 5 V")
+        self.assertEqual(scores['circuit_analysis'], 3)
+        self.assertEqual(scores['calculus'], 0)
+        self.assertEqual(list(scores)[0], 'calculus')
+
+    def test_scan_delimiters_one_pass(self):
+        """Test that every delimiter family is found by the single scan"""
+        text = "Problem 1: derivative\n1. first step\nSection 2\nPage 3\nQ4 voltage"
+        spans = homework_solver.scan_delimiters(text)
+        self.assertEqual([number for _, _, number in spans['problem']], ['1', '4'])
+        self.assertEqual([number for _, _, number in spans['numbered']], ['1'])
+        self.assertEqual([number for _, _, number in spans['section']], ['2'])
+        self.assertEqual([number for _, _, number in spans['page']], ['3'])
+
+    def test_parse_problems_family_priority(self):
+        """Test that the first family enclosing text wins over later ones"""
+        analyzer = ProblemAnalyzer()
+        analyzer.raw_text = "Problem 1\nProblem 2\n1. Solve x + 1 = 2\n2. Find the area"
+        problems = analyzer.parse_problems()
+        self.assertEqual([p['number'] for p in problems], [2])
+
+        # Numbered items take precedence over sections
+        analyzer.raw_text = "Section 1\n1. Solve x + 1 = 2\nSection 2\n2. Find the area"
+        problems = analyzer.parse_problems()
+        self.assertEqual([p['number'] for p in problems], [1, 2])
+        self.assertEqual(problems[0]['text'], "Solve x + 1 = 2\nSection 2")
+
+
+class TestProblemSet(unittest.TestCase):
+    """Test the offset-based problem container"""
+
+    def _problems(self):
+        analyzer = ProblemAnalyzer()
+        analyzer.raw_text = "Problem 1: Find the derivative of x^2\nProblem 2: Compute the entropy change\n"
+        return analyzer.parse_problems()
+
+    def test_views_read_like_dicts(self):
+        """Test that each problem reads like the old number/text/type dict"""
+        problems = self._problems()
+        self.assertIsInstance(problems, homework_solver.ProblemSet)
+        self.assertEqual(problems[0], {'number': 1, 'text': 'Find the derivative of x^2', 'type': 'calculus'})
+        self.assertEqual(problems[-1].get('type'), 'thermodynamics')
+        # Offsets point into the one shared buffer
+        self.assertEqual(problems.text[problems._starts[1]:problems._ends[1]], problems[1]['text'])
+        self.assertEqual(problems._types[0], list(ProblemType).index(ProblemType.CALCULUS))
+
+    def test_assignment_and_slices(self):
+        """Test extra keys on a view and JSON-ready slices"""
+        import json
+        problems = self._problems()
+        problems[1]['visualization'] = '/api/image/problem_1'
+        self.assertEqual(problems[1]['visualization'], '/api/image/problem_1')
+        self.assertNotIn('visualization', problems[0])
+
+        first_ten = problems[:10]
+        self.assertEqual([type(p) for p in first_ten], [dict, dict])
+        self.assertIn('/api/image/problem_1', json.dumps(first_ten))
+
+    def test_from_dicts_round_trip(self):
+        """Test repacking plain dicts, including types outside ProblemType"""
+        dicts = [{'number': 3, 'text': 'abc', 'type': 'custom'}, {'number': 4, 'text': 'de', 'type': 'other'}]
+        problems = homework_solver.ProblemSet.from_dicts(dicts)
+        self.assertEqual(problems, dicts)
+        self.assertEqual(problems.to_list(), dicts)
+
+    def test_detailed_report_accepts_problem_set(self):
+        """Test that the report generator works unchanged on a ProblemSet"""
+        from detailed_solver import generate_detailed_report
+        report = generate_detailed_report(self._problems(), TheoryBase.THEORIES)
+        self.assertEqual(report['summary']['total_problems'], 2)
+        self.assertEqual(report['problems_analyzed'][0]['problem'], 'Find the derivative of x^2')
+
 
 class TestSolutionGenerator(unittest.TestCase):
     """Test solution generator"""
@@ -146,6 +257,193 @@ class TestIntegration(unittest.TestCase):
         self.assertIn('calculus', problem_types)
 
 
+class _PagedAnalyzer(ProblemAnalyzer):
+    """Analyzer that serves pre-extracted page texts instead of a PDF"""
+
+    def __init__(self, pages):
+        super().__init__("paged.pdf")
+        self.pages = pages
+
+    def iter_pages(self, pdf_path=None, workers=1):
+        for idx, page_text in enumerate(self.pages, start=1):
+            yield idx, page_text
+
+
+class TestStreamingExtraction(unittest.TestCase):
+    """Test page-by-page extraction and problem streaming"""
+
+    PAGES = [
+        "Problem 1: Find the derivative of f(x) = x^2\nProblem 2: Calculate the voltage",
+        "across the resistor using Ohm's law\nProblem 3",
+        ": Compute the entropy change of the cycle",
+    ]
+
+    def _parsed(self, pages):
+        analyzer = _PagedAnalyzer(pages)
+        analyzer.raw_text = "\n".join(
+            ProblemAnalyzer.format_page(idx, text) for idx, text in enumerate(pages, start=1)
+        )
+        return analyzer.parse_problems()
+
+    def test_iter_problems_matches_parse_problems(self):
+        """Test that streamed problems equal the batch parse, including page-spanning ones"""
+        streamed = list(_PagedAnalyzer(self.PAGES).iter_problems())
+        self.assertEqual(streamed, self._parsed(self.PAGES))
+        self.assertEqual([p['number'] for p in streamed], [1, 2, 3])
+        self.assertIn("Ohm's law", streamed[1]['text'])
+
+    def test_first_problem_emitted_before_last_page(self):
+        """Test that a closed problem is yielded before later pages are read"""
+        consumed = []
+
+        class Recording(_PagedAnalyzer):
+            def iter_pages(self, pdf_path=None, workers=1):
+                for idx, page_text in super().iter_pages(pdf_path, workers):
+                    consumed.append(idx)
+                    yield idx, page_text
+
+        first = next(Recording(self.PAGES).iter_problems())
+        self.assertEqual(first['number'], 1)
+        self.assertEqual(consumed, [1])
+
+    def test_iter_problems_fallback_patterns(self):
+        """Test that documents without Problem delimiters still parse identically"""
+        pages = ["1. Solve the quadratic equation x^2 - 4 = 0", "2. Find the area of the triangle"]
+        self.assertEqual(list(_PagedAnalyzer(pages).iter_problems()), self._parsed(pages))
+
+    def test_incremental_parser_carry_over(self):
+        """Test that feed() emits a problem once the next delimiter arrives"""
+        parser = homework_solver.IncrementalProblemParser(ProblemAnalyzer())
+        emitted = parser.feed(self.PAGES[0])
+        self.assertEqual([p['number'] for p in emitted], [1])
+        # Problem 2 spans the page break and closes on the second page
+        emitted += parser.feed(self.PAGES[1])
+        self.assertEqual([p['number'] for p in emitted], [1, 2])
+        # Only the still-open problem is carried over to the next page
+        self.assertTrue(parser.buffer.startswith("\nProblem 3"))
+        rest = parser.feed(self.PAGES[2]) + parser.close()
+        self.assertEqual(emitted + rest, self._parsed(self.PAGES))
+
+    def test_incremental_parser_line_endings(self):
+        """Test that carriage returns are normalized exactly like parse_problems"""
+        pages = ["1. Solve x\r\r\n", "2. Find y\r\n3. Find z\r"]
+        parser = homework_solver.IncrementalProblemParser(ProblemAnalyzer())
+        streamed = [p for page in pages for p in parser.feed(page)] + parser.close()
+        self.assertEqual(streamed, self._parsed(pages))
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and os.path.exists(SAMPLE_PDF), "needs pdfplumber and sample PDF")
+class TestParallelExtraction(unittest.TestCase):
+    """Test multi-process page extraction"""
+
+    def test_parallel_matches_serial(self):
+        """Test that pooled extraction stitches pages back in order"""
+        serial = ProblemAnalyzer().extract_text_from_pdf(SAMPLE_PDF)
+        parallel = ProblemAnalyzer().extract_text_from_pdf(SAMPLE_PDF, workers=2)
+        self.assertEqual(parallel, serial)
+        self.assertIn("--- PAGE 16 ---", parallel)
+
+    def test_pool_does_not_fork(self):
+        """Test that pool workers start like the sandbox's, never by forking a threaded caller"""
+        from unittest import mock
+        with mock.patch.object(homework_solver, 'ProcessPoolExecutor', wraps=homework_solver.ProcessPoolExecutor) as pool:
+            ProblemAnalyzer().extract_text_from_pdf(SAMPLE_PDF, workers=2)
+        self.assertNotEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'fork')
+
+    def test_small_documents_skip_pool(self):
+        """Test that documents under the cutoff never start a process pool"""
+        analyzer = ProblemAnalyzer()
+        analyzer._iter_pages_parallel = lambda *args: self.fail("pool used for a small PDF")
+        original = homework_solver.PARALLEL_MIN_PAGES
+        homework_solver.PARALLEL_MIN_PAGES = 1000
+        try:
+            text = analyzer.extract_text_from_pdf(SAMPLE_PDF, workers=4)
+        finally:
+            homework_solver.PARALLEL_MIN_PAGES = original
+        self.assertIn("--- PAGE 1 ---", text)
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and os.path.exists(SAMPLE_PDF), "needs pdfplumber and sample PDF")
+class TestInMemorySources(unittest.TestCase):
+    """Test extraction from bytes, streams and memory maps"""
+
+    def setUp(self):
+        self.expected = ProblemAnalyzer().extract_text_from_pdf(SAMPLE_PDF)
+        with open(SAMPLE_PDF, 'rb') as handle:
+            self.data = handle.read()
+
+    def test_bytes_and_stream(self):
+        """Test that bytes and BytesIO sources match the path-based result"""
+        import io
+        self.assertEqual(ProblemAnalyzer().extract_text_from_pdf(self.data), self.expected)
+        self.assertEqual(ProblemAnalyzer().extract_text_from_pdf(io.BytesIO(self.data)), self.expected)
+
+    def test_memory_map(self):
+        """Test that a memory-mapped file can be analyzed in place"""
+        import mmap
+        with open(SAMPLE_PDF, 'rb') as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                problems = homework_solver.HomeworkAnalyzerAlgorithm().extract_and_analyze(mapped)
+        self.assertEqual(problems, homework_solver.HomeworkAnalyzerAlgorithm().extract_and_analyze(SAMPLE_PDF))
+
+
+@unittest.skipUnless(homework_solver.pdfplumber and os.path.exists(SAMPLE_PDF), "needs pdfplumber and sample PDF")
+class TestPreflight(unittest.TestCase):
+    """Test the cheap pre-extraction PDF inspection"""
+
+    def test_text_pdf(self):
+        """Test page count, text layer detection and cost estimate on a worksheet"""
+        report = ProblemAnalyzer().preflight(SAMPLE_PDF)
+        self.assertEqual(report['page_count'], 16)
+        self.assertEqual(report['text_pages'], 16)
+        self.assertEqual(len(report['pages']), 16)
+        self.assertGreater(report['content_bytes'], 0)
+        self.assertGreater(report['estimated_seconds'], 0)
+
+    def test_image_only_pdf(self):
+        """Test that pages without text operators are flagged"""
+        import io
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        buffer = io.BytesIO()
+        with PdfPages(buffer) as pdf:
+            fig = Figure()
+            fig.figimage([[0.0, 1.0], [1.0, 0.0]])
+            pdf.savefig(fig)
+        report = ProblemAnalyzer().preflight(buffer)
+        self.assertEqual(report['page_count'], 1)
+        self.assertEqual(report['text_pages'], 0)
+        self.assertEqual(buffer.tell(), 0)
+
+    def test_text_in_nested_forms(self):
+        """Test that text drawn by a form inside a form is found, even through a cycle"""
+        form = b"/Type /XObject /Subtype /Form /BBox [0 0 612 792]"
+        data = build_pdf(
+            PAGE % b"/XObject << /Fm1 6 0 R >>",
+            stream(b"/Fm1 Do"),
+            FONT,
+            stream(b"/Fm2 Do", form + b" /Resources << /XObject << /Fm2 7 0 R >> >>"),
+            stream(b"BT /F1 12 Tf 72 700 Td (Nested) Tj ET /Fm1 Do",
+                   form + b" /Resources << /Font << /F1 5 0 R >> /XObject << /Fm1 6 0 R >> >>"),
+        )
+        report = ProblemAnalyzer().preflight(data)
+        self.assertEqual(report['text_pages'], 1)
+
+    def test_quote_operators_show_text(self):
+        """Test that the ' and \" operators count as text on their own"""
+        for content in (b"BT /F1 12 Tf 14 TL 72 700 Td (Next line) ' ET",
+                        b"BT /F1 12 Tf 14 TL 72 700 Td 1 2 (Spaced line)\" ET",
+                        b"BT /F1 12 Tf 14 TL 72 700 Td <48690a> ' ET"):
+            with self.subTest(content=content):
+                report = ProblemAnalyzer().preflight(build_pdf(PAGE % b"", stream(content), FONT))
+                self.assertEqual(report['text_pages'], 1)
+
+        # A quote inside a string is not an operator
+        data = build_pdf(PAGE % b"", stream(b"/Span << /ActualText (don't) >> BDC EMC"), FONT)
+        self.assertEqual(ProblemAnalyzer().preflight(data)['text_pages'], 0)
+
+
 def run_tests():
     """Run all tests"""
     unittest.main(argv=[''], exit=False, verbosity=2)
@@ -153,5 +451,4 @@ def run_tests():
 
 if __name__ == '__main__':
     run_tests()
-run tema2-ejercicios.pdf
 
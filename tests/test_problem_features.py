@@ -0,0 +1,63 @@
+"""
+Unit tests for shared per-problem text features
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from detailed_solver import DetailedSolutionGenerator, _LanguageSupport
+from homework_solver import ProblemAnalyzer
+from keyword_automaton import KeywordAutomaton
+from problem_features import problem_features
+
+
+class TestProblemFeatures(unittest.TestCase):
+    """Test the single-pass feature object and the stages that read it"""
+
+    def test_numbers(self):
+        """Numbers are read as the visualizer expects them"""
+        features = problem_features("Halla F = 2.5x - 3 y -4.")
+        self.assertEqual(features.numbers, ['2.5', '3', '-4.'])
+
+    def test_features_are_shared(self):
+        """Stages asking for the same text get the same object"""
+        text = "Find the derivative of x^2 and show the slope"
+        self.assertIs(problem_features(text), problem_features(text))
+
+        generator = DetailedSolutionGenerator()
+        self.assertEqual(generator.detect_problem_type(text), 'derivative')
+        self.assertEqual(ProblemAnalyzer("unused.pdf").identify_problem_type(text), 'calculus')
+        self.assertEqual(
+            generator.analyze_problem_requirements(text)['problem_objectives'],
+            ['Proof/Verification'],
+        )
+
+    def test_custom_patterns_still_apply(self):
+        """An edited pattern table falls back to its own regexes"""
+        generator = DetailedSolutionGenerator()
+        generator.problem_patterns = {'custom': r'wid+get'}
+        self.assertEqual(generator.detect_problem_type("A widdget problem"), 'custom')
+
+    def test_hits_follow_the_automaton(self):
+        """Short-lived automata never get hits counted for an earlier one"""
+        features = problem_features("Compute the integral and the derivative")
+        for idx in range(20):
+            keyword = 'integral' if idx % 2 else 'matrix'
+            automaton = KeywordAutomaton([('topic', [keyword])])
+            self.assertEqual(features.category_hits(automaton), {'topic': idx % 2})
+            del automaton
+
+    def test_language_hints(self):
+        """Accented characters or two marker words read as Spanish"""
+        hints = problem_features("Resuelve la ecuación").language_hints
+        self.assertEqual(hints['spanish_chars'], 1)
+        self.assertGreaterEqual(hints['spanish_markers'], 2)
+        self.assertEqual(_LanguageSupport().detect_language("Resuelve la ecuación para x"), 'es')
+
+
+if __name__ == '__main__':
+    unittest.main()
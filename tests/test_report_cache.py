@@ -0,0 +1,68 @@
+"""
+Unit tests for the whole-report cache
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from report_cache import ReportCache
+
+
+class TestReportCache(unittest.TestCase):
+    """Test the sqlite-backed report cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'reports.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_key(self):
+        """Test that a report comes back with its status, under its exact key only"""
+        cache = ReportCache(self.path)
+        key = cache.make_key('abc', '1:2:accurate', 'en:markers')
+        self.assertIsNone(cache.get(key))
+
+        report = {'success': True, 'total_problems': 2, 'solutions': [{'number': 1}]}
+        cache.put(key, report)
+        self.assertEqual(cache.get(key), (report, 200))
+        self.assertIsNone(cache.get(cache.make_key('abc', '2:2:accurate', 'en:markers')))
+        self.assertIsNone(cache.get(cache.make_key('abc', '1:2:accurate', 'translate:langdetect')))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 3, 1))
+
+    def test_negative_results_expire_sooner(self):
+        """Test that error responses are cached with the negative TTL"""
+        cache = ReportCache(self.path, ttl=3600, negative_ttl=0.05)
+        cache.put('ok', {'success': True})
+        cache.put('empty', {'error': 'No problems found in PDF.'}, 400)
+        self.assertEqual(cache.get('empty'), ({'error': 'No problems found in PDF.'}, 400))
+
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('empty'))
+        self.assertIsNotNone(cache.get('ok'))
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used report goes first over budget"""
+        cache = ReportCache(self.path, max_bytes=120)
+        cache.put('a', {'text': 'x' * 30})
+        cache.put('b', {'text': 'y' * 30})
+        cache.get('a')
+        cache.put('c', {'text': 'z' * 30})
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Unit tests for request coalescing
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import single_flight
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test that concurrent callers share one computation"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_concurrently(self, flight, key, func, count, lookup=None):
+        results = []
+
+        def call():
+            results.append(flight.do(key, func, lookup))
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_threads_share_one_computation(self):
+        """Test that concurrent callers with one key run the function once"""
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'total_problems': 3}
+
+        flight = SingleFlight()
+        results = self.run_concurrently(flight, 'sha:1', slow, 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result for result, _ in results], [{'total_problems': 3}] * 5)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+
+        # Once finished, the next caller computes afresh
+        self.assertEqual(flight.do('sha:1', lambda: 'again'), ('again', False))
+
+    def test_leader_errors_reach_followers(self):
+        """Test that followers see the leader's exception"""
+        def crash():
+            time.sleep(0.1)
+            raise RuntimeError('boom')
+
+        flight = SingleFlight()
+        errors = []
+
+        def call():
+            try:
+                flight.do('sha:1', crash)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, ['boom'] * 3)
+
+    def test_generator_holds_the_flight(self):
+        """Test that a streaming leader is waited for, and an abandoned one is replaced"""
+        flight = SingleFlight()
+
+        def stream(result):
+            with flight.flight('sha:1') as current:
+                if current.shared:
+                    yield ('replay', current.result)
+                    return
+                yield 'event'
+                current.result = result
+
+        results = []
+
+        def follow():
+            results.append(flight.do('sha:1', lambda: 'own'))
+
+        leader = stream('report')
+        self.assertEqual(next(leader), 'event')
+        follower = threading.Thread(target=follow)
+        follower.start()
+        time.sleep(0.05)
+        self.assertTrue(follower.is_alive())
+        self.assertEqual(list(leader), [])
+        follower.join()
+        self.assertEqual(results, [('report', True)])
+
+        # A client that disconnects mid-stream leaves no result to share
+        abandoned = stream('report')
+        next(abandoned)
+        follower = threading.Thread(target=follow)
+        follower.start()
+        time.sleep(0.05)
+        abandoned.close()
+        follower.join()
+        self.assertEqual(results[1:], [('own', False)])
+
+    @unittest.skipUnless(single_flight.fcntl, "needs fcntl")
+    def test_lock_file_coordinates_instances(self):
+        """Test that a second instance (another worker) waits and reads the shared store"""
+        store = {}
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            store['sha:1'] = 'report'
+            return 'report'
+
+        lock_dir = os.path.join(self.tmpdir.name, 'locks')
+        leader = SingleFlight(lock_dir, poll_interval=0.02)
+        other = SingleFlight(lock_dir, poll_interval=0.02)
+
+        thread = threading.Thread(target=leader.do, args=('sha:1', compute, lambda: store.get('sha:1')))
+        thread.start()
+        time.sleep(0.05)
+        result = other.do('sha:1', compute, lambda: store.get('sha:1'))
+        thread.join()
+
+        self.assertEqual(result, ('report', True))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(os.listdir(lock_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for shared solution templates
+"""
+
+import unittest
+import sys
+import os
+import json
+import pickle
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from advanced_solver import AdvancedSolutionGenerator
+from detailed_solver import DetailedSolutionGenerator
+from solution_templates import SolutionTemplate
+
+
+class TestSolutionTemplate(unittest.TestCase):
+    """Test the frozen body and per-problem overlay"""
+
+    def setUp(self):
+        self.template = SolutionTemplate({'number': None, 'type': 'T', 'steps': [{'step': 1}]})
+
+    def test_render_overlays_fields_in_template_order(self):
+        """Per-problem fields replace placeholders without reordering keys"""
+        solution = self.template.render(number=3)
+        self.assertEqual(list(solution), ['number', 'type', 'steps'])
+        self.assertEqual(solution['number'], 3)
+        self.assertIs(solution['steps'], self.template.render(number=4)['steps'])
+
+    def test_shared_body_is_read_only(self):
+        """Nested values refuse mutation; top-level keys are copy-on-write"""
+        solution = self.template.render(number=1)
+        with self.assertRaises(TypeError):
+            solution['steps'].append({'step': 2})
+        with self.assertRaises(TypeError):
+            solution['steps'][0]['step'] = 2
+        solution['steps'] = []
+        self.assertEqual(len(self.template.render()['steps']), 1)
+
+    def test_frozen_values_serialize(self):
+        """Rendered solutions survive JSON and pickle"""
+        solution = self.template.render(number=1)
+        self.assertEqual(json.loads(json.dumps(solution))['steps'], [{'step': 1}])
+        self.assertEqual(pickle.loads(pickle.dumps(solution)), solution)
+
+
+class TestGeneratorsShareTemplates(unittest.TestCase):
+    """Test that solvers build each type's body once"""
+
+    def test_detailed_solutions_share_body(self):
+        generator = DetailedSolutionGenerator()
+        first = generator.generate_detailed_solution(1, "Find the derivative of x^2", "calculus")
+        second = generator.generate_detailed_solution(2, "Find the slope of sin x", "calculus")
+        self.assertEqual((first['number'], second['number']), (1, 2))
+        self.assertEqual(second['problem'], "Find the slope of sin x")
+        self.assertIs(first['steps'], second['steps'])
+        self.assertIsNot(first['problem_analysis'], second['problem_analysis'])
+
+    def test_advanced_solutions_share_body(self):
+        generator = AdvancedSolutionGenerator()
+        first = generator.generate_solution(1, "a", "algebra")
+        second = generator.generate_solution(2, "b", "Algebra")
+        self.assertEqual((first['type'], second['type']), ("algebra", "Algebra"))
+        self.assertIs(first['theories'], second['theories'])
+
+
+if __name__ == '__main__':
+    unittest.main()
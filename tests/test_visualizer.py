@@ -0,0 +1,61 @@
+"""
+Unit tests for chart rendering
+"""
+
+import unittest
+import sys
+import os
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from visualizer import ReportVisualizer
+
+
+class TestConcurrentRendering(unittest.TestCase):
+    """Test that charts can be drawn from several threads at once"""
+
+    problems = [
+        {'type': 'algebra', 'problem': 'Solve 2x + 3 = 7'},
+        {'type': 'set theory', 'problem': 'Find the union of sets A and B'},
+        {'type': 'geometry', 'problem': 'A triangle has sides 3, 4 and 5'},
+        {'type': 'physics', 'problem': 'A force of 10 N acts on a mass of 2 kg'},
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def render(self, name, idx):
+        visualizer = ReportVisualizer(os.path.join(self.tmpdir.name, name))
+        paths = [
+            visualizer.generate_progression_visualization(self.problems[idx], idx),
+            visualizer.generate_problem_visualization(self.problems[idx], idx),
+        ]
+        digests = []
+        for path in paths:
+            with open(path, 'rb') as handle:
+                digests.append(hashlib.sha256(handle.read()).hexdigest())
+        return digests
+
+    def test_threads_match_serial_output(self):
+        """Test that charts drawn concurrently are identical to ones drawn alone"""
+        serial = [self.render('serial', idx) for idx in range(len(self.problems))]
+        with ThreadPoolExecutor(max_workers=len(self.problems)) as pool:
+            parallel = list(pool.map(lambda idx: self.render(f'run_{idx}', idx), range(len(self.problems))))
+        self.assertEqual(parallel, serial)
+
+    def test_figures_bypass_pyplot(self):
+        """Test that rendering leaves no figures in pyplot's global registry"""
+        self.render('alone', 0)
+        if 'matplotlib.pyplot' in sys.modules:
+            self.assertEqual(sys.modules['matplotlib.pyplot'].get_fignums(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
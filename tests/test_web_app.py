@@ -0,0 +1,444 @@
+"""
+Unit tests for the production web application
+"""
+
+import unittest
+import sys
+import os
+import hashlib
+import io
+import json
+import runpy
+import tempfile
+import threading
+import time
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+APP_SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'web_app_production.py')
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', 'PA2.pdf')
+
+# Extract in-process so route tests do not start sandbox children
+os.environ.setdefault('EXTRACTION_SANDBOX', '0')
+import web_app_production as web
+
+from analysis_jobs import JobQueue, JobStore, SqliteJobStore, DONE, FINISHED
+from compact_report import expand_tree
+from artifact_reaper import ArtifactReaper
+from extraction_cache import ExtractionCache
+from report_cache import ReportCache
+from single_flight import SingleFlight
+
+
+class WebAppTestCase(unittest.TestCase):
+    """Runs each test against fresh caches, job store and folders in a temporary directory"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+        def path(*parts):
+            return os.path.join(self.tmpdir, *parts)
+
+        os.makedirs(path('uploads'))
+        os.makedirs(path('runs'))
+        os.makedirs(path('jobs'))
+        store = JobStore()
+        reaper = ArtifactReaper(path('cache', 'artifacts.sqlite3'))
+        self.addCleanup(reaper.stop)
+        services = {
+            'RUNS_DIR': path('runs'),
+            'JOBS_DIR': path('jobs'),
+            'EXTRACTION_CACHE': ExtractionCache(path('cache', 'extraction.sqlite3')),
+            'REPORT_CACHE': ReportCache(path('cache', 'reports.sqlite3')),
+            'JOB_STORE': store,
+            'JOB_QUEUE': JobQueue(store, workers=1),
+            'ARTIFACT_REAPER': reaper,
+            'SINGLE_FLIGHT': SingleFlight(path('cache', 'locks')),
+        }
+        patcher = mock.patch.multiple(web, **services)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(web.app.config, UPLOAD_FOLDER=path('uploads'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Reports are built without charts, as when matplotlib is missing
+        patcher = mock.patch.dict(sys.modules, visualizer=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = web.app.test_client()
+
+    def upload(self, url, headers=None, **data):
+        """POST the sample PDF to url with extra form fields"""
+        with open(SAMPLE_PDF, 'rb') as f:
+            data['file'] = (f, 'PA2.pdf')
+            return self.client.post(url, data=data, headers=headers)
+
+    def stream(self):
+        """The events of a newline-delimited JSON /analyze/stream response"""
+        response = self.upload('/analyze/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+class TestAppImport(unittest.TestCase):
+    """Test what importing the web module sets up"""
+
+    def test_multiprocessing_children_skip_services(self):
+        """Test that a sandbox child importing the script as __mp_main__ builds no caches or queues"""
+        namespace = runpy.run_path(APP_SCRIPT, run_name='__mp_main__')
+        self.assertIn('app', namespace)
+        for name in ('EXTRACTION_CACHE', 'JOB_QUEUE', 'ARTIFACT_REAPER', 'REPORT_CACHE', 'SINGLE_FLIGHT'):
+            self.assertNotIn(name, namespace)
+
+    def test_sqlite_job_store(self):
+        """Test that JOB_STORE=sqlite builds the shared job store with the app's settings"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folders = {
+                'SCRIPT_DIR': tmpdir,
+                'RUNS_DIR': os.path.join(tmpdir, 'runs'),
+                'JOBS_DIR': os.path.join(tmpdir, 'jobs'),
+            }
+            services = dict.fromkeys(('EXTRACTION_CACHE', 'JOB_STORE', 'JOB_QUEUE', 'ARTIFACT_REAPER', 'REPORT_CACHE', 'SINGLE_FLIGHT'))
+            with mock.patch.dict(os.environ, JOB_STORE='sqlite'), \
+                    mock.patch.multiple(web, JOB_TTL=600, JOB_STALE_AFTER=45, **folders, **services), \
+                    mock.patch.dict(web.app.config, UPLOAD_FOLDER=os.path.join(tmpdir, 'uploads')):
+                web.init_services()
+                web.ARTIFACT_REAPER.stop()
+
+                self.assertIsInstance(web.JOB_STORE, SqliteJobStore)
+                self.assertEqual(web.JOB_STORE.path, os.path.join(tmpdir, 'jobs', 'jobs.sqlite3'))
+                self.assertEqual((web.JOB_STORE.ttl, web.JOB_STORE.stale_after), (600, 45))
+                self.assertIs(web.JOB_QUEUE.store, web.JOB_STORE)
+
+
+class TestLookup(WebAppTestCase):
+    """Test the hash-first lookup before upload"""
+
+    digest = hashlib.sha256(b'some pdf').hexdigest()
+
+    def lookup(self, **payload):
+        return self.client.post('/api/analyze/lookup', json=dict({'sha256': self.digest}, **payload))
+
+    def test_unknown_pdf(self):
+        """Test that a PDF never analyzed has to be uploaded"""
+        self.assertEqual(self.lookup().status_code, 404)
+        self.assertEqual(self.client.post('/api/analyze/lookup', json={'sha256': 'x'}).status_code, 400)
+
+    def test_cached_report_hides_the_uploader_filename(self):
+        """Test that a cached report is returned without the first uploader's file name"""
+        report = {'success': True, 'filename': 'jane-doe-exam.pdf', 'total_problems': 0, 'solutions': [], 'cliff_notes': {}}
+        web.store_report(web.report_cache_key(self.digest), 'a' * 32, report, 200)
+
+        response = self.lookup()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.get_json()['filename'])
+        self.assertTrue(response.get_json()['cached'])
+        self.assertEqual(self.lookup(format='compact').get_json()['format'], 'compact')
+
+    def test_running_job_hides_the_uploader_filename(self):
+        """Test that the job handed out by a lookup, and its result, carry no file name"""
+        job_id = 'b' * 32
+        web.JOB_STORE.create(job_id, content_key=web.report_cache_key(self.digest), filename='jane-doe-exam.pdf')
+
+        response = self.lookup()
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertIsNone(job['filename'])
+        self.assertEqual(self.client.get(job['result_url']).status_code, 202)
+
+        web.JOB_STORE.put_result(job_id, {'success': True, 'filename': 'jane-doe-exam.pdf'})
+        web.JOB_STORE.update(job_id, status=DONE, http_status=200)
+        result = self.client.get(job['result_url'])
+        self.assertEqual(result.status_code, 200)
+        self.assertIsNone(result.get_json()['filename'])
+
+
+class TestCompactResponse(WebAppTestCase):
+    """Test the opt-in compact /analyze format"""
+
+    def test_compact_report_expands_to_the_full_report(self):
+        """Test that expanding the templates of a compact report gives the full report"""
+        compact = self.upload('/analyze', format='compact')
+        self.assertEqual(compact.status_code, 200)
+        compact = compact.get_json()
+        self.assertEqual(compact['format'], 'compact')
+        self.assertTrue(compact['templates'])
+
+        full = self.upload('/analyze').get_json()
+        self.assertTrue(full['cached'])
+        self.assertNotIn('templates', full)
+        self.assertEqual(expand_tree(compact['templates'], compact['solutions']), full['solutions'])
+        self.assertEqual(expand_tree(compact['templates'], compact['cliff_notes']), full['cliff_notes'])
+
+    def test_cached_report_is_compacted_once(self):
+        """Test that repeated compact cache hits reuse the cached compact form"""
+        self.assertEqual(self.upload('/analyze').status_code, 200)
+        with open(SAMPLE_PDF, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        with mock.patch.object(web, 'compact_response', wraps=web.compact_response) as compact_response:
+            first = self.upload('/analyze', format='compact').get_json()
+            second = self.upload('/analyze', format='compact').get_json()
+            lookup = self.client.post('/api/analyze/lookup', json={'sha256': digest, 'format': 'compact'}).get_json()
+
+        self.assertEqual(compact_response.call_count, 1)
+        self.assertTrue(first['cached'] and second['cached'])
+        self.assertEqual(second['templates'], first['templates'])
+        self.assertEqual(lookup['solutions'], first['solutions'])
+
+
+class TestStream(WebAppTestCase):
+    """Test the progressive /analyze/stream response"""
+
+    def test_ndjson_events(self):
+        """Test that a header, one event per solution and the cliff notes are streamed in order"""
+        events = self.stream()
+        names = [event['event'] for event in events]
+        self.assertEqual(names[0], 'header')
+        self.assertEqual(names[-1], 'cliff_notes')
+        self.assertEqual(set(names[1:-1]), {'solution'})
+
+        header, summary = events[0], events[-1]
+        self.assertEqual(header['filename'], 'PA2.pdf')
+        # Nothing was extracted yet, so the count only comes at the end
+        self.assertIsNone(header['total_problems'])
+        self.assertGreater(header['preflight']['text_pages'], 0)
+        self.assertEqual([event['index'] for event in events[1:-1]], list(range(len(events) - 2)))
+        self.assertEqual(summary['total_problems'], len(events) - 2)
+        self.assertTrue(summary['success'])
+
+    def test_sse_events(self):
+        """Test that clients accepting text/event-stream get the same events as Server-Sent Events"""
+        response = self.upload('/analyze/stream', headers={'Accept': 'text/event-stream'})
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        messages = [message.split('\n') for message in response.get_data(as_text=True).strip().split('\n\n')]
+        names = [lines[0] for lines in messages]
+        self.assertEqual(names[0], 'event: header')
+        self.assertEqual(names[-1], 'event: cliff_notes')
+        summary = json.loads(messages[-1][1][len('data: '):])
+        self.assertEqual(summary['total_problems'], len(messages) - 2)
+
+    def test_rejects_other_files(self):
+        """Test that uploads other than PDFs get a JSON error before any streaming"""
+        response = self.client.post('/analyze/stream', data={'file': (io.BytesIO(b'text'), 'notes.txt')})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.get_json())
+
+
+class TestReportCache(WebAppTestCase):
+    """Test that repeat uploads are answered from the report cache"""
+
+    def setUp(self):
+        super().setUp()
+        with open(SAMPLE_PDF, 'rb') as f:
+            self.cache_key = web.report_cache_key(hashlib.sha256(f.read()).hexdigest())
+
+    def test_repeat_upload_is_not_analyzed_again(self):
+        """Test that /analyze answers a byte-identical upload from the cache"""
+        first = self.upload('/analyze').get_json()
+        self.assertNotIn('cached', first)
+
+        with mock.patch.object(web, 'build_analyzer') as build_analyzer:
+            second = self.upload('/analyze').get_json()
+        build_analyzer.assert_not_called()
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['solutions'], first['solutions'])
+
+    def test_stream_replays_cached_report(self):
+        """Test that /analyze/stream replays a cached report as the usual events"""
+        report = self.upload('/analyze').get_json()
+
+        with mock.patch.object(web, 'build_analyzer') as build_analyzer:
+            events = self.stream()
+        build_analyzer.assert_not_called()
+        self.assertTrue(events[0]['cached'])
+        self.assertEqual(events[0]['total_problems'], report['total_problems'])
+        self.assertEqual([event['solution'] for event in events[1:-1]], report['solutions'])
+        self.assertEqual(events[-1]['cliff_notes'], report['cliff_notes'])
+
+    def test_negative_result_is_cached(self):
+        """Test that a cached 'No problems found' is returned with its error status"""
+        web.store_report(self.cache_key, 'a' * 32, {'error': 'No problems found in PDF.', 'truncated': None}, 400)
+
+        response = self.upload('/analyze')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.get_json()['cached'])
+        events = self.stream()
+        self.assertEqual([event['event'] for event in events], ['error'])
+
+    def test_report_without_its_charts_is_a_miss(self):
+        """Test that a report whose charts were deleted is analyzed again"""
+        report = {'success': True, 'run_id': 'c' * 32, 'solutions': [{'visualization': '/api/image/x/y.png'}]}
+        web.store_report(self.cache_key, 'c' * 32, report, 200)
+
+        self.assertIsNone(web.cached_report(self.cache_key))
+        self.assertIsNone(web.REPORT_CACHE.get(self.cache_key))
+
+
+class TestCoalescing(WebAppTestCase):
+    """Test that uploads of a PDF already being analyzed share that analysis"""
+
+    def setUp(self):
+        super().setUp()
+        self.report = self.upload('/analyze').get_json()
+        with open(SAMPLE_PDF, 'rb') as f:
+            self.cache_key = web.report_cache_key(hashlib.sha256(f.read()).hexdigest())
+        web.REPORT_CACHE.invalidate(self.cache_key)
+
+    def while_in_flight(self, request):
+        """Run request() in a thread while the test leads an analysis of the sample PDF"""
+        checked = threading.Event()
+        cached_report = web.cached_report
+
+        def check(*args, **kwargs):
+            found = cached_report(*args, **kwargs)
+            checked.set()
+            return found
+
+        results = []
+        with mock.patch.object(web, 'cached_report', side_effect=check):
+            with web.SINGLE_FLIGHT.flight(self.cache_key) as flight:
+                thread = threading.Thread(target=lambda: results.append(request()))
+                thread.start()
+                # The request has missed the report cache; whether it joins
+                # this flight or takes the key after it, it gets this report
+                self.assertTrue(checked.wait(10))
+                web.store_report(self.cache_key, self.report['run_id'], self.report, 200)
+                flight.result = self.report, 200
+            thread.join(30)
+        self.assertFalse(thread.is_alive())
+        return results[0]
+
+    def test_analyze_shares_running_analysis(self):
+        """Test that /analyze answers with the leader's report, marked as coalesced"""
+        shared = web.SINGLE_FLIGHT.stats()['shared']
+        response = self.while_in_flight(lambda: self.upload('/analyze'))
+
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertTrue(report['coalesced'])
+        self.assertEqual(report['solutions'], self.report['solutions'])
+        self.assertEqual(web.SINGLE_FLIGHT.stats()['shared'], shared + 1)
+
+    def test_stream_replays_running_analysis(self):
+        """Test that /analyze/stream replays the leader's report as events"""
+        body = self.while_in_flight(lambda: self.upload('/analyze/stream').get_data(as_text=True))
+
+        events = [json.loads(line) for line in body.splitlines()]
+        self.assertTrue(events[0]['coalesced'])
+        self.assertEqual([event['solution'] for event in events[1:-1]], self.report['solutions'])
+        self.assertEqual(events[-1]['event'], 'cliff_notes')
+
+
+class TestAsyncJobs(WebAppTestCase):
+    """Test /analyze?mode=async and the job polling endpoints"""
+
+    def wait_for_result(self, job):
+        """Poll a job's result URL until it is finished"""
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            response = self.client.get(job['result_url'])
+            if response.status_code != 202:
+                return response
+            time.sleep(0.05)
+        self.fail(f"job {job['job_id']} did not finish")
+
+    def test_job_runs_to_its_report(self):
+        """Test that an async upload is queued, reports its status and returns the report"""
+        response = self.upload('/analyze', mode='async')
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertEqual(response.headers['Location'], job['status_url'])
+        self.assertEqual(job['filename'], 'PA2.pdf')
+        self.assertGreater(job['preflight']['text_pages'], 0)
+
+        result = self.wait_for_result(job)
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.get_json()['success'])
+        status = self.client.get(job['status_url']).get_json()
+        self.assertEqual(status['status'], DONE)
+        # The private upload copy is gone once the job has finished
+        self.assertEqual(os.listdir(web.JOBS_DIR), [])
+
+    def test_prefer_header_and_compact_format(self):
+        """Test that 'Prefer: respond-async' queues a job and format=compact applies to its result"""
+        response = self.upload('/analyze', headers={'Prefer': 'respond-async'}, format='compact')
+        self.assertEqual(response.status_code, 202)
+        result = self.wait_for_result(response.get_json()).get_json()
+        self.assertEqual(result['format'], 'compact')
+
+    def test_upload_attaches_to_running_job(self):
+        """Test that an async upload of a PDF already queued gets the existing job"""
+        with open(SAMPLE_PDF, 'rb') as f:
+            cache_key = web.report_cache_key(hashlib.sha256(f.read()).hexdigest())
+        web.JOB_STORE.create('d' * 32, content_key=cache_key, filename='other.pdf')
+
+        response = self.upload('/analyze', mode='async')
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertEqual(job['job_id'], 'd' * 32)
+        self.assertEqual(job['filename'], 'PA2.pdf')
+        self.assertNotIn(job['status'], FINISHED)
+
+    def test_full_queue_asks_to_retry(self):
+        """Test that a full queue answers 503 with Retry-After and keeps no upload copy"""
+        with mock.patch.object(web, 'JOB_QUEUE', JobQueue(web.JOB_STORE, workers=1, max_pending=0)):
+            response = self.upload('/analyze', mode='async')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertEqual(os.listdir(web.JOBS_DIR), [])
+
+    def test_unknown_job(self):
+        """Test that unknown job IDs are 404 on both endpoints"""
+        self.assertEqual(self.client.get('/api/jobs/nope').status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/nope/result').status_code, 404)
+
+    def test_jobs_shared_through_sqlite(self):
+        """Test that a job run on a SQLite job store is visible to a second store on the same file"""
+        path = os.path.join(self.tmpdir, 'jobs', 'jobs.sqlite3')
+        store = SqliteJobStore(path)
+        with mock.patch.multiple(web, JOB_STORE=store, JOB_QUEUE=JobQueue(store, workers=1)):
+            job = self.upload('/analyze', mode='async').get_json()
+            self.wait_for_result(job)
+        with mock.patch.object(web, 'JOB_STORE', SqliteJobStore(path)):
+            result = self.client.get(job['result_url'])
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.get_json()['success'])
+
+
+class TestRunArtifacts(WebAppTestCase):
+    """Test that the artifact quota leaves the charts of running analyses alone"""
+
+    def held_during(self, name, request):
+        """Whether the run directory was held when web.<name> ran, and after the request"""
+        held = []
+        original = getattr(web, name)
+
+        def check(run_id, *args, **kwargs):
+            held.append(web.ARTIFACT_REAPER.is_held(web.run_dir(run_id)))
+            held.append(run_id)
+            return original(run_id, *args, **kwargs)
+
+        with mock.patch.object(web, name, side_effect=check):
+            request()
+        during, run_id = held
+        return during, web.ARTIFACT_REAPER.is_held(web.run_dir(run_id))
+
+    def test_analyze_holds_its_run_directory(self):
+        """Test that /analyze holds the run directory while it builds the report"""
+        self.assertEqual(self.held_during('build_report', lambda: self.upload('/analyze')), (True, False))
+
+    def test_stream_holds_its_run_directory(self):
+        """Test that /analyze/stream holds the run directory while it streams"""
+        self.assertEqual(self.held_during('stream_analysis', self.stream), (True, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,15 +3,17 @@ Production-Ready Web Application
 AI Homework Analyzer with Step-by-Step Solutions
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, send_file, stream_with_context
+from werkzeug.utils import secure_filename
 import base64
+import json
 import os
 import sys
 import socket
 from pathlib import Path
 import logging
-import threading
-import time
+import re
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,32 +29,294 @@ app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 # Use absolute paths for directory creation
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 app.config['UPLOAD_FOLDER'] = os.path.join(SCRIPT_DIR, 'reports', 'uploads')
-GRAPHS_DIR = os.path.join(SCRIPT_DIR, 'reports', 'graphs')
+# Each analysis run writes its charts under reports/runs/<run id>/ (the job
+# ID for async jobs), so concurrent requests never share a file
+RUNS_DIR = os.path.join(SCRIPT_DIR, 'reports', 'runs')
+RUN_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
 
-# Create necessary directories
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(GRAPHS_DIR, exist_ok=True)
-logger.info(f"📁 Project root: {SCRIPT_DIR}")
-logger.info(f"📁 Upload folder: {app.config['UPLOAD_FOLDER']}")
-logger.info(f"📁 Graphs folder: {GRAPHS_DIR}")
+# Keep a copy of each uploaded PDF on disk (deleted after an hour)
+app.config['RETAIN_UPLOADS'] = os.environ.get('RETAIN_UPLOADS', '').lower() in ('1', 'true', 'yes')
+
+# Processes each request may use for page extraction on large PDFs when the
+# sandbox is off (0 = one per CPU, which every concurrent request would start)
+app.config['EXTRACTION_WORKERS'] = int(os.environ.get('EXTRACTION_WORKERS', '2'))
+
+# Text extraction profile for the whole deployment, from EXTRACTION_BACKEND:
+# 'accurate' (pdfplumber layout, the default) or 'fast' (PDFium); requests
+# cannot choose their own
+from extraction_backends import DEFAULT_BACKEND
+app.config['EXTRACTION_BACKEND'] = DEFAULT_BACKEND
+
+# Extraction runs in a limited child process so a pathological PDF cannot
+# pin a worker; partial results are returned with a 'truncated' reason.
+# Set EXTRACTION_SANDBOX=0 to extract in-process (and use EXTRACTION_WORKERS)
+from extraction_sandbox import ExtractionLimits
+EXTRACTION_LIMITS = None
+if os.environ.get('EXTRACTION_SANDBOX', '1').lower() not in ('0', 'false', 'no'):
+    EXTRACTION_LIMITS = ExtractionLimits(
+        deadline=float(os.environ.get('EXTRACTION_DEADLINE', 120)),
+        memory_bytes=int(os.environ.get('EXTRACTION_MEMORY_BYTES', 1024 * 1024 * 1024)),
+        page_timeout=float(os.environ.get('EXTRACTION_PAGE_TIMEOUT', 20))
+    )
+
+from extraction_cache import ExtractionCache
+from analysis_jobs import JobQueue, JobStore, SqliteJobStore, QueueFull, FINISHED
+from artifact_reaper import ArtifactReaper
+from report_cache import ReportCache
+from single_flight import SingleFlight
+
+JOBS_DIR = os.path.join(SCRIPT_DIR, 'reports', 'jobs')
+JOB_TTL = float(os.environ.get('JOB_TTL', 3600))
+JOB_STALE_AFTER = float(os.environ.get('JOB_STALE_AFTER', 120))
+
+
+def init_services():
+    """
+    Create the directories, caches, job queue and reaper the routes use.
+    Runs once at import, except in multiprocessing children: when this
+    script is started directly (run.bat), each forkserver/spawn child of
+    the extraction sandbox imports it again as __mp_main__, and must not
+    rebuild the caches, start reaper threads or create a job queue.
+    """
+    global EXTRACTION_CACHE, JOB_STORE, JOB_QUEUE, ARTIFACT_REAPER, REPORT_CACHE, SINGLE_FLIGHT
+    
+    # Create necessary directories
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    
+    # Extracted text/problems keyed by PDF hash, shared by all workers
+    EXTRACTION_CACHE = ExtractionCache(
+        os.path.join(SCRIPT_DIR, 'reports', 'cache', 'extraction.sqlite3'),
+        max_bytes=int(os.environ.get('EXTRACTION_CACHE_BYTES', 256 * 1024 * 1024))
+    )
+    
+    # Background analyses for /analyze?mode=async: a bounded pool per web worker.
+    # JOB_STORE=sqlite shares job status and results between all web workers.
+    # A job whose worker died (no heartbeat for JOB_STALE_AFTER seconds, or its
+    # process is gone) is no longer attached to and is reported failed
+    if os.environ.get('JOB_STORE', 'memory').lower() == 'sqlite':
+        JOB_STORE = SqliteJobStore(os.path.join(JOBS_DIR, 'jobs.sqlite3'), ttl=JOB_TTL, stale_after=JOB_STALE_AFTER)
+    else:
+        JOB_STORE = JobStore(ttl=JOB_TTL, stale_after=JOB_STALE_AFTER)
+    JOB_QUEUE = JobQueue(
+        JOB_STORE,
+        workers=int(os.environ.get('JOB_WORKERS', 2)),
+        max_pending=int(os.environ.get('JOB_QUEUE_SIZE', 16))
+    )
+    
+    # Uploads and charts are deleted on schedule by one reaper thread; the
+    # schedule survives restarts, and over ARTIFACT_QUOTA_BYTES the oldest
+    # artifacts go early
+    ARTIFACT_REAPER = ArtifactReaper(
+        os.path.join(SCRIPT_DIR, 'reports', 'cache', 'artifacts.sqlite3'),
+        quota_bytes=int(os.environ.get('ARTIFACT_QUOTA_BYTES', 512 * 1024 * 1024))
+    )
+    ARTIFACT_REAPER.start()
+    
+    # Finished /analyze responses keyed by PDF hash, pipeline version and
+    # language mode; "No problems found" is cached for a shorter time
+    REPORT_CACHE = ReportCache(
+        os.path.join(SCRIPT_DIR, 'reports', 'cache', 'reports.sqlite3'),
+        max_bytes=int(os.environ.get('REPORT_CACHE_BYTES', 64 * 1024 * 1024)),
+        ttl=float(os.environ.get('REPORT_CACHE_TTL', 3600)),
+        negative_ttl=float(os.environ.get('REPORT_CACHE_NEGATIVE_TTL', 600))
+    )
+    
+    # Concurrent analyses of the same PDF run once: threads wait for the
+    # leader, other worker processes wait on a lock file and then read the
+    # leader's report from the report cache
+    SINGLE_FLIGHT = SingleFlight(os.path.join(SCRIPT_DIR, 'reports', 'cache', 'locks'))
+    
+    logger.info(f"📁 Project root: {SCRIPT_DIR}")
+    logger.info(f"📁 Upload folder: {app.config['UPLOAD_FOLDER']}")
+    logger.info(f"📁 Runs folder: {RUNS_DIR}")
+
+
+if __name__ != '__mp_main__':
+    init_services()
 
 
 def delete_after_delay(filepath, delay_seconds=3600):
     """
-    Delete a file after a specified delay (default: 1 hour).
-    Runs in a background thread for privacy protection.
+    Delete a file or directory after a specified delay (default: 1 hour).
+    The deletion is queued with the artifact reaper for privacy protection.
     """
-    def delayed_delete():
-        try:
-            time.sleep(delay_seconds)
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                logger.info(f"🗑️ Auto-deleted for privacy: {filepath}")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to auto-delete {filepath}: {str(e)}")
+    ARTIFACT_REAPER.schedule(str(filepath), delay_seconds)
+
+
+def new_run_id():
+    """A fresh ID naming one analysis run's artifacts"""
+    return uuid.uuid4().hex
+
+
+def run_dir(run_id):
+    """Directory holding one run's charts (graphs/ inside it)"""
+    return os.path.join(RUNS_DIR, run_id)
+
+
+def save_retained_upload(file, run_id):
+    """
+    Keep a copy of the upload when RETAIN_UPLOADS is set.
+    The upload is analyzed straight from the request stream; it only touches
+    disk when uploads are retained, named after its run.
+    Returns (filepath or None, error response or None).
+    """
+    if not app.config['RETAIN_UPLOADS']:
+        return None, None
     
-    thread = threading.Thread(target=delayed_delete, daemon=True)
-    thread.start()
+    upload_dir = Path(app.config['UPLOAD_FOLDER'])
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    filepath = upload_dir / f"{run_id}_{secure_filename(file.filename)}"
+    
+    try:
+        file.save(str(filepath))
+        file.stream.seek(0)
+        logger.info(f"✅ File saved: {filepath}")
+    except Exception as e:
+        logger.error(f"❌ File save error: {str(e)}")
+        return None, (jsonify({'error': f'Failed to save file: {str(e)}'}), 400)
+    return filepath, None
+
+
+def build_analyzer(file):
+    """
+    Create the analyzer for an upload and run its preflight.
+    Returns (analyzer, preflight summary, error response or None).
+    """
+    from homework_solver import HomeworkAnalyzerAlgorithm
+    
+    logger.info(f"🔄 Analyzing PDF: {file.filename}")
+    try:
+        analyzer = HomeworkAnalyzerAlgorithm(
+            cache=EXTRACTION_CACHE,
+            limits=EXTRACTION_LIMITS,
+            backend=app.config['EXTRACTION_BACKEND']
+        )
+    except ValueError as e:
+        return None, None, (jsonify({'error': str(e)}), 400)
+    
+    # Millisecond preflight: reject PDFs without a text layer before
+    # paying for full extraction
+    preflight = analyzer.preflight(file.stream)
+    preflight_summary = {
+        'page_count': preflight['page_count'],
+        'text_pages': preflight['text_pages'],
+        'estimated_seconds': preflight['estimated_seconds']
+    }
+    logger.info(f"🔎 Preflight: {preflight_summary}")
+    if not preflight['text_pages']:
+        return analyzer, preflight_summary, (jsonify({
+            'error': 'This PDF has no extractable text (empty, scanned, or image-only). Please upload a text-based PDF.',
+            'preflight': preflight_summary
+        }), 400)
+    return analyzer, preflight_summary, None
+
+
+def report_cache_key(digest):
+    """Report cache key of a PDF: its SHA-256, the pipeline version and the language mode"""
+    from homework_solver import EXTRACTOR_VERSION
+    from extraction_backends import get_backend
+    from detailed_solver import REPORT_VERSION, report_language
+    
+    backend = get_backend(app.config['EXTRACTION_BACKEND'])
+    version = f"{REPORT_VERSION}:{EXTRACTOR_VERSION}:{backend.name}:{backend.version}"
+    return REPORT_CACHE.make_key(digest, version, report_language())
+
+
+def compact_cache_key(cache_key):
+    """Report cache key of the compact form of a report"""
+    return f"{cache_key}:compact"
+
+
+def charts_exist(response):
+    """Whether the charts a cached report links to are still on disk"""
+    run_id = response.get('run_id')
+    has_charts = any(sol.get('visualization') for sol in response.get('solutions', []))
+    return not has_charts or bool(run_id and os.path.isdir(run_dir(run_id)))
+
+
+def cached_report(cache_key, compact=False):
+    """
+    Return the cached (response, status) for a key, or None.
+    With compact=True a successful report is returned in the compact format.
+    It is compacted on the first such hit and cached that way, so later hits
+    load and send the smaller document instead of compacting again.
+    A report whose charts have already been deleted counts as a miss.
+    """
+    if compact:
+        cached = REPORT_CACHE.get(compact_cache_key(cache_key))
+        if cached is not None and charts_exist(cached[0]):
+            return cached
+    
+    cached = REPORT_CACHE.get(cache_key)
+    if cached is None:
+        return None
+    
+    response, status = cached
+    if not charts_exist(response):
+        REPORT_CACHE.invalidate(cache_key)
+        REPORT_CACHE.invalidate(compact_cache_key(cache_key))
+        return None
+    if compact and status == 200:
+        response = compact_response(response)
+        REPORT_CACHE.put(compact_cache_key(cache_key), response, status)
+    return response, status
+
+
+def store_report(cache_key, run_id, response, status):
+    """Cache a finished report (partial, truncated results are not reused)"""
+    if response.get('truncated'):
+        return
+    REPORT_CACHE.put(cache_key, response, status)
+    # The compact form is rebuilt from this report on its next hit
+    REPORT_CACHE.invalidate(compact_cache_key(cache_key))
+    # Keep the charts as long as the report that links them
+    if status < 400 and REPORT_CACHE.ttl > 3600:
+        delete_after_delay(run_dir(run_id), delay_seconds=REPORT_CACHE.ttl)
+
+
+def compact_response(response):
+    """
+    Opt-in compact format: repeated explanation blocks are sent once in
+    'templates' and referenced as {"$t": index}.
+    """
+    from compact_report import compact_tree
+    
+    templates, compacted = compact_tree({
+        'solutions': response['solutions'],
+        'cliff_notes': response['cliff_notes']
+    })
+    response = dict(response)
+    response.update(compacted)
+    response['templates'] = templates
+    response['format'] = 'compact'
+    logger.info(f"📦 Compact response: {len(templates)} shared template blocks")
+    return response
+
+
+def problem_visualization(visualizer, problem, idx, run_id):
+    """
+    Render one problem's chart (progression first, basic as fallback).
+    Returns its image URL, or None when no chart could be made.
+    """
+    try:
+        # Try to generate progression visualization (step-by-step)
+        viz_path = visualizer.generate_progression_visualization(problem, idx)
+        
+        # Fallback to basic visualization if progression fails
+        if not viz_path:
+            viz_path = visualizer.generate_problem_visualization(problem, idx)
+        
+        if viz_path and os.path.exists(viz_path):
+            viz_url = f"/api/image/{run_id}/problem_{idx}"
+            logger.info(f"   ✅ Problem {idx}: Generated {os.path.basename(viz_path)} ({os.path.getsize(viz_path)} bytes)")
+            return viz_url
+        logger.warning(f"   ⚠️ Problem {idx}: No visualization path or file doesn't exist")
+    except Exception as viz_error:
+        logger.warning(f"   ❌ Problem {idx}: {str(viz_error)}")
+    return None
 
 
 def get_local_ip():
@@ -96,46 +360,30 @@ def analyzer():
     return render_template('detailed_solution.html', local_ip=local_ip)
 
 
-@app.route('/api/image/<filename>')
-def serve_image(filename):
-    """Serve visualization images"""
+@app.route('/api/image/<run_id>/<filename>')
+def serve_image(run_id, filename):
+    """Serve visualization images of one analysis run"""
     try:
-        logger.info(f"🖼️ IMAGE REQUEST: {filename}")
+        logger.info(f"🖼️ IMAGE REQUEST: {run_id}/{filename}")
         
-        # Security: only allow serving problem_N format (N = digit index)
-        import re
-        if not re.match(r'^problem_\d+$', filename):
-            logger.warning(f"❌ Invalid image request: {filename}")
+        # Security: only allow a run ID and the problem_N format (N = digit index)
+        if not RUN_ID_PATTERN.match(run_id) or not re.match(r'^problem_\d+$', filename):
+            logger.warning(f"❌ Invalid image request: {run_id}/{filename}")
             return jsonify({'error': 'Invalid image'}), 400
         
         # Try progression visualization first, then basic visualization
-        filepath_progression = os.path.join(GRAPHS_DIR, f'{filename}_progression.png')
-        filepath_basic = os.path.join(GRAPHS_DIR, f'{filename}.png')
-        
-        logger.info(f"  Looking for: {filepath_progression}")
-        logger.info(f"    Exists: {os.path.exists(filepath_progression)}")
-        logger.info(f"  Fallback: {filepath_basic}")
-        logger.info(f"    Exists: {os.path.exists(filepath_basic)}")
-        
-        filepath = None
-        if os.path.exists(filepath_progression):
-            filepath = filepath_progression
-            logger.info(f"✅ Found progression visualization: {filename} ({os.path.getsize(filepath)} bytes)")
-        elif os.path.exists(filepath_basic):
-            filepath = filepath_basic
-            logger.info(f"✅ Found basic visualization: {filename} ({os.path.getsize(filepath)} bytes)")
+        graphs_dir = os.path.join(run_dir(run_id), 'graphs')
+        for suffix in ('progression', 'visual'):
+            filepath = os.path.join(graphs_dir, f'{filename}_{suffix}.png')
+            if os.path.exists(filepath):
+                break
         else:
-            logger.warning(f"❌ Image NOT found for {filename}")
-            if os.path.exists(GRAPHS_DIR):
-                files = os.listdir(GRAPHS_DIR)
-                logger.warning(f"  Available files in {GRAPHS_DIR}: {files}")
-            else:
-                logger.warning(f"  GRAPHS_DIR doesn't exist: {GRAPHS_DIR}")
+            logger.warning(f"❌ Image NOT found for {run_id}/{filename}")
             return jsonify({'error': 'Image not found', 'requested': filename}), 404
         
         # Serve the image file
         logger.info(f"📤 Sending {os.path.getsize(filepath)} bytes from {filepath}")
-        return send_file(filepath, mimetype='image/png', cache_timeout=3600)
+        return send_file(filepath, mimetype='image/png', max_age=3600)
     except Exception as e:
         logger.error(f"❌ Error serving image {filename}: {str(e)}")
         import traceback
@@ -145,16 +393,18 @@ def serve_image(filename):
 
 @app.route('/api/debug/images')
 def debug_images():
-    """Debug endpoint to check what images exist"""
+    """Debug endpoint to check what images exist, per run"""
     try:
-        files = []
-        if os.path.exists(GRAPHS_DIR):
-            files = os.listdir(GRAPHS_DIR)
+        runs = {}
+        if os.path.exists(RUNS_DIR):
+            for run_id in os.listdir(RUNS_DIR):
+                graphs_dir = os.path.join(RUNS_DIR, run_id, 'graphs')
+                runs[run_id] = os.listdir(graphs_dir) if os.path.isdir(graphs_dir) else []
         
         return jsonify({
-            'graphs_dir': GRAPHS_DIR,
-            'exists': os.path.exists(GRAPHS_DIR),
-            'files': files
+            'runs_dir': RUNS_DIR,
+            'exists': os.path.exists(RUNS_DIR),
+            'runs': runs
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -172,13 +422,21 @@ def status():
             'Theory Explanations',
             'Multiple Problem Types',
             'Professional Design'
-        ]
+        ],
+        'extraction_cache': EXTRACTION_CACHE.stats(),
+        'report_cache': REPORT_CACHE.stats(),
+        'single_flight': SINGLE_FLIGHT.stats()
     })
 
 
 @app.route('/analyze', methods=['GET', 'POST'])
 def analyze():
-    """Analyze PDF and generate complete solution with cliff notes"""
+    """
+    Analyze PDF and generate complete solution with cliff notes.
+    With mode=async (or a 'Prefer: respond-async' header) the upload is
+    validated and queued instead: the response is 202 with a job ID to poll
+    at /api/jobs/<id>.
+    """
     try:
         if request.method == 'GET':
             return redirect(url_for('index'))
@@ -190,124 +448,61 @@ def analyze():
         if not file.filename or not file.filename.lower().endswith('.pdf'):
             return jsonify({'error': 'Please upload a valid PDF file'}), 400
         
-        # Save uploaded file
-        upload_dir = Path(app.config['UPLOAD_FOLDER'])
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        filepath = upload_dir / file.filename
-        
-        try:
-            file.save(str(filepath))
-            logger.info(f"✅ File saved: {filepath}")
-        except Exception as e:
-            logger.error(f"❌ File save error: {str(e)}")
-            return jsonify({'error': f'Failed to save file: {str(e)}'}), 400
+        run_id = new_run_id()
+        filepath, error = save_retained_upload(file, run_id)
+        if error:
+            return error
         
         # Analyze PDF
         try:
-            from homework_solver import HomeworkAnalyzerAlgorithm, TheoryBase
-            from detailed_solver import generate_detailed_report
+            compact = request.values.get('format') == 'compact'
             
-            logger.info(f"🔄 Analyzing PDF: {file.filename}")
-            analyzer = HomeworkAnalyzerAlgorithm()
-            problems = analyzer.extract_and_analyze(str(filepath))
-            
-            if not problems:
-                logger.warning("⚠️ No problems found in PDF")
-                # Delete uploaded file for privacy even when no problems found
-                delete_after_delay(str(filepath), delay_seconds=3600)
-                logger.info("🔒 Scheduling empty PDF deletion for privacy")
-                return jsonify({'error': 'No problems found in PDF. Please check the file format.'}), 400
+            # A byte-identical upload is answered from the report cache (in
+            # async mode too, as an immediate 200)
+            from extraction_cache import hash_source
+            cache_key = report_cache_key(hash_source(file.stream))
+            cached = cached_report(cache_key, compact=compact)
+            if cached is not None:
+                response, status = cached
+                logger.info(f"⚡ Report cache hit for {file.filename}")
+                if filepath:
+                    delete_after_delay(str(filepath), delay_seconds=3600)
+                response.update(filename=file.filename, cached=True)
+                return jsonify(response), status
             
-            logger.info(f"✅ Found {len(problems)} problems")
+            analyzer, preflight_summary, error = build_analyzer(file)
+            if error:
+                return error
             
-            theory_base = TheoryBase()
-            theories = theory_base.THEORIES
-            
-            # Generate comprehensive detailed report with cliff notes
-            report = generate_detailed_report(problems, theories)
-            
-            # Generate graphs (optional)
-            graph_paths = {}
-            logger.info(f"🔍 GRAPHS_DIR is set to: {GRAPHS_DIR}")
-            logger.info(f"🔍 GRAPHS_DIR exists: {os.path.exists(GRAPHS_DIR)}")
-            try:
-                from visualizer import ReportVisualizer
-                logger.info("📊 Generating visualizations...")
-                visualizer = ReportVisualizer()
-                graph_paths = visualizer.generate_all_visualizations(problems, theories)
-                logger.info(f"✅ Generated {len(graph_paths)} graphs")
-                
-                # Generate individual problem visualizations and add to solutions
-                logger.info("🎨 Generating individual problem visualizations...")
-                problems_with_viz = 0
-                for idx, problem in enumerate(problems):
-                    try:
-                        # Try to generate progression visualization (step-by-step)
-                        viz_path = visualizer.generate_progression_visualization(problem, idx)
-                        
-                        # Fallback to basic visualization if progression fails
-                        if not viz_path:
-                            viz_path = visualizer.generate_problem_visualization(problem, idx)
-                        
-                        if viz_path and os.path.exists(viz_path):
-                            viz_url = f"/api/image/problem_{idx}"
-                            logger.info(f"   ✅ Problem {idx}: Generated {os.path.basename(viz_path)} ({os.path.getsize(viz_path)} bytes)")
-                            logger.info(f"   -> Setting visualization URL: {viz_url}")
-                            
-                            # Add to both problems and solutions
-                            problems[idx]['visualization'] = viz_url
-                            if idx < len(report['problems_analyzed']):
-                                report['problems_analyzed'][idx]['visualization'] = viz_url
-                                logger.info(f"   -> Added to report['problems_analyzed'][{idx}]")
-                            else:
-                                logger.warning(f"   ⚠️ Index {idx} out of range for solutions (length={len(report['problems_analyzed'])})")
-                            problems_with_viz += 1
-                            
-                            # Schedule deletion of individual viz
-                            delete_after_delay(viz_path, delay_seconds=3600)
-                        else:
-                            logger.warning(f"   ⚠️ Problem {idx}: No visualization path or file doesn't exist")
-                    except Exception as viz_error:
-                        logger.warning(f"   ❌ Problem {idx}: {str(viz_error)}")
-                logger.info(f"✅ Generated visualizations for {problems_with_viz}/{len(problems)} problems")
-            except Exception as e:
-                logger.warning(f"⚠️ Graph generation skipped: {str(e)}")
-            
-            # Build response (much smaller now - no base64 images)
-            response = {
-                'success': True,
-                'filename': file.filename,
-                'total_problems': len(problems),
-                'problem_types': report['summary']['problem_types'],
-                'problems': problems[:10],
-                'solutions': report['problems_analyzed'],
-                'cliff_notes': report.get('cliff_notes', {}),
-                'statistics': {
-                    'total_theories': report['summary']['total_theories'],
-                    'total_domains': len(theories),
-                    'problems_solved': len(problems)
-                },
-                'graphs': list(graph_paths.keys())
-            }
+            if request.values.get('mode') == 'async' or 'respond-async' in request.headers.get('Prefer', ''):
+                if filepath:
+                    delete_after_delay(str(filepath), delay_seconds=3600)
+                # Attach to a job already analyzing the same PDF
+                job = JOB_STORE.find_active(cache_key)
+                if job is not None:
+                    logger.info(f"🔗 Attached to running job {job['id']} for {file.filename}")
+                    return jsonify(job_response(job, filename=file.filename, preflight=preflight_summary)), 202
+                return submit_analysis_job(run_id, file, analyzer, preflight_summary, compact, cache_key)
             
-            # Debug: Check what's in response before sending
-            logger.info(f"📤 RESPONSE CHECK: Sending {len(response['solutions'])} solutions")
-            for idx, sol in enumerate(response['solutions'][:3]):
-                has_viz = 'visualization' in sol and sol['visualization'] is not None
-                viz_val = sol.get('visualization', 'KEY_MISSING')
-                logger.info(f"   Solution {idx}: visualization={has_viz}, value={viz_val}")
+            (response, status), shared = run_single_flight(
+                cache_key,
+                lambda: build_report(run_id, file.stream, file.filename, analyzer, preflight_summary),
+                run_id
+            )
+            if shared:
+                logger.info(f"🔗 Shared an identical in-flight analysis for {file.filename}")
+                response = dict(response, filename=file.filename, coalesced=True)
             
             # Schedule automatic deletion after 1 hour for privacy
-            logger.info("🔒 Scheduling file deletion in 1 hour for privacy protection")
-            delete_after_delay(str(filepath), delay_seconds=3600)
-            
-            # Delete generated graph files after 1 hour
-            for graph_path in graph_paths.values():
-                if graph_path and os.path.exists(graph_path):
-                    delete_after_delay(graph_path, delay_seconds=3600)
+            if filepath:
+                logger.info("🔒 Scheduling file deletion in 1 hour for privacy protection")
+                delete_after_delay(str(filepath), delay_seconds=3600)
             
-            logger.info("✅ Analysis complete - sending response to frontend")
-            return jsonify(response)
+            if status == 200:
+                if compact:
+                    response = compact_response(response)
+                logger.info("✅ Analysis complete - sending response to frontend")
+            return jsonify(response), status
             
         except Exception as e:
             import traceback
@@ -329,6 +524,480 @@ def analyze():
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+def build_report(run_id, source, filename, analyzer, preflight_summary, progress=None):
+    """
+    Run extraction, solving and charts for one PDF.
+    Charts go to the run's own directory; returns (response dict, HTTP
+    status). progress(stage, done, total) is called as the pipeline advances.
+    """
+    from homework_solver import TheoryBase
+    from detailed_solver import generate_detailed_report
+    
+    if progress is None:
+        progress = lambda stage, done=None, total=None: None
+    
+    progress('extracting')
+    problems = analyzer.extract_and_analyze(
+        source,
+        workers=app.config['EXTRACTION_WORKERS'] or None
+    )
+    
+    if analyzer.truncated:
+        logger.warning(f"⚠️ Extraction truncated: {analyzer.truncated}")
+    
+    if not problems:
+        logger.warning("⚠️ No problems found in PDF")
+        return {
+            'error': 'No problems found in PDF. Please check the file format.',
+            'truncated': analyzer.truncated
+        }, 400
+    
+    logger.info(f"✅ Found {len(problems)} problems")
+    
+    theory_base = TheoryBase()
+    theories = theory_base.THEORIES
+    
+    # Generate comprehensive detailed report with cliff notes
+    progress('solving', 0, len(problems))
+    report = generate_detailed_report(problems, theories)
+    
+    # Generate graphs (optional)
+    graph_paths = {}
+    try:
+        from visualizer import ReportVisualizer
+        logger.info(f"📊 Generating visualizations in {run_dir(run_id)}...")
+        progress('charts', 0, len(problems))
+        visualizer = ReportVisualizer(output_dir=run_dir(run_id))
+        # Delete the run's charts after 1 hour
+        delete_after_delay(run_dir(run_id), delay_seconds=3600)
+        graph_paths = visualizer.generate_all_visualizations(problems, theories)
+        logger.info(f"✅ Generated {len(graph_paths)} graphs")
+        
+        # Generate individual problem visualizations and add to solutions
+        logger.info("🎨 Generating individual problem visualizations...")
+        problems_with_viz = 0
+        for idx, problem in enumerate(problems):
+            viz_url = problem_visualization(visualizer, problem, idx, run_id)
+            if viz_url:
+                # Add to both problems and solutions
+                problems[idx]['visualization'] = viz_url
+                if idx < len(report['problems_analyzed']):
+                    report['problems_analyzed'][idx]['visualization'] = viz_url
+                else:
+                    logger.warning(f"   ⚠️ Index {idx} out of range for solutions (length={len(report['problems_analyzed'])})")
+                problems_with_viz += 1
+            progress('charts', idx + 1, len(problems))
+        logger.info(f"✅ Generated visualizations for {problems_with_viz}/{len(problems)} problems")
+    except Exception as e:
+        logger.warning(f"⚠️ Graph generation skipped: {str(e)}")
+    
+    # Build response (much smaller now - no base64 images)
+    response = {
+        'success': True,
+        'filename': filename,
+        'total_problems': len(problems),
+        'problem_types': report['summary']['problem_types'],
+        'problems': problems[:10],
+        'solutions': report['problems_analyzed'],
+        'cliff_notes': report.get('cliff_notes', {}),
+        'statistics': {
+            'total_theories': report['summary']['total_theories'],
+            'total_domains': len(theories),
+            'problems_solved': len(problems)
+        },
+        'graphs': list(graph_paths.keys()),
+        'truncated': analyzer.truncated,
+        'preflight': preflight_summary,
+        'run_id': run_id
+    }
+    
+    # Debug: Check what's in response before sending
+    logger.info(f"📤 RESPONSE CHECK: Sending {len(response['solutions'])} solutions")
+    for idx, sol in enumerate(response['solutions'][:3]):
+        has_viz = 'visualization' in sol and sol['visualization'] is not None
+        viz_val = sol.get('visualization', 'KEY_MISSING')
+        logger.info(f"   Solution {idx}: visualization={has_viz}, value={viz_val}")
+    
+    return response, 200
+
+
+def submit_analysis_job(run_id, file, analyzer, preflight_summary, compact, cache_key):
+    """
+    Keep a private copy of the upload and queue its analysis.
+    The run ID doubles as the job ID. Returns the 202 response, or 503 when
+    the job queue is full.
+    """
+    job_upload = os.path.join(JOBS_DIR, f"{run_id}.pdf")
+    file.save(job_upload)
+    
+    try:
+        job = JOB_QUEUE.submit(
+            run_analysis_job, run_id, job_upload, file.filename, analyzer, preflight_summary, compact, cache_key,
+            job_id=run_id, filename=file.filename, content_key=cache_key
+        )
+    except QueueFull as e:
+        os.remove(job_upload)
+        logger.warning(f"⚠️ Job queue full: {str(e)}")
+        response = jsonify({'error': f'Server busy: {str(e)}. Please retry shortly.'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    logger.info(f"🧾 Queued analysis job {job['id']} for {file.filename}")
+    response = jsonify(job_response(job, filename=file.filename, preflight=preflight_summary))
+    response.headers['Location'] = url_for('job_status', job_id=job['id'])
+    return response, 202
+
+
+def run_single_flight(cache_key, build, run_id):
+    """
+    Run build() once per cache key across concurrent requests, threads and
+    worker processes, caching its report.
+    Returns ((response, status), shared); a shared response belongs to
+    every caller, so copy it before changing it.
+    """
+    def compute():
+        # The disk quota must not evict the run's charts while they are made
+        with ARTIFACT_REAPER.hold(run_dir(run_id)):
+            response, status = build()
+        store_report(cache_key, run_id, response, status)
+        return response, status
+    
+    return SINGLE_FLIGHT.do(cache_key, compute, lookup=lambda: cached_report(cache_key))
+
+
+def run_analysis_job(run_id, job_upload, filename, analyzer, preflight_summary, compact, cache_key, progress):
+    """Worker side of an async analysis; the private upload copy is removed when it ends"""
+    try:
+        (response, status), shared = run_single_flight(
+            cache_key,
+            lambda: build_report(run_id, job_upload, filename, analyzer, preflight_summary, progress),
+            run_id
+        )
+        if shared:
+            response = dict(response, filename=filename, coalesced=True)
+        if compact and status == 200:
+            response = compact_response(response)
+        return response, status
+    finally:
+        if os.path.exists(job_upload):
+            os.remove(job_upload)
+
+
+def without_filename(response):
+    """
+    A report or job record for a client that may not have uploaded the PDF.
+    Reports and jobs are shared by content hash, so the name the first
+    uploader gave the file is not passed on.
+    """
+    if 'filename' not in response:
+        return response
+    return dict(response, filename=None)
+
+
+def job_response(job, **extra):
+    """A job record with the URLs a client polls"""
+    response = without_filename(job)
+    response['job_id'] = job['id']
+    response['status_url'] = url_for('job_status', job_id=job['id'])
+    response['result_url'] = url_for('job_result', job_id=job['id'])
+    response.update(extra)
+    return response
+
+
+@app.route('/api/analyze/lookup', methods=['POST'])
+def analyze_lookup():
+    """
+    Hash-first check before uploading: takes the client-computed SHA-256 of
+    a PDF as JSON ({"sha256": ..., optional "format"}).
+    Returns 200 with the cached report, 202 with the job already analyzing
+    that PDF, or 404 when the client has to upload it. Neither carries the
+    file name of whoever uploaded the PDF first.
+    """
+    payload = request.get_json(silent=True) or {}
+    digest = str(payload.get('sha256', '')).lower()
+    if not SHA256_PATTERN.match(digest):
+        return jsonify({'error': 'Expected a hex SHA-256 digest in "sha256"'}), 400
+    
+    cache_key = report_cache_key(digest)
+    cached = cached_report(cache_key, compact=payload.get('format') == 'compact')
+    if cached is not None:
+        response, status = cached
+        logger.info(f"⚡ Lookup hit for {digest[:12]}, upload skipped")
+        return jsonify(dict(without_filename(response), cached=True)), status
+    
+    job = JOB_STORE.find_active(cache_key)
+    if job is not None:
+        return jsonify(job_response(job)), 202
+    
+    return jsonify({'found': False, 'sha256': digest}), 404
+
+
+def current_job(job_id):
+    """A job record, with a job whose worker has died closed as failed first"""
+    job = JOB_STORE.get(job_id)
+    if job is not None and JOB_STORE.is_stale(job):
+        JOB_STORE.expire()
+        job = JOB_STORE.get(job_id)
+    return job
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Status and progress of an async analysis"""
+    job = current_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job_response(job))
+
+
+@app.route('/api/jobs/<job_id>/result')
+def job_result(job_id):
+    """The finished report of an async analysis (202 while it is still running)"""
+    job = current_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job['status'] not in FINISHED:
+        return jsonify(job_response(job)), 202
+    
+    # Lookups hand this job to anyone with the same PDF
+    result = JOB_STORE.get_result(job_id)
+    if result is None:
+        result = {'error': job['error'] or 'Analysis failed'}
+    return jsonify(without_filename(result)), job.get('http_status') or 200
+
+
+def ndjson_event(event, payload):
+    """One newline-delimited JSON line: {"event": ..., **payload}"""
+    return json.dumps({'event': event, **payload}) + '\n'
+
+
+def sse_event(event, payload):
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """
+    Analyze PDF and stream the report while it is produced.
+    Sends a 'header' event, one 'solution' event per problem as soon as it is
+    solved, then 'cliff_notes' with the totals ('error' if analysis fails).
+    Events are newline-delimited JSON, or Server-Sent Events when the client
+    accepts text/event-stream. A PDF already in the report cache is replayed
+    as the same events.
+    
+    The header's 'total_problems' is null unless the extraction cache already
+    holds the PDF: the count is only known once every page has been read, so
+    clients should show progress until 'cliff_notes' carries the final total.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if not file.filename or not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Please upload a valid PDF file'}), 400
+    
+    run_id = new_run_id()
+    filepath, error = save_retained_upload(file, run_id)
+    if error:
+        return error
+    
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        encode, mimetype = sse_event, 'text/event-stream'
+    else:
+        encode, mimetype = ndjson_event, 'application/x-ndjson'
+    
+    def respond(events):
+        return Response(
+            stream_with_context(events),
+            mimetype=mimetype,
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    try:
+        # Same report cache as /analyze: a known PDF is replayed, not re-analyzed
+        from extraction_cache import hash_source
+        cache_key = report_cache_key(hash_source(file.stream))
+        cached = cached_report(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Report cache hit for {file.filename}")
+            if filepath:
+                delete_after_delay(str(filepath), delay_seconds=3600)
+            response, status = cached
+            return respond(replay_report(response, status, file.filename, encode, cached=True))
+        
+        analyzer, preflight_summary, error = build_analyzer(file)
+    except Exception as e:
+        logger.error(f"❌ Analysis error: {str(e)}")
+        if filepath:
+            delete_after_delay(str(filepath), delay_seconds=3600)
+        return jsonify({'error': f'Analysis failed: {str(e)}'}), 400
+    if error:
+        return error
+    
+    return respond(coalesced_stream(run_id, file, filepath, analyzer, preflight_summary, encode, cache_key))
+
+
+def summary_event(response):
+    """The 'cliff_notes' event payload of a finished report"""
+    keys = ('success', 'total_problems', 'problem_types', 'cliff_notes', 'statistics', 'graphs', 'truncated')
+    return {key: response[key] for key in keys}
+
+
+def replay_report(response, status, filename, encode, **flags):
+    """
+    Stream a finished report as the events a live analysis sends; flags
+    (cached=True, coalesced=True) go into the header.
+    """
+    if status >= 400:
+        yield encode('error', response)
+        return
+    
+    yield encode('header', {
+        'run_id': response['run_id'],
+        'filename': filename,
+        'total_problems': response['total_problems'],
+        'preflight': response.get('preflight'),
+        **flags
+    })
+    for idx, solution in enumerate(response['solutions']):
+        yield encode('solution', {'index': idx, 'solution': solution})
+    yield encode('cliff_notes', summary_event(response))
+
+
+def coalesced_stream(run_id, file, filepath, analyzer, preflight_summary, encode, cache_key):
+    """
+    stream_analysis under SINGLE_FLIGHT: while the same PDF is already being
+    analyzed (by /analyze, a job or another stream, in any worker), wait for
+    that report and replay it instead of running the pipeline again.
+    """
+    with SINGLE_FLIGHT.flight(cache_key, lookup=lambda: cached_report(cache_key)) as flight:
+        if flight.shared:
+            logger.info(f"🔗 Shared an identical in-flight analysis for {file.filename}")
+            if filepath:
+                delete_after_delay(str(filepath), delay_seconds=3600)
+            response, status = flight.result
+            yield from replay_report(response, status, file.filename, encode, coalesced=True)
+            return
+        
+        with ARTIFACT_REAPER.hold(run_dir(run_id)):
+            result = yield from stream_analysis(run_id, file, filepath, analyzer, preflight_summary, encode, cache_key)
+        if result is not None:
+            flight.result = result
+
+
+def stream_analysis(run_id, file, filepath, analyzer, preflight_summary, encode, cache_key):
+    """
+    Generate the encoded events of one streamed analysis.
+    Problems are solved as the extractor yields them, so the first solution
+    goes out after the first pages, not after the whole document. The
+    finished report goes into the report cache, as /analyze would store it,
+    and is the generator's return value as (response, status); None when
+    the analysis failed.
+    """
+    from homework_solver import TheoryBase
+    from detailed_solver import iter_detailed_solutions, generate_report_cliff_notes
+    
+    problems = []
+    solutions = []
+    graph_paths = {}
+    try:
+        # 'total_problems' is known up front when the extraction cache holds
+        # this PDF's problems; otherwise it is null, since problems are found
+        # while the PDF is extracted, and the final count is in 'cliff_notes'
+        known = analyzer.cached_problems(file.stream)
+        yield encode('header', {
+            'run_id': run_id,
+            'filename': file.filename,
+            'total_problems': None if known is None else len(known),
+            'preflight': preflight_summary
+        })
+        
+        theories = TheoryBase().THEORIES
+        try:
+            from visualizer import ReportVisualizer
+            visualizer = ReportVisualizer(output_dir=run_dir(run_id))
+            # Delete the run's charts after 1 hour
+            delete_after_delay(run_dir(run_id), delay_seconds=3600)
+        except Exception as e:
+            logger.warning(f"⚠️ Graph generation skipped: {str(e)}")
+            visualizer = None
+        
+        def extracted():
+            if known is None:
+                source = analyzer.iter_problems(file.stream, workers=app.config['EXTRACTION_WORKERS'] or None)
+            else:
+                source = known
+            for problem in source:
+                # A copy gets the visualization URL; the cache keeps the original
+                problems.append(dict(problem))
+                yield problem
+        
+        language_counts = {'en': 0, 'es': 0}
+        for idx, solution in enumerate(iter_detailed_solutions(extracted(), language_counts=language_counts)):
+            if visualizer:
+                viz_url = problem_visualization(visualizer, problems[idx], idx, run_id)
+                if viz_url:
+                    problems[idx]['visualization'] = viz_url
+                    solution['visualization'] = viz_url
+            solutions.append(solution)
+            yield encode('solution', {'index': idx, 'solution': solution})
+        
+        if analyzer.truncated:
+            logger.warning(f"⚠️ Extraction truncated: {analyzer.truncated}")
+        
+        if not problems:
+            logger.warning("⚠️ No problems found in PDF")
+            response = {
+                'error': 'No problems found in PDF. Please check the file format.',
+                'truncated': analyzer.truncated
+            }
+            store_report(cache_key, run_id, response, 400)
+            yield encode('error', response)
+            return response, 400
+        
+        logger.info(f"✅ Streamed {len(solutions)} solutions")
+        if visualizer:
+            try:
+                graph_paths = visualizer.generate_all_visualizations(problems, theories)
+                logger.info(f"✅ Generated {len(graph_paths)} graphs")
+            except Exception as e:
+                logger.warning(f"⚠️ Graph generation skipped: {str(e)}")
+        
+        # The same report /analyze builds, for the cache
+        response = {
+            'success': True,
+            'filename': file.filename,
+            'total_problems': len(problems),
+            'problem_types': list(set(p.get('type', 'Unknown').upper() for p in problems)),
+            'problems': problems[:10],
+            'solutions': solutions,
+            'cliff_notes': generate_report_cliff_notes(solutions, theories, language_counts),
+            'statistics': {
+                'total_theories': sum(len(t) for t in theories.values()),
+                'total_domains': len(theories),
+                'problems_solved': len(problems)
+            },
+            'graphs': list(graph_paths.keys()),
+            'truncated': analyzer.truncated,
+            'preflight': preflight_summary,
+            'run_id': run_id
+        }
+        store_report(cache_key, run_id, response, 200)
+        yield encode('cliff_notes', summary_event(response))
+        logger.info("✅ Streamed analysis complete")
+        return response, 200
+        
+    except Exception as e:
+        logger.error(f"❌ Analysis error: {str(e)}")
+        yield encode('error', {'error': f'Analysis failed: {str(e)}'})
+    
+    finally:
+        # Same privacy schedule as /analyze, however the stream ended
+        if filepath:
+            delete_after_delay(str(filepath), delay_seconds=3600)
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""